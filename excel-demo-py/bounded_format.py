@@ -0,0 +1,118 @@
+"""Bounded serialization helpers for logging large tool payloads.
+
+Tool inputs and outputs can be many megabytes (Write contents, Read
+results). These helpers produce the short prefix or size estimate that
+logging needs without serializing the whole value first.
+"""
+
+import json
+from typing import Any, List, Optional, Tuple
+
+
+def bounded_json(value: Any, limit: int, indent: Optional[int] = None) -> Tuple[str, bool]:
+    """
+    Serialize ``value`` as JSON, stopping once ``limit`` characters exist.
+
+    The result matches the first ``limit`` characters of
+    ``json.dumps(value, ensure_ascii=False, indent=indent, default=str)``.
+    Long strings are sliced before they are escaped, so the work done is
+    proportional to ``limit`` rather than to the size of the payload.
+
+    Returns:
+        Tuple of (text, truncated)
+    """
+    out: List[str] = []
+    remaining = _emit(value, out, limit + 1, indent, 0)
+    text = "".join(out)
+    if remaining <= 0 or len(text) > limit:
+        return text[:limit], True
+    return text, False
+
+
+def _emit(value: Any, out: List[str], budget: int, indent: Optional[int], level: int) -> int:
+    """Append JSON chunks for ``value`` to ``out``; return the remaining budget."""
+    if budget <= 0:
+        return budget
+
+    if isinstance(value, str):
+        chunk = json.dumps(value[:budget], ensure_ascii=False)
+    elif value is None or isinstance(value, (bool, int, float)):
+        chunk = json.dumps(value)
+    elif isinstance(value, (dict, list, tuple)):
+        return _emit_container(value, out, budget, indent, level)
+    else:
+        return _emit(str(value), out, budget, indent, level)
+
+    out.append(chunk)
+    return budget - len(chunk)
+
+
+def _emit_container(value: Any, out: List[str], budget: int, indent: Optional[int], level: int) -> int:
+    is_dict = isinstance(value, dict)
+    open_char, close_char = ("{", "}") if is_dict else ("[", "]")
+    if not value:
+        out.append(open_char + close_char)
+        return budget - 2
+
+    if indent is None:
+        item_sep, key_sep, inner, outer = ", ", ": ", "", ""
+    else:
+        inner = "\n" + " " * (indent * (level + 1))
+        outer = "\n" + " " * (indent * level)
+        item_sep, key_sep = ",", ": "
+
+    out.append(open_char)
+    budget -= 1
+    items = value.items() if is_dict else ((None, item) for item in value)
+    for index, (key, item) in enumerate(items):
+        if budget <= 0:
+            return budget
+        prefix = (item_sep if index else "") + inner
+        out.append(prefix)
+        budget -= len(prefix)
+        if is_dict:
+            key_chunk = json.dumps(_json_key(key), ensure_ascii=False) + key_sep
+            out.append(key_chunk)
+            budget -= len(key_chunk)
+        budget = _emit(item, out, budget, indent, level + 1)
+
+    if budget > 0:
+        out.append(outer + close_char)
+        budget -= len(outer) + 1
+    return budget
+
+
+def _json_key(key: Any) -> str:
+    """A dict key as json.dumps coerces it (True -> "true", None -> "null")."""
+    if isinstance(key, str):
+        return key
+    if key is None or isinstance(key, (bool, int, float)):
+        return json.dumps(key)
+    return str(key)
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Estimate the serialized length of ``value`` without building the string.
+
+    Strings, bytes and scalars are measured directly and containers are
+    summed recursively, so the cost depends on the number of items rather
+    than on payload size. The result approximates ``len(str(value))``.
+    """
+    if isinstance(value, str):
+        return len(value) + 2
+    if isinstance(value, (bytes, bytearray)):
+        return len(value) + 3
+    if value is None or isinstance(value, (bool, int, float)):
+        return len(repr(value))
+    if isinstance(value, dict):
+        if not value:
+            return 2
+        return 2 + 2 * (len(value) - 1) + sum(
+            estimate_size(key) + 2 + estimate_size(item) for key, item in value.items()
+        )
+    if isinstance(value, (list, tuple, set)):
+        if not value:
+            return 2
+        return 2 + 2 * (len(value) - 1) + sum(estimate_size(item) for item in value)
+    return len(str(value))
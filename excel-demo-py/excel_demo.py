@@ -1,6 +1,5 @@
 import asyncio
 import html
-import json
 import os
 import random
 import string
@@ -13,6 +12,8 @@ from typing import Any
 import gradio as gr
 from claude_agent_sdk import AssistantMessage, ClaudeAgentOptions, TextBlock, query
 
+from bounded_format import bounded_json
+
 MAX_FILE_BYTES = 10 * 1024 * 1024
 ALLOWED_EXTENSIONS = {".xlsx", ".xls", ".pdf", ".docx", ".doc"}
 OUTPUT_EXTENSIONS = {".xlsx", ".csv"}
@@ -90,14 +91,10 @@ def _format_tool_input(input_data: dict[str, Any]) -> list[dict[str, Any]]:
             else:
                 display = value
         elif isinstance(value, (dict, list)):
-            json_str = json.dumps(value, ensure_ascii=False, indent=2)
-            if len(json_str) > 200:
-                compact = json.dumps(value, ensure_ascii=False)
-                if len(compact) > 100:
-                    display = compact[:100] + "..."
-                    truncated = True
-                else:
-                    display = compact
+            json_str, too_long = bounded_json(value, 200, indent=2)
+            if too_long:
+                compact, truncated = bounded_json(value, 100)
+                display = compact + "..." if truncated else compact
             else:
                 display = json_str
         else:
@@ -0,0 +1,68 @@
+"""Microbenchmark bounded formatting of huge tool payloads.
+
+Compares the previous full-serialization approach with
+research_agent.utils.bounded_format on 10 MB Write inputs and Read results:
+
+- preview: str(tool_input)[:100]        vs bounded_json(tool_input, 100)
+- size:    len(str(tool_response))      vs estimate_size(tool_response)
+- pretty:  json.dumps(indent=2) + slice vs bounded_json(..., indent=2)
+
+Usage:
+    python benchmarks/bench_bounded_format.py --size-mb 10
+"""
+
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from research_agent.utils.bounded_format import bounded_json, estimate_size  # noqa: E402
+
+
+def make_payloads(size_mb: int):
+    text = ("Research note line with some 数据 and \"quotes\".\n" * (size_mb * 1024 * 1024 // 48))
+    write_input = {"file_path": "/workspace/files/research_notes/big.md", "content": text}
+    read_result = {
+        "type": "text",
+        "file": {"filePath": "/workspace/files/research_notes/big.md", "content": text, "numLines": text.count("\n")},
+    }
+    return write_input, read_result
+
+
+def bench(label: str, old, new, number: int):
+    old_s = min(timeit.repeat(old, number=number, repeat=3)) / number
+    new_s = min(timeit.repeat(new, number=number, repeat=3)) / number
+    print(f"{label:<26}{old_s * 1e3:>12.3f}{new_s * 1e3:>12.4f}{old_s / new_s:>12.0f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=10, help="Payload size in megabytes")
+    parser.add_argument("--number", type=int, default=5, help="Iterations per measurement")
+    args = parser.parse_args()
+
+    write_input, read_result = make_payloads(args.size_mb)
+
+    print(f"{'case':<26}{'old ms':>12}{'new ms':>12}{'speedup':>13}")
+    bench("Write input preview",
+          lambda: str(write_input)[:100],
+          lambda: bounded_json(write_input, 100),
+          args.number)
+    bench("Read result size",
+          lambda: len(str(read_result)),
+          lambda: estimate_size(read_result),
+          args.number)
+    bench("Read result pretty JSON",
+          lambda: json.dumps(read_result, ensure_ascii=False, indent=2)[:200],
+          lambda: bounded_json(read_result, 200, indent=2),
+          args.number)
+
+    exact, estimate = len(str(read_result)), estimate_size(read_result)
+    print(f"\nsize estimate: {estimate:,} vs exact {exact:,} ({abs(estimate - exact) / exact:.2%} off)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Benchmark hook latency with synchronous vs background JSONL logging.
+
+Drives SubagentTracker.pre_tool_use_hook / post_tool_use_hook at a fixed
+event rate and reports per-hook latency percentiles for:
+
+- sync:  the previous behaviour (json.dumps + write + flush inside the hook)
+- async: the background group-commit writer
+
+Usage:
+    python benchmarks/bench_hook_latency.py --events 20000 --rate 5000
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from research_agent.utils.subagent_tracker import SubagentTracker  # noqa: E402
+
+
+class SyncLoggingTracker(SubagentTracker):
+    """Tracker that writes each log entry synchronously, as before."""
+
+    def __init__(self, session_dir: Path):
+        super().__init__(session_dir=None)
+        self._sync_file = open(session_dir / "tool_calls.jsonl", "w", encoding="utf-8")
+
+    async def _log_to_jsonl(self, log_entry: Dict[str, Any]):
+        self._sync_file.write(json.dumps(log_entry) + "\n")
+        self._sync_file.flush()
+
+    async def aclose(self):
+        self._sync_file.close()
+
+
+class QuietTranscript:
+    """Transcript stand-in that discards console output."""
+
+    def write(self, text: str, end: str = "", flush: bool = True):
+        pass
+
+    def write_to_file(self, text: str, flush: bool = True):
+        pass
+
+
+def percentile(sorted_values, pct: float) -> float:
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))
+    return sorted_values[index]
+
+
+async def drive(tracker: SubagentTracker, events: int, rate: int) -> Dict[str, float]:
+    tracker.transcript_writer = QuietTranscript()
+    tracker.register_subagent_spawn("task_bench", "researcher", "benchmark", "prompt")
+
+    payload = {"file_path": "/tmp/notes.md", "content": "x" * 2048}
+    latencies = []
+    interval = 1.0 / rate
+    start = time.perf_counter()
+
+    for i in range(events // 2):
+        tool_use_id = f"toolu_{i}"
+        # The message stream reports the owner before the hook fires
+        tracker.record_tool_owner(tool_use_id, "task_bench")
+        for hook, hook_input in (
+            (tracker.pre_tool_use_hook, {"tool_name": "Write", "tool_input": payload}),
+            (tracker.post_tool_use_hook, {"tool_response": {"ok": True}}),
+        ):
+            t0 = time.perf_counter()
+            await hook(hook_input, tool_use_id, None)
+            latencies.append(time.perf_counter() - t0)
+
+        # Pace to the target rate, yielding so background work can run
+        ahead = start + (i + 1) * 2 * interval - time.perf_counter()
+        await asyncio.sleep(ahead if ahead > 0 else 0)
+
+    elapsed = time.perf_counter() - start
+    t0 = time.perf_counter()
+    await tracker.aclose()
+    close_time = time.perf_counter() - t0
+
+    latencies.sort()
+    return {
+        "events_per_sec": len(latencies) / elapsed,
+        "mean_us": statistics.fmean(latencies) * 1e6,
+        "p50_us": percentile(latencies, 50) * 1e6,
+        "p99_us": percentile(latencies, 99) * 1e6,
+        "max_us": latencies[-1] * 1e6,
+        "close_ms": close_time * 1e3,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=20000, help="Total hook events to send")
+    parser.add_argument("--rate", type=int, default=5000, help="Target hook events per second")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for name in ("sync", "async"):
+            session_dir = Path(tmp) / name
+            session_dir.mkdir()
+            if name == "sync":
+                tracker = SyncLoggingTracker(session_dir)
+            else:
+                tracker = SubagentTracker(session_dir=session_dir)
+            results[name] = await drive(tracker, args.events, args.rate)
+
+            lines = sum(1 for _ in open(session_dir / "tool_calls.jsonl", "rb"))
+            assert lines == args.events, f"{name}: expected {args.events} log lines, got {lines}"
+
+    print(f"{'mode':<8}{'events/s':>12}{'mean µs':>10}{'p50 µs':>10}{'p99 µs':>10}{'max µs':>10}{'close ms':>10}")
+    for name, r in results.items():
+        print(
+            f"{name:<8}{r['events_per_sec']:>12.0f}{r['mean_us']:>10.1f}{r['p50_us']:>10.1f}"
+            f"{r['p99_us']:>10.1f}{r['max_us']:>10.1f}{r['close_ms']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
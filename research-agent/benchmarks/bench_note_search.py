@@ -0,0 +1,87 @@
+"""Benchmark note search against reading whole notes.
+
+For a set of lookup queries (one statistic each, English and Chinese),
+compares what a synthesis agent has to read:
+
+- read:   Read, in full, of the notes the matching passages come from
+- search: one search_notes call (top passages with line anchors)
+
+and times the index: cold build, a no-op refresh, a refresh after one note
+changed, and a query.
+
+Usage:
+    python benchmarks/bench_note_search.py
+    python benchmarks/bench_note_search.py --notes-dir files/research_notes --limit 5
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from research_agent.utils.note_search import NoteIndex, format_results  # noqa: E402
+
+QUERIES = [
+    "GPT-3 parameters",
+    "Chinchilla optimal tokens per parameter",
+    "reverse proxy market share",
+    "nginx usage statistics",
+    "DeepSeek R1 training cost",
+    "加菲尔德 梯形证明",
+    "勾股定理 教学 效果",
+    "开源模型 市场份额",
+]
+
+
+def timed(fn, repeat: int = 1) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes-dir", type=Path, default=Path("files/research_notes"), help="Notes to search")
+    parser.add_argument("--limit", type=int, default=5, help="Passages per search")
+    args = parser.parse_args()
+
+    notes = {path.name: path.read_text(encoding="utf-8") for path in sorted(args.notes_dir.glob("*.md"))}
+    if not notes:
+        sys.exit(f"No notes in {args.notes_dir}/")
+    index = NoteIndex(args.notes_dir)
+
+    print(f"{len(notes)} notes, {sum(map(len, notes.values())):,} characters\n")
+    print(f"{'query':<42}{'read chars':>12}{'search chars':>14}{'ratio':>8}")
+    total_read = total_search = 0
+    for query in QUERIES:
+        results = index.search(query, args.limit)
+        read = sum(len(notes[name]) for name in {passage.note for _, passage in results})
+        search = len(format_results(query, results, args.notes_dir))
+        total_read += read
+        total_search += search
+        print(f"{query:<42}{read:>12,}{search:>14,}{read / max(search, 1):>7.0f}x")
+    print(f"{'total':<42}{total_read:>12,}{total_search:>14,}{total_read / max(total_search, 1):>7.0f}x\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        copy = Path(tmp) / "notes"
+        shutil.copytree(args.notes_dir, copy)
+        index = NoteIndex(copy)
+        print(f"cold build        {timed(index.refresh):8.1f} ms ({len(index):,} passages)")
+        print(f"no-op refresh     {timed(index.refresh, 20):8.2f} ms")
+        changed = copy / next(iter(notes))
+
+        def change_one():
+            changed.write_text(changed.read_text(encoding="utf-8") + "\n- one more line\n", encoding="utf-8")
+            index.refresh()
+
+        print(f"one note changed  {timed(change_one, 5):8.1f} ms")
+        print(f"query             {timed(lambda: index.search(QUERIES[0], args.limit), 50):8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
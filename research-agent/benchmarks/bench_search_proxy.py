@@ -0,0 +1,97 @@
+"""Benchmark the search proxy on a repeated research topic.
+
+Simulates parallel researchers that each run a few searches with a slow
+search backend (every call sleeps), where the researchers' queries overlap
+the way parallel subtopics do (same words, different case/order), and
+compares:
+
+- direct: every search goes to the backend (the plain Tavily MCP tool)
+- cold:   SearchProxy with an empty cache (only coalescing and in-run reuse)
+- warm:   the same topic again, served from the on-disk cache
+- replay: the same topic in replay mode (recorded results, no backend)
+
+Usage:
+    python benchmarks/bench_search_proxy.py --researchers 4 --latency-ms 800
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from research_agent.utils.search_proxy import SearchCache, SearchProxy  # noqa: E402
+
+SUBTOPICS = ["market size", "key players", "technology trends", "adoption rates", "regulation", "outlook"]
+
+
+def researcher_queries(topic: str, index: int) -> List[str]:
+    """Searches of one researcher; the first two overlap with every other researcher's."""
+    subtopic = SUBTOPICS[index % len(SUBTOPICS)]
+    return [
+        f"{topic} 2025 statistics" if index % 2 else f"2025 {topic.upper()} Statistics",
+        f"{topic} market share" if index % 2 else f"Market share, {topic}",
+        f"{topic} {subtopic} data",
+        f"{topic} {subtopic} forecast",
+    ]
+
+
+class SlowBackend:
+    """Search backend stand-in whose calls block for a fixed time."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    def __call__(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        self.calls += 1
+        time.sleep(self.latency)
+        return {"results": [{"title": args["query"], "url": "https://example.com", "content": "x" * 2_000}]}
+
+
+async def run_topic(search, topic: str, researchers: int) -> float:
+    async def researcher(index: int):
+        for query in researcher_queries(topic, index):
+            await search({"query": query, "max_results": 5})
+
+    started = time.perf_counter()
+    await asyncio.gather(*(researcher(i) for i in range(researchers)))
+    return time.perf_counter() - started
+
+
+async def main_async(researchers: int, latency: float, topic: str):
+    print(f"{researchers} researchers x 4 searches, backend latency {latency * 1000:.0f} ms\n")
+    print(f"{'run':<8}{'wall s':>9}{'backend calls':>15}{'cached':>8}{'coalesced':>11}")
+
+    backend = SlowBackend(latency)
+
+    async def direct(args):
+        return await asyncio.to_thread(backend, args)
+
+    wall = await run_topic(direct, topic, researchers)
+    print(f"{'direct':<8}{wall:>9.2f}{backend.calls:>15}{'-':>8}{'-':>11}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for run, mode in [("cold", "cache"), ("warm", "cache"), ("replay", "replay")]:
+            backend = SlowBackend(latency)
+            proxy = SearchProxy(SearchCache(Path(tmp)), backend=backend, mode=mode)
+            wall = await run_topic(proxy.search, topic, researchers)
+            stats = proxy.stats
+            print(f"{run:<8}{wall:>9.2f}{backend.calls:>15}{stats.hits:>8}{stats.coalesced:>11}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--researchers", type=int, default=4, help="Parallel researchers")
+    parser.add_argument("--latency-ms", type=float, default=800, help="Duration of each backend search")
+    parser.add_argument("--topic", default="AI chip", help="Research topic")
+    args = parser.parse_args()
+    asyncio.run(main_async(args.researchers, args.latency_ms / 1000, args.topic))
+
+
+if __name__ == "__main__":
+    main()
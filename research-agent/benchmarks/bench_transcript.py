@@ -0,0 +1,107 @@
+"""Benchmark transcript writes against a slow stdout consumer.
+
+Simulates a slow terminal / piped stdout (every write and flush to stdout
+sleeps) and streams text chunks through:
+
+- unbuffered: the previous behaviour (print(..., flush=True) + file.flush()
+  for every chunk, on the caller's thread)
+- buffered:   TranscriptWriter (console rendering on a background thread,
+  file flushed on size/time thresholds)
+
+and reports how long the receive loop is blocked per write, plus the time
+until close() has made everything durable.
+
+Usage:
+    python benchmarks/bench_transcript.py --chunks 5000 --stdout-delay-ms 0.2
+"""
+
+import argparse
+import contextlib
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from research_agent.utils.transcript import TranscriptWriter  # noqa: E402
+
+CHUNK = "Adoption grew 42% year over year, according to the survey. "
+
+
+class SlowStdout:
+    """stdout stand-in whose writes and flushes take a fixed time each."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.chars = 0
+
+    def write(self, text: str) -> int:
+        time.sleep(self.delay)
+        self.chars += len(text)
+        return len(text)
+
+    def flush(self):
+        time.sleep(self.delay)
+
+
+class UnbufferedTranscriptWriter:
+    """The previous TranscriptWriter: print + file flush on every chunk."""
+
+    def __init__(self, transcript_file: Path):
+        self.file = open(transcript_file, "w", encoding="utf-8")
+
+    def write(self, text: str, end: str = "", flush: bool = True):
+        print(text, end=end, flush=flush)
+        self.file.write(text + end)
+        if flush:
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def run(writer_cls, path: Path, chunks: int, delay: float):
+    stdout = SlowStdout(delay)
+    latencies = []
+    with contextlib.redirect_stdout(stdout):
+        writer = writer_cls(path)
+        start = time.perf_counter()
+        for _ in range(chunks):
+            t0 = time.perf_counter()
+            writer.write(CHUNK)
+            latencies.append(time.perf_counter() - t0)
+        loop_done = time.perf_counter() - start
+        writer.close()
+        durable = time.perf_counter() - start
+
+    expected = len(CHUNK) * chunks
+    assert path.stat().st_size == expected, "transcript file is incomplete"
+    assert stdout.chars == expected, "console output is incomplete"
+    latencies.sort()
+    return {
+        "loop_s": loop_done,
+        "durable_s": durable,
+        "mean_us": statistics.fmean(latencies) * 1e6,
+        "p99_us": latencies[int(len(latencies) * 0.99)] * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=5000, help="Text chunks to write")
+    parser.add_argument("--stdout-delay-ms", type=float, default=0.2, help="Cost of each stdout write/flush")
+    args = parser.parse_args()
+
+    delay = args.stdout_delay_ms / 1000
+    print(f"{args.chunks} chunks, stdout write/flush = {args.stdout_delay_ms} ms\n")
+    print(f"{'writer':<12}{'loop s':>10}{'durable s':>12}{'mean µs':>12}{'p99 µs':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, writer_cls in [("unbuffered", UnbufferedTranscriptWriter), ("buffered", TranscriptWriter)]:
+            r = run(writer_cls, Path(tmp) / f"{name}.txt", args.chunks, delay)
+            print(f"{name:<12}{r['loop_s']:>10.3f}{r['durable_s']:>12.3f}{r['mean_us']:>12.1f}{r['p99_us']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
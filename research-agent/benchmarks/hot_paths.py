@@ -0,0 +1,276 @@
+"""Microbenchmark suite for the per-tool-call hot paths.
+
+Drives, with synthetic events and realistic payload sizes (no SDK or
+network needed):
+
+- MessageRenderer.process_assistant_message  (subagent message with text + ToolUseBlock)
+- SubagentTracker.pre_tool_use_hook          (Write with a ~20 KB note)
+- SubagentTracker.post_tool_use_hook         (Read result of ~50 KB)
+
+for both the research-agent and the twitter-vibe-agent copies, and reports
+events/sec, mean and p99 latency per call, and allocation volume per event
+(peak bytes per call from tracemalloc, measured in a separate pass so it
+does not skew timing).
+
+Each package is timed in --repeats independent passes. A case's
+throughput is the best of its passes (noise only ever slows a pass down),
+and the table also shows the median. Results are compared against
+benchmarks/baseline.json, recorded the same way; the run fails when a
+case's best throughput drops more than --tolerance below its baseline.
+Cases that take under FAST_CASE_US per call are dominated by timer and
+scheduler noise, so they are held to the wider --fast-tolerance.
+Baselines are machine-specific: regenerate them on the machine that runs
+the check with --update-baseline.
+
+Usage:
+    python benchmarks/hot_paths.py                     # run + check baseline
+    python benchmarks/hot_paths.py --package twitter   # one copy only
+    python benchmarks/hot_paths.py --update-baseline   # record new baseline
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+BASELINE_PATH = BENCH_DIR / "baseline.json"
+
+PACKAGES = {
+    "research": (BENCH_DIR.parent, "research_agent"),
+    "twitter": (BENCH_DIR.parents[1] / "twitter-vibe-agent", "twitter_vibe_agent"),
+}
+
+NOTE_TEXT = "## Findings\n- Adoption grew 42% year over year (source: example.com)\n" * 300
+# Cases faster than this per call get the wider --fast-tolerance
+FAST_CASE_US = 10.0
+
+READ_RESULT = {"type": "text", "file": {"filePath": "/tmp/notes.md", "content": NOTE_TEXT * 2, "numLines": 1200}}
+
+
+# Synthetic message types; the handlers dispatch on these class names
+@dataclass
+class TextBlock:
+    text: str
+
+
+@dataclass
+class ToolUseBlock:
+    id: str
+    name: str
+    input: Dict[str, Any]
+
+
+@dataclass
+class AssistantMessage:
+    content: List[Any]
+    model: str = "claude-haiku"
+    parent_tool_use_id: Optional[str] = None
+
+
+@dataclass(eq=False)
+class NullTranscript:
+    """Transcript stand-in that only counts characters written (hashed by identity)."""
+    chars: int = 0
+
+    def write(self, text: str, end: str = "", flush: bool = True):
+        self.chars += len(text) + len(end)
+
+    def write_to_file(self, text: str, flush: bool = True):
+        self.chars += len(text)
+
+
+@dataclass
+class CaseStats:
+    latencies: List[float] = field(default_factory=list)
+    # Throughput of each timed pass
+    passes: List[float] = field(default_factory=list)
+
+    def end_pass(self, start: int):
+        total = sum(self.latencies[start:])
+        if total:
+            self.passes.append((len(self.latencies) - start) / total)
+
+    def summary(self, alloc_bytes_per_event: float) -> Dict[str, float]:
+        ordered = sorted(self.latencies)
+        return {
+            "events_per_sec": round(max(self.passes, default=0)),
+            "median_events_per_sec": round(statistics.median(self.passes)) if self.passes else 0,
+            "repeats": len(self.passes),
+            "mean_us": round(statistics.fmean(ordered) * 1e6, 2),
+            "p99_us": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1e6, 2),
+            "alloc_kib_per_event": round(alloc_bytes_per_event / 1024, 2),
+        }
+
+
+def load_package(name: str):
+    root, package = PACKAGES[name]
+    # Both copies use the same top-level layout; make only the requested one importable
+    sys.path.insert(0, str(root))
+    try:
+        tracker_mod = importlib.import_module(f"{package}.utils.subagent_tracker")
+        handler_mod = importlib.import_module(f"{package}.utils.message_handler")
+    finally:
+        sys.path.remove(str(root))
+    return tracker_mod.SubagentTracker, handler_mod.MessageRenderer
+
+
+async def run_events(
+    tracker_cls,
+    renderer_cls,
+    session_dir: Path,
+    events: int,
+    stats: Optional[Dict[str, CaseStats]] = None,
+    allocations: Optional[Dict[str, List[int]]] = None,
+):
+    """Send ``events`` tool calls through the handler and hooks.
+
+    Fills ``stats`` with per-call latencies, or ``allocations`` with the
+    peak bytes allocated during each call (tracemalloc must be running).
+    """
+    transcript = NullTranscript()
+    tracker = tracker_cls(transcript_writer=transcript, session_dir=session_dir)
+    renderer = renderer_cls(transcript, tracker)
+
+    async def measure(case: str, fn: Callable, *args):
+        if allocations is not None:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        t0 = time.perf_counter()
+        result = fn(*args)
+        if asyncio.iscoroutine(result):
+            await result
+        elapsed = time.perf_counter() - t0
+        if allocations is not None:
+            allocations[case].append(tracemalloc.get_traced_memory()[1] - before)
+        if stats is not None:
+            stats[case].latencies.append(elapsed)
+
+    # Lead agent spawns a researcher that then makes every tool call
+    spawn = AssistantMessage([ToolUseBlock("task_1", "Task", {
+        "subagent_type": "researcher", "description": "benchmark", "prompt": "Research X",
+    })])
+    renderer.process_assistant_message(spawn)
+
+    for i in range(events):
+        tool_use_id = f"toolu_{i}"
+        msg = AssistantMessage(
+            [TextBlock("Saving findings to notes."),
+             ToolUseBlock(tool_use_id, "Write", {"file_path": f"/tmp/notes_{i % 8}.md", "content": NOTE_TEXT})],
+            parent_tool_use_id="task_1",
+        )
+        pre_input = {"tool_name": "Write", "tool_input": msg.content[1].input}
+        post_input = {"tool_name": "Write", "tool_response": READ_RESULT}
+
+        await measure("process_assistant_message", renderer.process_assistant_message, msg)
+        await measure("pre_tool_use_hook", tracker.pre_tool_use_hook, pre_input, tool_use_id, None)
+        await measure("post_tool_use_hook", tracker.post_tool_use_hook, post_input, tool_use_id, None)
+
+        # Let background writers run, as the SDK's event loop would
+        if i % 64 == 0:
+            await asyncio.sleep(0)
+
+    if hasattr(tracker, "aclose"):
+        await tracker.aclose()
+    else:
+        tracker.close()
+
+
+async def bench_package(name: str, events: int, repeats: int) -> Dict[str, Dict[str, float]]:
+    tracker_cls, renderer_cls = load_package(name)
+    cases = ["process_assistant_message", "pre_tool_use_hook", "post_tool_use_hook"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Warm-up, then independent timed passes
+        await run_events(tracker_cls, renderer_cls, Path(tmp), min(events, 200))
+        stats = {case: CaseStats() for case in cases}
+        for _ in range(repeats):
+            starts = {case: len(stats[case].latencies) for case in cases}
+            await run_events(tracker_cls, renderer_cls, Path(tmp), events, stats=stats)
+            for case in cases:
+                stats[case].end_pass(starts[case])
+
+        # Allocation pass (tracemalloc slows everything down, so it is separate)
+        allocations: Dict[str, List[int]] = {case: [] for case in cases}
+        tracemalloc.start()
+        await run_events(tracker_cls, renderer_cls, Path(tmp), max(1, events // 10), allocations=allocations)
+        tracemalloc.stop()
+
+    return {case: stats[case].summary(statistics.fmean(allocations[case])) for case in cases}
+
+
+def check_baseline(
+    results: Dict[str, Dict[str, Dict[str, float]]], tolerance: float, fast_tolerance: float
+) -> List[str]:
+    if not BASELINE_PATH.exists():
+        return []
+    baseline = json.loads(BASELINE_PATH.read_text(encoding="utf-8"))
+    failures = []
+    for package, cases in results.items():
+        for case, result in cases.items():
+            recorded = baseline.get(package, {}).get(case, {})
+            expected = recorded.get("events_per_sec")
+            if not expected:
+                continue
+            allowed = fast_tolerance if 1e6 / expected < FAST_CASE_US else tolerance
+            if result["events_per_sec"] < expected * (1 - allowed):
+                failures.append(
+                    f"{package}.{case}: {result['events_per_sec']:,} events/s "
+                    f"< baseline {expected:,} - {allowed:.0%}"
+                )
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--package", choices=["research", "twitter", "both"], default="both")
+    parser.add_argument("--events", type=int, default=5000, help="Tool call events per package")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed passes per package (best one counts)")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Allowed throughput drop vs baseline")
+    parser.add_argument(
+        "--fast-tolerance", type=float, default=0.5,
+        help=f"Allowed throughput drop for cases under {FAST_CASE_US:g} µs per call"
+    )
+    parser.add_argument("--update-baseline", action="store_true", help="Write results to baseline.json")
+    args = parser.parse_args()
+
+    names = list(PACKAGES) if args.package == "both" else [args.package]
+    results = {name: asyncio.run(bench_package(name, args.events, max(1, args.repeats))) for name in names}
+
+    print(
+        f"{'package':<10}{'case':<28}{'best ev/s':>12}{'median ev/s':>13}"
+        f"{'mean µs':>10}{'p99 µs':>10}{'alloc KiB/ev':>14}"
+    )
+    for package, cases in results.items():
+        for case, r in cases.items():
+            print(
+                f"{package:<10}{case:<28}{r['events_per_sec']:>12,}{r['median_events_per_sec']:>13,}"
+                f"{r['mean_us']:>10.1f}{r['p99_us']:>10.1f}{r['alloc_kib_per_event']:>14.1f}"
+            )
+
+    if args.update_baseline:
+        baseline = json.loads(BASELINE_PATH.read_text(encoding="utf-8")) if BASELINE_PATH.exists() else {}
+        baseline.update(results)
+        BASELINE_PATH.write_text(json.dumps(baseline, indent=2) + "\n", encoding="utf-8")
+        print(f"\nBaseline written to {BASELINE_PATH}")
+        return 0
+
+    failures = check_baseline(results, args.tolerance, args.fast_tolerance)
+    if failures:
+        print("\nRegressions against baseline:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""Load-test the agents end to end with simulated sessions.
+
+Runs ``--sessions`` concurrent ``chat()`` sessions in one process, each
+against a ``FakeClaudeSDKClient`` instead of the CLI and API, so only our
+own orchestration, hook, logging and rendering code does real work. The
+fake client streams the lead agent's Task spawns and the subagents' tool
+calls with the configured latencies and runs the registered hooks.
+
+Reports wall and CPU time, simulated tool call throughput, and event loop
+lag (how late a 10 ms ticker wakes up), which is what degrades first when
+per-event work stops scaling.
+
+Usage:
+    python benchmarks/load_test.py --sessions 200
+    python benchmarks/load_test.py --package twitter --sessions 100 --turns 3 --tool-latency 0.05
+"""
+
+import argparse
+import asyncio
+import contextlib
+import functools
+import importlib
+import io
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+BENCH_DIR = Path(__file__).resolve().parent
+
+PACKAGES = {
+    "research": (BENCH_DIR.parent, "research_agent", ["researcher", "researcher", "researcher"]),
+    "twitter": (
+        BENCH_DIR.parents[1] / "twitter-vibe-agent",
+        "twitter_vibe_agent",
+        ["content-organizer", "content-generator", "quality-optimizer"],
+    ),
+}
+
+
+async def monitor_loop_lag(samples: List[float], interval: float = 0.01):
+    """Record how late each tick of a fixed-interval sleep wakes up."""
+    while True:
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - expected))
+
+
+async def run(args) -> int:
+    root, package, subagents = PACKAGES[args.package]
+    sys.path.insert(0, str(root))
+    agent = importlib.import_module(f"{package}.agent")
+    fake = importlib.import_module(f"{package}.utils.fake_client")
+
+    script = fake.FakeScript(
+        subagents=subagents,
+        model_latency=args.model_latency,
+        tool_latency=args.tool_latency,
+    )
+    prompts = [f"Simulated topic {turn + 1}" for turn in range(args.turns)]
+    tool_calls = args.sessions * args.turns * len(subagents) * (len(script.tool_calls) + 1)
+
+    lag: List[float] = []
+    monitor = asyncio.create_task(monitor_loop_lag(lag))
+    with tempfile.TemporaryDirectory() as tmp:
+        client_factory = functools.partial(fake.FakeClaudeSDKClient, script=script)
+        sessions = [
+            agent.chat(client_factory=client_factory, prompts=prompts, logs_dir=Path(tmp) / f"sim_{i:04d}")
+            for i in range(args.sessions)
+        ]
+
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        # Console rendering still runs, into a buffer instead of the terminal
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = await asyncio.gather(*sessions, return_exceptions=True)
+        wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+        monitor.cancel()
+
+        errors = [r for r in results if isinstance(r, BaseException)]
+        session_dirs = list(Path(tmp).glob("sim_*/session_*"))
+
+    lag.sort()
+    print(f"package:            {args.package}")
+    print(f"sessions:           {args.sessions} x {args.turns} turns ({len(session_dirs)} session dirs)")
+    print(f"simulated calls:    {tool_calls:,} tool calls incl. Task")
+    print(f"wall time:          {wall:.2f} s")
+    print(f"cpu time:           {cpu:.2f} s ({cpu / wall:.0%} of wall)")
+    print(f"throughput:         {tool_calls / wall:,.0f} tool calls/s")
+    if lag:
+        print(
+            f"event loop lag:     p50 {statistics.median(lag) * 1000:.1f} ms, "
+            f"p99 {lag[min(len(lag) - 1, int(len(lag) * 0.99))] * 1000:.1f} ms, max {lag[-1] * 1000:.1f} ms"
+        )
+    if errors:
+        print(f"\n{len(errors)} session(s) failed, first error: {errors[0]!r}")
+        return 1
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--package", choices=list(PACKAGES), default="research")
+    parser.add_argument("--sessions", type=int, default=100, help="Concurrent simulated sessions")
+    parser.add_argument("--turns", type=int, default=2, help="User turns per session")
+    parser.add_argument("--model-latency", type=float, default=0.05, help="Seconds before each streamed message")
+    parser.add_argument("--tool-latency", type=float, default=0.1, help="Seconds each tool call takes")
+    args = parser.parse_args()
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,31 @@
 """Entry point for research agent using AgentDefinition for subagents."""
 
+import argparse
 import asyncio
+import json
 import os
+import re
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import datetime
 from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
 from dotenv import load_dotenv
 from claude_agent_sdk import ClaudeSDKClient, ClaudeAgentOptions, AgentDefinition, HookMatcher
 
+from research_agent.utils.checkpoint import Checkpointer, SessionCheckpoint
+from research_agent.utils.dedup import make_dedup_hook
+from research_agent.utils.digest import make_digest_hook
+from research_agent.utils.metrics import start_metrics_server
+from research_agent.utils.note_search import NOTE_SEARCH_TOOL, NOTES_SERVER_NAME, NoteIndex
+from research_agent.utils.retention import SessionLock, decompress_session, retention_from_env
+from research_agent.utils.search_proxy import PROXY_SERVER_NAME, PROXY_TOOL, TAVILY_TOOL, search_proxy_from_env
 from research_agent.utils.subagent_tracker import SubagentTracker
+from research_agent.utils.tracing import SessionTracer
 from research_agent.utils.transcript import setup_session, TranscriptWriter
-from research_agent.utils.message_handler import process_assistant_message
+from research_agent.utils.usage import UsageTracker, budget_from_env
+from research_agent.utils.message_handler import get_renderer
 
 # Load environment variables
 load_dotenv()
@@ -24,33 +41,18 @@ def load_prompt(filename: str) -> str:
         return f.read().strip()
 
 
-async def chat():
-    """Start interactive chat with the research agent."""
+def build_agents(search_tool: str = TAVILY_TOOL) -> Dict[str, AgentDefinition]:
+    """Define the specialized subagents (shared by chat and the orchestrator).
 
-    # Check API key first, before creating any files
-    if not os.environ.get("ANTHROPIC_API_KEY"):
-        print("\nError: ANTHROPIC_API_KEY not found.")
-        print("Set it in a .env file or export it in your shell.")
-        print("Get your key at: https://console.anthropic.com/settings/keys\n")
-        return
-
-    # Setup session directory and transcript
-    transcript_file, session_dir = setup_session()
-
-    # Create transcript writer
-    transcript = TranscriptWriter(transcript_file)
-
-    # Load prompts
-    lead_agent_prompt = load_prompt("lead_agent.txt")
-    researcher_prompt = load_prompt("researcher.txt")
+    Args:
+        search_tool: Web search tool of the researcher (``PROXY_TOOL`` when
+            the caching search proxy is enabled); the prompt is updated to match
+    """
+    researcher_prompt = load_prompt("researcher.txt").replace(TAVILY_TOOL, search_tool)
     data_analyst_prompt = load_prompt("data_analyst.txt")
     report_writer_prompt = load_prompt("report_writer.txt")
 
-    # Initialize subagent tracker with transcript writer and session directory
-    tracker = SubagentTracker(transcript_writer=transcript, session_dir=session_dir)
-
-    # Define specialized subagents
-    agents = {
+    return {
         "researcher": AgentDefinition(
             description=(
                 "Use this agent when you need to gather research information on any topic. "
@@ -59,8 +61,8 @@ async def chat():
                 "for later use by report writers. Ideal for complex research tasks "
                 "that require deep searching and cross-referencing."
             ),
-            # Tavily MCP（tool 名：mcp__tavily__tavily-search）
-            tools=["mcp__tavily__tavily-search", "Write"],
+            # Tavily MCP（tool 名：mcp__tavily__tavily-search），或其缓存代理
+            tools=[search_tool, "Write"],
             prompt=researcher_prompt,
             model="haiku"
         ),
@@ -72,7 +74,7 @@ async def chat():
                 "charts using Python/matplotlib via Bash. Saves charts to files/charts/ and writes "
                 "a data summary to files/data/. Use this before the report-writer to add visual insights."
             ),
-            tools=["Glob", "Read", "Bash", "Write"],
+            tools=["Glob", "Read", "Bash", "Write", NOTE_SEARCH_TOOL],
             prompt=data_analyst_prompt,
             model="haiku"
         ),
@@ -85,24 +87,185 @@ async def chat():
                 "Ideal for creating structured documents with proper citations, data, and embedded visuals. "
                 "Does NOT conduct web searches - only reads existing research notes and creates PDF reports."
             ),
-            tools=["Skill", "Write", "Glob", "Read", "Bash"],
+            tools=["Skill", "Write", "Glob", "Read", "Bash", NOTE_SEARCH_TOOL],
             prompt=report_writer_prompt,
             model="haiku"
         )
     }
 
+
+async def run_turn(
+    client: Any,
+    user_input: str,
+    transcript: TranscriptWriter,
+    tracker: SubagentTracker,
+    tracer: SessionTracer,
+    usage: UsageTracker,
+    checkpointer: Optional[Checkpointer] = None
+):
+    """Send one user message and process the streamed response."""
+    # Write user input to transcript (file only, not console)
+    transcript.write_to_file(f"\nYou: {user_input}\n")
+
+    # Send to agent
+    tracer.start_turn(user_input)
+    await client.query(prompt=user_input)
+
+    transcript.write("\nAgent: ", end="")
+
+    # Formatting state lives in the session's own renderer
+    renderer = get_renderer(transcript, tracker)
+
+    # Stream and process response
+    interrupted = False
+    async for msg in client.receive_response():
+        if type(msg).__name__ == 'StreamEvent':
+            # Partial text (only with --stream); the full message follows
+            renderer.process_stream_event(msg)
+        elif type(msg).__name__ == 'AssistantMessage':
+            usage.record_assistant(msg)
+            renderer.process_assistant_message(msg)
+            if checkpointer:
+                checkpointer.after_message()
+        elif type(msg).__name__ == 'ResultMessage':
+            usage.record_result(msg)
+
+        if checkpointer:
+            checkpointer.observe(msg)
+
+        # Stop the turn as soon as a budget is exceeded
+        if usage.budget_exceeded and not interrupted:
+            interrupted = True
+            await client.interrupt()
+
+    transcript.write("\n")
+    tracer.end_turn()
+    if checkpointer:
+        checkpointer.end_turn()
+
+
+async def chat(
+    client_factory: Callable[..., Any] = ClaudeSDKClient,
+    prompts: Optional[Iterable[str]] = None,
+    logs_dir: Path = Path("logs"),
+    stream: bool = False,
+    resume: Optional[Path] = None,
+    cwd: Optional[Path] = None,
+    console: bool = True
+) -> Optional[Path]:
+    """Start interactive chat with the research agent.
+
+    Args:
+        client_factory: Called with ``options=`` to create the client; pass
+            ``FakeClaudeSDKClient`` (or a partial of it) to simulate sessions
+        prompts: User messages to send instead of reading from stdin
+        logs_dir: Directory that session folders are created in
+        stream: Render text as it is generated (partial message events)
+        resume: Session directory to reattach to (from its checkpoint.json)
+        cwd: Working directory of the agents, i.e. where files/ is written
+        console: Render to the terminal (False for headless batch jobs)
+
+    Returns:
+        The session directory (None if the session could not start)
+    """
+
+    # Check API key first, before creating any files
+    if client_factory is ClaudeSDKClient and not os.environ.get("ANTHROPIC_API_KEY"):
+        print("\nError: ANTHROPIC_API_KEY not found.")
+        print("Set it in a .env file or export it in your shell.")
+        print("Get your key at: https://console.anthropic.com/settings/keys\n")
+        return
+
+    if resume:
+        # Reattach to an earlier session: its checkpoint has the SDK session id
+        # and subagent numbering; all logs are appended to
+        session_dir = Path(resume)
+        try:
+            checkpoint = SessionCheckpoint.load(session_dir)
+        except FileNotFoundError:
+            print(f"\nError: no checkpoint found in {session_dir}\n")
+            return
+        session_lock = SessionLock(session_dir)
+        if not session_lock.acquire():
+            print(f"\nError: {session_dir} is still open in another session\n")
+            return
+        decompress_session(session_dir)
+        transcript_file = session_dir / "transcript.txt"
+        interrupted_turn = transcript_file.exists() and transcript_file.stat().st_size > checkpoint.transcript_offset
+    else:
+        # Setup session directory and transcript
+        transcript_file, session_dir = setup_session(logs_dir)
+        checkpoint = None
+        # Held until the session closes, so retention leaves it alone
+        session_lock = SessionLock(session_dir)
+        session_lock.acquire()
+
+    # Create transcript writer
+    transcript = TranscriptWriter(transcript_file, append=bool(resume), console=console)
+
+    # Researchers search through the caching proxy when it is enabled
+    search_proxy = search_proxy_from_env()
+    search_tool = PROXY_TOOL if search_proxy else TAVILY_TOOL
+
+    # Load lead agent prompt (subagent prompts are loaded by build_agents)
+    lead_agent_prompt = load_prompt("lead_agent.txt").replace(TAVILY_TOOL, search_tool)
+
+    # Initialize subagent tracker with transcript writer and session directory
+    # (RESEARCH_LOG_FORMAT=compact writes tool_calls.bin instead of tool_calls.jsonl)
+    # Spans go to traces.otlp.jsonl (and OTEL_EXPORTER_OTLP_ENDPOINT if set)
+    tracer = SessionTracer(session_dir)
+    tracker = SubagentTracker(
+        transcript_writer=transcript,
+        session_dir=session_dir,
+        log_format=os.environ.get("RESEARCH_LOG_FORMAT", "jsonl"),
+        tracer=tracer,
+        append=bool(resume)
+    )
+
+    # Live counters on http://127.0.0.1:<RESEARCH_METRICS_PORT>/metrics (if set;
+    # interactive sessions only, concurrent batch jobs cannot share the port)
+    metrics = start_metrics_server(tracker, os.environ.get("RESEARCH_METRICS_PORT") if console else None)
+
+    # Token/cost accounting written to usage.json, with optional hard budgets
+    usage = UsageTracker(
+        session_dir=session_dir,
+        tracker=tracker,
+        max_tokens=budget_from_env("SESSION_MAX_TOKENS", int),
+        max_cost_usd=budget_from_env("SESSION_MAX_COST_USD")
+    )
+
+    # Checkpoint after every turn and subagent spawn (for --resume)
+    if checkpoint:
+        tracker.restore_state(checkpoint.tracker)
+        usage.restore()
+    checkpointer = Checkpointer(session_dir, tracker, transcript, checkpoint)
+
+    # Define specialized subagents
+    agents = build_agents(search_tool)
+
+    # Where the agents write their notes, charts and reports
+    files_dir = (cwd or Path.cwd()) / "files"
+
     # Set up hooks for tracking
     hooks = {
         'PreToolUse': [
             HookMatcher(
                 matcher=None,  # Match all tools
                 hooks=[tracker.pre_tool_use_hook]
+            ),
+            HookMatcher(
+                matcher="Task",  # Deduplicated notes and digests for data-analyst/report-writer
+                hooks=[make_dedup_hook(files_dir), make_digest_hook(files_dir)]
             )
         ],
         'PostToolUse': [
             HookMatcher(
                 matcher=None,  # Match all tools
                 hooks=[tracker.post_tool_use_hook]
+            ),
+            HookMatcher(
+                matcher="Task",  # Subagent usage from Task results
+                hooks=[usage.task_post_tool_use_hook]
             )
         ]
     }
@@ -116,50 +279,196 @@ async def chat():
         allowed_tools=["Task"],
         agents=agents,
         hooks=hooks,
-        model="haiku"
+        model="haiku",
+        include_partial_messages=stream,
+        resume=checkpoint.sdk_session_id if checkpoint else None,
+        cwd=cwd,
+        mcp_servers={
+            # BM25 search over the notes for the data-analyst and report-writer
+            NOTES_SERVER_NAME: NoteIndex(files_dir / "research_notes").create_server(),
+            **({PROXY_SERVER_NAME: search_proxy.create_server()} if search_proxy else {})
+        }
     )
 
-    print("\n" + "=" * 50)
-    print("  Research Agent")
-    print("=" * 50)
-    print("\nResearch any topic and get a comprehensive PDF")
-    print("report with data visualizations.")
-    print("\nType 'exit' to quit.\n")
+    if console:
+        print("\n" + "=" * 50)
+        print("  Research Agent")
+        print("=" * 50)
+        print("\nResearch any topic and get a comprehensive PDF")
+        print("report with data visualizations.")
+        print("\nType 'exit' to quit.\n")
+    if metrics:
+        print(f"Metrics: {metrics.url}\n")
+    if checkpoint:
+        note = ", last turn was interrupted" if interrupted_turn else ""
+        transcript.write(f"\n[Resumed session after {checkpoint.turns} turns{note}]\n")
 
     try:
-        async with ClaudeSDKClient(options=options) as client:
+        async with client_factory(options=options) as client:
+            inputs = iter(prompts) if prompts is not None else None
             while True:
-                # Get input
+                # Get input (after the agent's output has reached the console)
+                transcript.flush_console()
                 try:
-                    user_input = input("\nYou: ").strip()
+                    user_input = next(inputs, "") if inputs is not None else input("\nYou: ").strip()
                 except (EOFError, KeyboardInterrupt):
                     break
 
                 if not user_input or user_input.lower() in ["exit", "quit", "q"]:
                     break
 
-                # Write user input to transcript (file only, not console)
-                transcript.write_to_file(f"\nYou: {user_input}\n")
-
-                # Send to agent
-                await client.query(prompt=user_input)
-
-                transcript.write("\nAgent: ", end="")
-
-                # Stream and process response
-                async for msg in client.receive_response():
-                    if type(msg).__name__ == 'AssistantMessage':
-                        process_assistant_message(msg, tracker, transcript)
+                await run_turn(client, user_input, transcript, tracker, tracer, usage, checkpointer)
 
-                transcript.write("\n")
+                if usage.budget_exceeded:
+                    transcript.write(f"\n[Session stopped: {usage.budget_exceeded}]\n")
+                    break
     finally:
         transcript.write("\n\nGoodbye!\n")
+        checkpointer.close()
         transcript.close()
-        tracker.close()
-        print(f"\nSession logs saved to: {session_dir}")
-        print(f"  - Transcript: {transcript_file}")
-        print(f"  - Tool calls: {session_dir / 'tool_calls.jsonl'}")
+        await tracker.aclose()
+        if metrics:
+            metrics.stop()
+        usage.save()
+        session_lock.release()
+        if console:
+            print(f"\nSession logs saved to: {session_dir}")
+            print(f"  - Transcript: {transcript_file}")
+            print(f"  - Tool calls: {tracker.tool_log_writer.path}")
+            print(f"  - Usage: {usage.usage_path} (${usage.total_cost_usd:.4f}, {usage.session_tokens:,} tokens)")
+            if search_proxy:
+                print(f"  - Search proxy: {search_proxy.summary()}")
+
+            # Compress closed sessions / enforce RESEARCH_LOGS_MAX_MB (if configured);
+            # batch runs do this once, after all their jobs have finished
+            retention = retention_from_env(session_dir.parent, closed=session_dir)
+            if retention:
+                print(f"  - Retention: compressed {len(retention.compressed)} files, "
+                      f"evicted {len(retention.evicted)} sessions ({retention.bytes_after / 1e6:,.1f} MB in logs/)")
+
+    return session_dir
+
+
+@dataclass
+class BatchJob:
+    """One topic of a batch run and, once finished, its outcome."""
+    index: int
+    topic: str
+    workspace: Path
+    session_dir: Optional[Path] = None
+    duration_s: float = 0.0
+    cost_usd: float = 0.0
+    report: Optional[Path] = None
+    error: Optional[str] = None
+
+
+def load_topics(path: Path) -> List[str]:
+    """Read one topic per line, skipping blank lines and # comments."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def _slug(text: str, max_length: int = 40) -> str:
+    slug = re.sub(r"\W+", "-", text.lower()).strip("-")
+    return slug[:max_length].rstrip("-") or "topic"
+
+
+async def run_batch(
+    topics_file: Path,
+    concurrency: int = 4,
+    client_factory: Callable[..., Any] = ClaudeSDKClient,
+    logs_dir: Path = Path("logs"),
+    workspace_root: Path = Path("batch")
+) -> List[BatchJob]:
+    """Research every topic of ``topics_file`` as an independent headless session.
+
+    At most ``concurrency`` jobs run at a time. Each job gets its own session
+    directory under ``logs_dir`` and its own ``files/`` workspace under
+    ``workspace_root/batch_<timestamp>/``, where ``summary.json`` lists the
+    duration, cost and report of every job.
+    """
+    if client_factory is ClaudeSDKClient and not os.environ.get("ANTHROPIC_API_KEY"):
+        print("\nError: ANTHROPIC_API_KEY not found.")
+        print("Set it in a .env file or export it in your shell.\n")
+        return []
+
+    run_dir = Path(workspace_root) / f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+    jobs = [
+        BatchJob(index=i, topic=topic, workspace=run_dir / f"{i:03d}_{_slug(topic)}")
+        for i, topic in enumerate(load_topics(topics_file), 1)
+    ]
+    run_dir.mkdir(parents=True, exist_ok=True)
+    print(f"Batch: {len(jobs)} topics, {concurrency} at a time, workspaces in {run_dir}")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    finished = 0
+
+    async def run_job(job: BatchJob):
+        nonlocal finished
+        async with semaphore:
+            (job.workspace / "files").mkdir(parents=True, exist_ok=True)
+            print(f"[start {job.index:03d}] {job.topic}")
+            started = time.monotonic()
+            try:
+                job.session_dir = await chat(
+                    client_factory, prompts=[job.topic], logs_dir=logs_dir,
+                    cwd=job.workspace.resolve(), console=False
+                )
+            except Exception as e:
+                job.error = str(e) or type(e).__name__
+            job.duration_s = time.monotonic() - started
+
+        # Cost from the session's usage.json, report from the job's workspace
+        usage_path = job.session_dir / "usage.json" if job.session_dir else None
+        if usage_path and usage_path.exists():
+            with open(usage_path, "r", encoding="utf-8") as f:
+                job.cost_usd = json.load(f).get("total_cost_usd", 0.0)
+        reports = sorted((job.workspace / "files" / "reports").glob("*.pdf"), key=lambda p: p.stat().st_mtime)
+        job.report = reports[-1] if reports else None
+
+        finished += 1
+        status = f"failed: {job.error}" if job.error else (job.report or "no report")
+        print(f"[done {finished}/{len(jobs)}] {job.index:03d} {job.topic} "
+              f"({job.duration_s:.1f}s, ${job.cost_usd:.4f}) -> {status}")
+
+    started = time.monotonic()
+    await asyncio.gather(*(run_job(job) for job in jobs))
+    wall = time.monotonic() - started
+
+    # Retention once all jobs have closed their sessions (chat skips it when headless)
+    retention = retention_from_env(Path(logs_dir))
+    if retention:
+        print(f"Retention: compressed {len(retention.compressed)} files, "
+              f"evicted {len(retention.evicted)} sessions ({retention.bytes_after / 1e6:,.1f} MB in {logs_dir}/)")
+
+    print(f"\n{'#':>3}  {'duration':>9}  {'cost':>9}  report / error")
+    for job in jobs:
+        outcome = f"ERROR {job.error}" if job.error else (job.report or "(no report)")
+        print(f"{job.index:>3}  {job.duration_s:>8.1f}s  {f'${job.cost_usd:.4f}':>9}  {outcome}")
+    print(f"\n{len(jobs)} jobs in {wall:.1f}s (sequential would take {sum(j.duration_s for j in jobs):.1f}s), "
+          f"total ${sum(j.cost_usd for j in jobs):.4f}")
+
+    with open(run_dir / "summary.json", "w", encoding="utf-8") as f:
+        json.dump({
+            "wall_s": round(wall, 3),
+            "jobs": [
+                {**asdict(job), "workspace": str(job.workspace), "session_dir": str(job.session_dir or ""),
+                 "report": str(job.report or ""), "duration_s": round(job.duration_s, 3)}
+                for job in jobs
+            ],
+        }, f, indent=2, ensure_ascii=False)
+    print(f"Summary: {run_dir / 'summary.json'}")
+    return jobs
 
 
 if __name__ == "__main__":
-    asyncio.run(chat())
+    parser = argparse.ArgumentParser(description="Multi-agent research system")
+    parser.add_argument("--stream", action="store_true", help="Stream text token by token as it is generated")
+    parser.add_argument("--resume", type=Path, metavar="SESSION_DIR", help="Continue a session from its checkpoint")
+    parser.add_argument("--batch", type=Path, metavar="TOPICS_FILE", help="Research each line of a file, headless")
+    parser.add_argument("--concurrency", type=int, default=4, help="Batch jobs to run at once (default: 4)")
+    args = parser.parse_args()
+    if args.batch:
+        asyncio.run(run_batch(args.batch, concurrency=max(1, args.concurrency)))
+    else:
+        asyncio.run(chat(stream=args.stream, resume=args.resume))
@@ -0,0 +1,420 @@
+"""Orchestrator mode: fan a topic out to parallel researcher runs.
+
+Instead of letting the lead agent decide when to spawn researchers through
+``Task``, the orchestrator drives the pipeline from Python:
+
+1. a planner query splits the topic into N subtopics;
+2. one researcher query per subtopic runs concurrently (at most
+   ``concurrency`` at a time), each saving notes to files/research_notes/;
+3. the notes are deduplicated (see utils/dedup.py), then the data-analyst
+   and the report-writer (from the notes' digest, see utils/digest.py) run
+   once over all of them.
+
+Research wall-clock time is that of the slowest subtopic instead of the
+sum of all of them. Every run is registered with the session's
+SubagentTracker as a subagent (RESEARCHER-1, RESEARCHER-2, ...), so tool
+calls, traces, metrics and usage are attributed exactly as for subagents
+spawned through Task. The inputs and artifacts of each stage are recorded
+in files/manifest.json (see utils/manifest.py); with ``--incremental``,
+stages that are up to date are skipped.
+
+Usage:
+    python -m research_agent.orchestrator "AI chip market 2025"
+    python -m research_agent.orchestrator "AI chip market 2025" --subtopics 6 --concurrency 3
+    python -m research_agent.orchestrator "AI chip market 2025" --incremental
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from claude_agent_sdk import ClaudeSDKClient, ClaudeAgentOptions, AgentDefinition, HookMatcher
+
+from research_agent.agent import PROMPTS_DIR, build_agents, load_prompt
+from research_agent.utils.dedup import build_dedup_view
+from research_agent.utils.digest import build_digest
+from research_agent.utils.manifest import ArtifactManifest, prompt_versions
+from research_agent.utils.metrics import start_metrics_server
+from research_agent.utils.note_search import NOTES_SERVER_NAME, NoteIndex
+from research_agent.utils.retention import SessionLock, retention_from_env
+from research_agent.utils.search_proxy import PROXY_SERVER_NAME, PROXY_TOOL, SearchProxy, search_proxy_from_env
+from research_agent.utils.subagent_tracker import SubagentTracker
+from research_agent.utils.tracing import SessionTracer
+from research_agent.utils.transcript import setup_session, TranscriptWriter
+from research_agent.utils.usage import UsageTracker, budget_from_env
+
+# Used when the planner's answer is not a usable JSON array
+FALLBACK_ANGLES = [
+    "market size and growth",
+    "key players and market share",
+    "technology and recent developments",
+    "adoption and use cases",
+    "regulation and risks",
+    "outlook and forecasts",
+]
+
+RESEARCH_PROMPT = (
+    'Research this subtopic of "{topic}": {subtopic}\n\n'
+    "Save your findings to files/research_notes/ as a markdown file named after the subtopic."
+)
+ANALYSIS_PROMPT = (
+    'Analyze all research notes in files/research_notes/ about "{topic}". Extract the quantitative '
+    "data, generate charts in files/charts/ and write a data summary to files/data/."
+)
+REPORT_PROMPT = (
+    'Write a PDF research report on "{topic}" to files/reports/ from the digest of the research notes '
+    "in files/research_digest.md (details in files/research_notes/), the data summary in files/data/ "
+    "and the charts in files/charts/."
+)
+
+
+@dataclass
+class StageRun:
+    """Outcome of one agent run started by the orchestrator."""
+    subagent_id: str
+    description: str
+    duration_s: float
+    text: str = ""
+    usage: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+
+def parse_subtopics(text: str, topic: str, count: int) -> List[str]:
+    """Read the planner's JSON array of subtopics, topping it up with standard angles."""
+    subtopics: List[str] = []
+    match = re.search(r"\[.*\]", text, re.DOTALL)
+    if match:
+        try:
+            subtopics = [s.strip() for s in json.loads(match.group(0)) if isinstance(s, str) and s.strip()]
+        except json.JSONDecodeError:
+            pass
+    for angle in FALLBACK_ANGLES:
+        if len(subtopics) >= count:
+            break
+        subtopics.append(f"{topic}: {angle}")
+    return subtopics[:count]
+
+
+class ResearchOrchestrator:
+    """Runs planner, researcher, analyst and writer queries for one session."""
+
+    def __init__(
+        self,
+        client_factory: Callable[..., Any],
+        transcript: TranscriptWriter,
+        tracker: SubagentTracker,
+        usage: UsageTracker,
+        agents: Dict[str, AgentDefinition],
+        concurrency: int = 4,
+        search_proxy: Optional[SearchProxy] = None
+    ):
+        self.client_factory = client_factory
+        self.transcript = transcript
+        self.tracker = tracker
+        self.usage = usage
+        self.agents = agents
+        self.concurrency = concurrency
+        self.search_proxy = search_proxy
+        self.note_index = NoteIndex(Path("files/research_notes"))
+        self._runs = 0
+
+        # Every run reports its tool calls to the shared tracker
+        self.hooks = {
+            'PreToolUse': [HookMatcher(matcher=None, hooks=[tracker.pre_tool_use_hook])],
+            'PostToolUse': [HookMatcher(matcher=None, hooks=[tracker.post_tool_use_hook])]
+        }
+
+    def _options(self, system_prompt: str, tools: List[str], model: str = "haiku") -> ClaudeAgentOptions:
+        return ClaudeAgentOptions(
+            permission_mode="bypassPermissions",
+            # User-level MCP config provides Tavily (see agent.py)
+            setting_sources=["user", "project"],
+            system_prompt=system_prompt,
+            allowed_tools=tools,
+            hooks=self.hooks,
+            model=model,
+            mcp_servers={
+                NOTES_SERVER_NAME: self.note_index.create_server(),
+                **({PROXY_SERVER_NAME: self.search_proxy.create_server()} if self.search_proxy else {})
+            }
+        )
+
+    async def _query(
+        self,
+        options: ClaudeAgentOptions,
+        prompt: str,
+        owner: Optional[str] = None
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Run one query to completion; returns its last text block and token usage.
+
+        Tool calls are attributed to ``owner`` (a registered subagent), since
+        each run streams its messages as a top-level agent.
+        """
+        text, usage = "", None
+        interrupted = False
+        async with self.client_factory(options=options) as client:
+            await client.query(prompt=prompt)
+            async for msg in client.receive_response():
+                if type(msg).__name__ == 'AssistantMessage':
+                    self.usage.record_assistant(msg)
+                    for block in msg.content:
+                        if type(block).__name__ == 'ToolUseBlock':
+                            self.tracker.record_tool_owner(block.id, owner)
+                        elif type(block).__name__ == 'TextBlock':
+                            text = block.text
+                elif type(msg).__name__ == 'ResultMessage':
+                    usage = getattr(msg, 'usage', None)
+                    if owner:
+                        self.usage.record_run(msg)
+                    else:
+                        self.usage.record_result(msg)
+
+                # Stop the run as soon as a budget is exceeded
+                if self.usage.budget_exceeded and not interrupted:
+                    interrupted = True
+                    await client.interrupt()
+        return text, usage
+
+    async def plan(self, topic: str, count: int) -> List[str]:
+        """Ask the planner to split ``topic`` into ``count`` subtopics."""
+        options = self._options(load_prompt("planner.txt"), [])
+        text, _ = await self._query(options, f"Topic: {topic}\nNumber of subtopics: {count}")
+        return parse_subtopics(text, topic, count)
+
+    async def run_agent(self, agent_type: str, description: str, prompt: str) -> StageRun:
+        """Run one agent query as a tracked subagent."""
+        definition = self.agents[agent_type]
+        self._runs += 1
+        # Stands in for the Task tool_use_id that would own this subagent
+        run_id = f"orchestrator_{self._runs:03d}"
+        subagent_id = self.tracker.register_subagent_spawn(
+            tool_use_id=run_id,
+            subagent_type=agent_type,
+            description=description,
+            prompt=prompt
+        )
+        self.transcript.write(f"\n[🚀 Spawning {subagent_id}: {description}]\n")
+
+        run = StageRun(subagent_id=subagent_id, description=description, duration_s=0.0)
+        started = time.monotonic()
+        try:
+            run.text, run.usage = await self._query(
+                self._options(definition.prompt, definition.tools, definition.model), prompt, owner=run_id
+            )
+        except Exception as e:
+            run.error = str(e) or type(e).__name__
+        finally:
+            run.duration_s = time.monotonic() - started
+            # Close the subagent the way a finished Task would (span, usage, metrics)
+            completion = {
+                "tool_name": "Task",
+                "tool_input": {"subagent_type": agent_type, "description": description},
+                "tool_response": {
+                    "content": [{"type": "text", "text": run.text}],
+                    "totalDurationMs": int(run.duration_s * 1000),
+                    "totalToolUseCount": self.tracker.sessions[run_id].tool_call_count,
+                    "usage": run.usage,
+                    **({"error": run.error} if run.error else {}),
+                },
+            }
+            await self.tracker.post_tool_use_hook(completion, run_id, None)
+            # Its tokens were counted from the run's own result
+            self.usage.record_subagent(run_id, completion["tool_response"], counted=True)
+
+        status = f"failed: {run.error}" if run.error else "finished"
+        self.transcript.write(f"\n[{subagent_id} {status} in {run.duration_s:.1f}s]\n")
+        return run
+
+    async def research(self, topic: str, subtopics: List[str]) -> List[StageRun]:
+        """Research all subtopics concurrently, at most ``concurrency`` at a time."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def research_one(subtopic: str) -> StageRun:
+            async with semaphore:
+                return await self.run_agent("researcher", subtopic, RESEARCH_PROMPT.format(topic=topic, subtopic=subtopic))
+
+        return await asyncio.gather(*(research_one(subtopic) for subtopic in subtopics))
+
+
+async def orchestrate(
+    topic: str,
+    subtopics: int = 4,
+    concurrency: int = 4,
+    client_factory: Callable[..., Any] = ClaudeSDKClient,
+    logs_dir: Path = Path("logs"),
+    incremental: bool = False
+):
+    """Research ``topic`` with parallel researchers, then analyze and report once.
+
+    Args:
+        topic: Research topic
+        subtopics: Number of subtopics (and researcher runs)
+        concurrency: Maximum number of researcher runs at the same time
+        client_factory: Called with ``options=`` to create each client (see chat)
+        logs_dir: Directory that session folders are created in
+        incremental: Skip stages that are up to date according to files/manifest.json
+    """
+
+    # Check API key first, before creating any files
+    if client_factory is ClaudeSDKClient and not os.environ.get("ANTHROPIC_API_KEY"):
+        print("\nError: ANTHROPIC_API_KEY not found.")
+        print("Set it in a .env file or export it in your shell.\n")
+        return
+
+    # Same session layout and tracking as chat()
+    transcript_file, session_dir = setup_session(logs_dir)
+    # Held until the run ends, so retention leaves the session alone
+    session_lock = SessionLock(session_dir)
+    session_lock.acquire()
+    transcript = TranscriptWriter(transcript_file)
+    tracer = SessionTracer(session_dir)
+    tracker = SubagentTracker(
+        transcript_writer=transcript,
+        session_dir=session_dir,
+        log_format=os.environ.get("RESEARCH_LOG_FORMAT", "jsonl"),
+        tracer=tracer
+    )
+    metrics = start_metrics_server(tracker, os.environ.get("RESEARCH_METRICS_PORT"))
+    usage = UsageTracker(
+        session_dir=session_dir,
+        tracker=tracker,
+        max_tokens=budget_from_env("SESSION_MAX_TOKENS", int),
+        max_cost_usd=budget_from_env("SESSION_MAX_COST_USD")
+    )
+    search_proxy = search_proxy_from_env()
+    agents = build_agents(PROXY_TOOL) if search_proxy else build_agents()
+    orchestrator = ResearchOrchestrator(client_factory, transcript, tracker, usage, agents, concurrency, search_proxy)
+    # Which inputs produced which artifacts under files/ (always recorded, used by --incremental)
+    files_dir = Path("files")
+    manifest = ArtifactManifest(files_dir)
+
+    if metrics:
+        print(f"Metrics: {metrics.url}\n")
+
+    try:
+        tracer.start_turn(topic)
+        transcript.write(f"\nTopic: {topic}\n")
+
+        # With --incremental, stages whose inputs (notes, prompt versions, ...) match the
+        # manifest's record and whose artifacts still exist are skipped
+        async def run_stage(stage: str, inputs: Dict[str, Any], agent_type: str, description: str, prompt: str):
+            if incremental and manifest.is_fresh(topic, stage, inputs):
+                transcript.write(f"\n[Skipped {stage}: up to date ({len(manifest.outputs(topic, stage))} artifacts)]\n")
+                return
+            started_ns = time.time_ns()
+            run = await orchestrator.run_agent(agent_type, description, prompt)
+            if not run.error:
+                manifest.record(topic, stage, inputs, since_ns=started_ns)
+
+        research_inputs = {
+            "topic": topic,
+            "subtopics": subtopics,
+            "prompts": prompt_versions(PROMPTS_DIR, ["planner.txt", "researcher.txt"]),
+            "model": agents["researcher"].model,
+        }
+        research_failed = False
+        if incremental and manifest.is_fresh(topic, "research", research_inputs):
+            transcript.write(
+                f"\n[Skipped research: up to date ({len(manifest.outputs(topic, 'research'))} notes)]\n"
+            )
+        else:
+            started_ns = time.time_ns()
+
+            # 1. Plan
+            planned = await orchestrator.plan(topic, subtopics)
+            transcript.write("\nSubtopics:\n" + "".join(f"  {i}. {s}\n" for i, s in enumerate(planned, 1)))
+
+            # 2. Research in parallel
+            started = time.monotonic()
+            runs = await orchestrator.research(topic, planned)
+            wall = time.monotonic() - started
+            failed = [run for run in runs if run.error]
+            transcript.write(
+                f"\n[Research: {len(runs) - len(failed)}/{len(runs)} subtopics in {wall:.1f}s "
+                f"(sequential would take {sum(run.duration_s for run in runs):.1f}s)]\n"
+            )
+            research_failed = len(failed) == len(runs)
+            # Partial research is used for this report but redone by the next incremental run
+            if not failed:
+                manifest.record(topic, "research", research_inputs, since_ns=started_ns)
+
+        # 3. Analysis and report, once over all notes
+        if research_failed:
+            transcript.write("\n[Stopped: every researcher run failed]\n")
+        elif usage.budget_exceeded:
+            transcript.write(f"\n[Stopped: {usage.budget_exceeded}]\n")
+        else:
+            notes_dir = files_dir / "research_notes"
+            if notes_dir.is_dir():
+                dedup = await asyncio.to_thread(build_dedup_view, notes_dir)
+                transcript.write(
+                    f"\n[Dedup: {dedup.dropped} near-duplicate lines omitted from {dedup.notes} notes, "
+                    f"{len(dedup.clusters)} clusters of overlapping notes]\n"
+                )
+            notes = manifest.snapshot("research_notes")
+            await run_stage(
+                "analysis",
+                {
+                    "topic": topic,
+                    "notes": notes,
+                    "prompts": prompt_versions(PROMPTS_DIR, ["data_analyst.txt"]),
+                    "model": agents["data-analyst"].model,
+                },
+                "data-analyst", "Analyze research notes", ANALYSIS_PROMPT.format(topic=topic)
+            )
+            if not usage.budget_exceeded:
+                if notes_dir.is_dir():
+                    digest = await asyncio.to_thread(build_digest, notes_dir)
+                    transcript.write(
+                        f"\n[Digest: {digest.notes} notes ({digest.cached} cached), "
+                        f"{digest.chars_before:,} -> {digest.chars_after:,} characters]\n"
+                    )
+                await run_stage(
+                    "report",
+                    {
+                        "topic": topic,
+                        "notes": notes,
+                        "analysis": manifest.snapshot("charts", "data"),
+                        "prompts": prompt_versions(PROMPTS_DIR, ["report_writer.txt"]),
+                        "model": agents["report-writer"].model,
+                    },
+                    "report-writer", "Write the PDF report", REPORT_PROMPT.format(topic=topic)
+                )
+    finally:
+        tracer.end_turn()
+        transcript.close()
+        await tracker.aclose()
+        if metrics:
+            metrics.stop()
+        usage.save()
+        session_lock.release()
+        print(f"\nSession logs saved to: {session_dir}")
+        print(f"  - Transcript: {transcript_file}")
+        print(f"  - Tool calls: {tracker.tool_log_writer.path}")
+        print(f"  - Usage: {usage.usage_path} (${usage.total_cost_usd:.4f}, {usage.session_tokens:,} tokens)")
+        if search_proxy:
+            print(f"  - Search proxy: {search_proxy.summary()}")
+
+        retention = retention_from_env(session_dir.parent, closed=session_dir)
+        if retention:
+            print(f"  - Retention: compressed {len(retention.compressed)} files, "
+                  f"evicted {len(retention.evicted)} sessions ({retention.bytes_after / 1e6:,.1f} MB in logs/)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Research a topic with parallel researcher runs")
+    parser.add_argument("topic", help="Topic to research")
+    parser.add_argument("--subtopics", type=int, default=4, help="Number of subtopics to research (default: 4)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum researcher runs at once (default: 4)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Skip stages whose inputs and artifacts are unchanged (see files/manifest.json)")
+    args = parser.parse_args()
+    asyncio.run(orchestrate(
+        args.topic, subtopics=args.subtopics, concurrency=max(1, args.concurrency), incremental=args.incremental
+    ))
@@ -0,0 +1,98 @@
+"""Crash-safe checkpoints for resuming a research session.
+
+``checkpoint.json`` in the session directory records what is needed to
+reattach to a session after the CLI died:
+
+- the SDK session id, passed back as ``ClaudeAgentOptions(resume=...)`` so
+  the lead agent keeps its conversation (and the subagents' results);
+- the tracker's subagent state (``sessions``, ``subagent_counters``) so
+  new subagents keep numbering where the old process left off;
+- the transcript size at the last checkpoint and the number of completed
+  turns, so anything after it can be flagged as an interrupted turn.
+
+The file is rewritten atomically (temp file + rename) after every turn
+and every subagent spawn, so a crash never leaves a torn checkpoint.
+"""
+
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+CHECKPOINT_NAME = "checkpoint.json"
+
+
+@dataclass
+class SessionCheckpoint:
+    """State written to ``checkpoint.json`` after each turn and subagent spawn."""
+    sdk_session_id: Optional[str] = None
+    turns: int = 0
+    transcript_offset: int = 0
+    tracker: Dict[str, Any] = field(default_factory=dict)
+    saved_at: str = ""
+
+    def save(self, session_dir: Path):
+        """Atomically write the checkpoint to ``session_dir``."""
+        self.saved_at = datetime.now().isoformat()
+        path = Path(session_dir) / CHECKPOINT_NAME
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(asdict(self), f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, session_dir: Path) -> "SessionCheckpoint":
+        """Read the checkpoint of a session directory (FileNotFoundError if there is none)."""
+        with open(Path(session_dir) / CHECKPOINT_NAME, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        known = cls.__dataclass_fields__
+        return cls(**{key: value for key, value in data.items() if key in known})
+
+
+class Checkpointer:
+    """Snapshots tracker and transcript state into a ``SessionCheckpoint``."""
+
+    def __init__(self, session_dir: Path, tracker: Any, transcript: Any, state: Optional[SessionCheckpoint] = None):
+        self.session_dir = Path(session_dir)
+        self.tracker = tracker
+        self.transcript = transcript
+        self.state = state or SessionCheckpoint()
+        self._spawned = sum(tracker.subagent_counters.values())
+
+    def observe(self, msg: Any):
+        """Pick up the SDK session id from the init SystemMessage or a ResultMessage."""
+        msg_type = type(msg).__name__
+        session_id = None
+        if msg_type == 'SystemMessage' and getattr(msg, 'subtype', None) == 'init':
+            session_id = (getattr(msg, 'data', None) or {}).get('session_id')
+        elif msg_type == 'ResultMessage':
+            session_id = getattr(msg, 'session_id', None)
+        if session_id and session_id != self.state.sdk_session_id:
+            self.state.sdk_session_id = session_id
+            self.save()
+
+    def after_message(self):
+        """Checkpoint if the last message spawned subagents."""
+        spawned = sum(self.tracker.subagent_counters.values())
+        if spawned != self._spawned:
+            self._spawned = spawned
+            self.save()
+
+    def end_turn(self):
+        """Checkpoint a completed turn, including the transcript position."""
+        self.state.turns += 1
+        self.state.transcript_offset = self.transcript.position()
+        self.save()
+
+    def close(self):
+        """Final checkpoint when the session ends cleanly (nothing after it is an interrupted turn)."""
+        self.state.transcript_offset = self.transcript.position()
+        self.save()
+
+    def save(self):
+        self.state.tracker = self.tracker.checkpoint_state()
+        self.state.save(self.session_dir)
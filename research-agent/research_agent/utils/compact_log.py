@@ -0,0 +1,266 @@
+"""Compact binary tool call log with dictionary-encoded strings.
+
+``tool_calls.bin`` is an alternative to ``tool_calls.jsonl`` that keeps
+only what analytics need: event kind, time, agent/tool identity, sizes,
+durations and a short input preview. Full tool payloads are not stored.
+
+Layout: a 5-byte header (``RATL`` + version) followed by length-prefixed
+frames ``<kind:u8><length:u32><payload>``:
+
+- ``DICT`` frames assign an integer id to a low-cardinality string
+  (agent_id, agent_type, tool_name, parent_tool_use_id) the first time
+  it appears, so events carry 4-byte references instead of strings.
+- ``EVENT`` frames hold a fixed struct followed by two length-prefixed
+  strings: the tool_use_id and a preview (input preview for starts,
+  error message for completions).
+
+Usage:
+    python -m research_agent.utils.compact_log convert logs/session_*
+    python -m research_agent.utils.compact_log stats logs/session_*
+"""
+
+import argparse
+import json
+import math
+import struct
+import sys
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from research_agent.utils.bounded_format import bounded_json, estimate_size
+from research_agent.utils.retention import SUFFIXES, find_log, open_log, read_log_bytes
+
+MAGIC = b"RATL\x01"
+COMPACT_LOG_NAME = "tool_calls.bin"
+
+FRAME_DICT = 0
+FRAME_EVENT = 1
+
+EVENT_NAMES = ["tool_call_start", "tool_call_complete"]
+EVENT_CODES = {name: code for code, name in enumerate(EVENT_NAMES)}
+
+NO_REF = 0xFFFFFFFF
+PREVIEW_LENGTH = 200
+
+_FRAME_HEADER = struct.Struct("<BI")
+_EVENT = struct.Struct("<BdIIIIbQf")
+_STR_LEN = struct.Struct("<I")
+_DICT_ID = struct.Struct("<I")
+
+# Columns returned by read_columns, in storage order
+COLUMNS = [
+    "event", "ts", "agent_id", "agent_type", "tool_name", "parent_tool_use_id",
+    "success", "size", "duration_ms", "tool_use_id", "preview",
+]
+
+
+def _preview_input(tool_input: Any) -> tuple[str, int]:
+    """Return a short preview of the tool input and its estimated serialized size."""
+    if tool_input is None:
+        return "", 0
+    return bounded_json(tool_input, PREVIEW_LENGTH)[0], estimate_size(tool_input)
+
+
+def _parse_timestamp(value: Any) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class CompactEncoder:
+    """Stateful encoder turning tracker log entries into compact frames."""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+
+    def _ref(self, value: Optional[str], out: List[bytes]) -> int:
+        if value is None:
+            return NO_REF
+        ref = self._ids.get(value)
+        if ref is None:
+            ref = self._ids[value] = len(self._ids)
+            payload = _DICT_ID.pack(ref) + value.encode("utf-8")
+            out.append(_FRAME_HEADER.pack(FRAME_DICT, len(payload)) + payload)
+        return ref
+
+    def encode(self, entry: Dict[str, Any]) -> bytes:
+        """Encode one log entry (plus any new dictionary frames) as bytes."""
+        out: List[bytes] = []
+        event = EVENT_CODES.get(entry.get("event"), 0)
+
+        if event == EVENT_CODES["tool_call_start"]:
+            preview, size = _preview_input(entry.get("tool_input"))
+            success = -1
+        else:
+            preview = entry.get("error") or ""
+            size = entry.get("output_size") or 0
+            success = 1 if entry.get("success") else 0
+
+        duration = entry.get("duration_ms")
+        fixed = _EVENT.pack(
+            event,
+            _parse_timestamp(entry.get("timestamp")),
+            self._ref(entry.get("agent_id"), out),
+            self._ref(entry.get("agent_type"), out),
+            self._ref(entry.get("tool_name"), out),
+            self._ref(entry.get("parent_tool_use_id"), out),
+            success,
+            size,
+            math.nan if duration is None else duration,
+        )
+        tool_use_id = str(entry.get("tool_use_id") or "").encode("utf-8")
+        preview_bytes = str(preview).encode("utf-8")
+        payload = b"".join((
+            fixed,
+            _STR_LEN.pack(len(tool_use_id)), tool_use_id,
+            _STR_LEN.pack(len(preview_bytes)), preview_bytes,
+        ))
+        out.append(_FRAME_HEADER.pack(FRAME_EVENT, len(payload)) + payload)
+        return b"".join(out)
+
+
+def read_columns(path: Path) -> Dict[str, list]:
+    """Read a compact log (possibly compressed) into a dict of column lists (see COLUMNS)."""
+    data = read_log_bytes(Path(path))
+    if not data.startswith(MAGIC):
+        raise ValueError(f"{path} is not a compact tool call log")
+
+    columns: Dict[str, list] = {name: [] for name in COLUMNS}
+    strings: Dict[int, str] = {}
+    lookup = strings.get
+    event_size = _EVENT.size
+    offset = len(MAGIC)
+    end = len(data)
+
+    while offset < end:
+        kind, length = _FRAME_HEADER.unpack_from(data, offset)
+        offset += _FRAME_HEADER.size
+        if kind == FRAME_DICT:
+            (ref,) = _DICT_ID.unpack_from(data, offset)
+            strings[ref] = data[offset + _DICT_ID.size:offset + length].decode("utf-8")
+        elif kind == FRAME_EVENT:
+            event, ts, agent_id, agent_type, tool_name, parent, success, size, duration = (
+                _EVENT.unpack_from(data, offset)
+            )
+            pos = offset + event_size
+            (id_len,) = _STR_LEN.unpack_from(data, pos)
+            pos += _STR_LEN.size
+            tool_use_id = data[pos:pos + id_len].decode("utf-8")
+            pos += id_len
+            (preview_len,) = _STR_LEN.unpack_from(data, pos)
+            pos += _STR_LEN.size
+            preview = data[pos:pos + preview_len].decode("utf-8")
+
+            columns["event"].append(EVENT_NAMES[event])
+            columns["ts"].append(ts)
+            columns["agent_id"].append(lookup(agent_id))
+            columns["agent_type"].append(lookup(agent_type))
+            columns["tool_name"].append(lookup(tool_name))
+            columns["parent_tool_use_id"].append(lookup(parent))
+            columns["success"].append(None if success < 0 else bool(success))
+            columns["size"].append(size)
+            columns["duration_ms"].append(None if math.isnan(duration) else round(duration, 3))
+            columns["tool_use_id"].append(tool_use_id)
+            columns["preview"].append(preview)
+        offset += length
+
+    return columns
+
+
+def iter_events(path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield events from a compact log as dicts shaped like the JSONL entries."""
+    columns = read_columns(path)
+    for row in zip(*(columns[name] for name in COLUMNS)):
+        record = dict(zip(COLUMNS, row))
+        ts = record.pop("ts")
+        record["timestamp"] = datetime.fromtimestamp(ts).isoformat() if not math.isnan(ts) else None
+        yield record
+
+
+def convert_jsonl(jsonl_path: Path, out_path: Optional[Path] = None) -> Path:
+    """Convert an existing tool_calls.jsonl into the compact format."""
+    jsonl_path = Path(jsonl_path)
+    out_path = Path(out_path) if out_path else jsonl_path.with_name(COMPACT_LOG_NAME)
+    encoder = CompactEncoder()
+    with open_log(jsonl_path, "r") as src, open(out_path, "wb") as dst:
+        dst.write(MAGIC)
+        for line in src:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            dst.write(encoder.encode(entry))
+    return out_path
+
+
+def _session_logs(paths: List[str], name: str) -> Iterator[Path]:
+    for raw in paths:
+        path = Path(raw)
+        if path.is_dir():
+            candidate = find_log(path / name)
+            if candidate:
+                yield candidate
+        elif path.name in [name] + [name + suffix for suffix in SUFFIXES.values()]:
+            yield path
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m research_agent.utils.compact_log",
+        description="Convert and inspect compact tool call logs.",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    convert = sub.add_parser("convert", help="Convert tool_calls.jsonl files to tool_calls.bin")
+    convert.add_argument("paths", nargs="+", help="Session directories or tool_calls.jsonl files")
+    convert.add_argument("--remove-jsonl", action="store_true", help="Delete the JSONL file after converting")
+
+    stats = sub.add_parser("stats", help="Summarize tool calls across compact logs")
+    stats.add_argument("paths", nargs="+", help="Session directories or tool_calls.bin files")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "convert":
+        for jsonl_path in _session_logs(args.paths, "tool_calls.jsonl"):
+            out_path = convert_jsonl(jsonl_path)
+            before, after = jsonl_path.stat().st_size, out_path.stat().st_size
+            print(f"{jsonl_path} -> {out_path.name} ({before:,} -> {after:,} bytes)")
+            if args.remove_jsonl:
+                jsonl_path.unlink()
+        return 0
+
+    calls: Counter = Counter()
+    errors: Counter = Counter()
+    durations: Dict[tuple, float] = defaultdict(float)
+    for bin_path in _session_logs(args.paths, COMPACT_LOG_NAME):
+        columns = read_columns(bin_path)
+        for event, agent_type, tool_name, success, duration in zip(
+            columns["event"], columns["agent_type"], columns["tool_name"],
+            columns["success"], columns["duration_ms"],
+        ):
+            if event != "tool_call_complete":
+                continue
+            key = (agent_type, tool_name)
+            calls[key] += 1
+            if not success:
+                errors[key] += 1
+            if duration is not None:
+                durations[key] += duration
+
+    print(f"{'agent_type':<16}{'tool_name':<32}{'calls':>8}{'errors':>8}{'total s':>10}")
+    for key, count in calls.most_common():
+        agent_type, tool_name = key
+        print(f"{agent_type or '-':<16}{tool_name or '-':<32}{count:>8}{errors[key]:>8}{durations[key] / 1000:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,359 @@
+"""Near-duplicate detection across files/research_notes/ before synthesis.
+
+Parallel researchers often write overlapping notes: the same statistics,
+timelines, comparison tables and boilerplate, reworded slightly. The
+data-analyst and report-writer would read all of them in full, so before
+those stages run this pass builds a deduplicated view in
+``files/research_notes_dedup/``:
+
+- texts are tokenized with ``text.tokenize`` (so CJK notes work too),
+  shingled and summarized by a bottom-k MinHash signature: the ``k``
+  smallest 64-bit shingle hashes;
+- notes whose estimated similarity (over word/bigram sets) reaches
+  ``note_threshold`` with every member of a cluster are grouped, and the
+  clusters listed in ``_clusters.md``;
+- notes are then copied largest first, line by line (notes are bullet
+  lists, table rows and short paragraphs); a line that is a near-duplicate
+  (``line_threshold``, over 2-token shingles) of a line already kept from
+  another note is left out if all its figures appear in that line;
+- within a cluster, notes are also compared section by section (a heading
+  and the lines under it): a section similar (``section_threshold``, over
+  word/bigram sets) to a section of a larger note in the cluster loses
+  every line whose figures all appear in that section, so the larger
+  note's figures are kept and a reworded section shrinks to its heading
+  plus whatever it adds;
+- ``_clusters.md`` says how many lines each note lost and to which notes.
+  Headings, table headers and short lines are always kept, and so are lines with a
+  figure their match lacks ("USD 67 billion in 2024" is not a duplicate
+  of "USD 45 billion in 2023").
+
+Candidate pairs come from an inverted index over signature values, so
+similar lines are found without comparing every pair.
+
+The view is refreshed by ``dedup_hook`` whenever the lead agent spawns a
+data-analyst or report-writer, and by the orchestrator before analysis.
+It can also be built by hand:
+
+    python -m research_agent.utils.dedup files/research_notes
+    python -m research_agent.utils.dedup files/research_notes --line-threshold 0.6 --dry-run
+"""
+
+import argparse
+import asyncio
+import hashlib
+import heapq
+import logging
+import shutil
+import sys
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from research_agent.utils.text import tokenize
+
+logger = logging.getLogger(__name__)
+
+DEDUP_DIR_NAME = "research_notes_dedup"
+SIGNATURE_SIZE = 128
+# Lines with fewer tokens (labels, short list items) are never dropped
+MIN_LINE_TOKENS = 6
+# Subagents whose spawn triggers a refresh of the view
+SYNTHESIS_AGENTS = ("data-analyst", "report-writer")
+
+
+def _hash(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def shingles(tokens: List[str], size: int = 2) -> set:
+    """Overlapping ``size``-token windows (the whole text if it is shorter)."""
+    if len(tokens) <= size:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def signature(tokens: List[str], shingle_size: int = 2, k: int = SIGNATURE_SIZE) -> Tuple[int, ...]:
+    """Bottom-k MinHash signature of a token list: its k smallest shingle hashes, sorted."""
+    return tuple(heapq.nsmallest(k, {_hash(s) for s in shingles(tokens, shingle_size)}))
+
+
+def similarity(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+    """Estimate the Jaccard similarity of two shingle sets from their bottom-k signatures."""
+    if not a or not b:
+        return 0.0
+    # Membership of both sets is known only below the smaller signature's maximum
+    union_bottom = heapq.nsmallest(min(len(a), len(b)), set(a) | set(b))
+    shared = set(a) & set(b)
+    return sum(1 for h in union_bottom if h in shared) / len(union_bottom)
+
+
+class _SignatureIndex:
+    """Inverted index from signature values to items, for candidate lookup."""
+
+    def __init__(self):
+        self.signatures: List[Tuple[int, ...]] = []
+        self._postings: Dict[int, List[int]] = defaultdict(list)
+
+    def add(self, sig: Tuple[int, ...]) -> int:
+        item = len(self.signatures)
+        self.signatures.append(sig)
+        for h in sig:
+            self._postings[h].append(item)
+        return item
+
+    def best_match(
+        self,
+        sig: Tuple[int, ...],
+        threshold: float,
+        accept: Optional[Callable[[int], bool]] = None
+    ) -> Optional[Tuple[int, float]]:
+        """The most similar indexed item at or above ``threshold`` (and passing ``accept``), if any."""
+        counts: Dict[int, int] = defaultdict(int)
+        for h in sig:
+            for item in self._postings.get(h, ()):
+                counts[item] += 1
+        # Items sharing too few hashes cannot reach the threshold
+        min_shared = max(1, int(threshold * len(sig) / 2))
+        best = None
+        for item, shared in counts.items():
+            if shared < min_shared or (accept is not None and not accept(item)):
+                continue
+            score = similarity(sig, self.signatures[item])
+            if score >= threshold and (best is None or score > best[1]):
+                best = (item, score)
+        return best
+
+
+@dataclass
+class DedupReport:
+    """What a dedup pass found and how much it saved."""
+    notes: int = 0
+    clusters: List[List[str]] = field(default_factory=list)
+    # note name -> (lines omitted, notes that kept them)
+    omitted: Dict[str, Tuple[int, List[str]]] = field(default_factory=dict)
+    lines: int = 0
+    dropped: int = 0
+    chars_before: int = 0
+    chars_after: int = 0
+
+    @property
+    def saved_fraction(self) -> float:
+        return 1 - self.chars_after / self.chars_before if self.chars_before else 0.0
+
+
+def _cluster(names: List[str], sigs: List[Tuple[int, ...]], threshold: float) -> List[List[str]]:
+    """Greedy complete-linkage clusters: a note joins a cluster only if similar to all its members."""
+    clusters: List[List[int]] = []
+    for i in range(len(names)):
+        for cluster in clusters:
+            if all(similarity(sigs[i], sigs[j]) >= threshold for j in cluster):
+                cluster.append(i)
+                break
+        else:
+            clusters.append([i])
+    return sorted((sorted(names[i] for i in c) for c in clusters if len(c) > 1), key=lambda c: c[0])
+
+
+def _sections(text: str) -> List[List[str]]:
+    """Split a note into sections, each a heading line and the lines up to the next heading."""
+    sections: List[List[str]] = [[]]
+    for line in text.splitlines(keepends=True):
+        if line.lstrip().startswith("#") and sections[-1]:
+            sections.append([])
+        sections[-1].append(line)
+    return [section for section in sections if section]
+
+
+def figures(tokens: List[str]) -> Tuple[str, ...]:
+    """The numeric tokens of a line (amounts, years, percentages), sorted."""
+    return tuple(sorted(token for token in tokens if any(c.isdigit() for c in token)))
+
+
+def _is_table_rule(line: str) -> bool:
+    stripped = line.strip()
+    return bool(stripped) and set(stripped) <= set("|-: ")
+
+
+def _is_candidate(line: str, tokens: List[str], next_line: str = "") -> bool:
+    # Table headers stay so that the rows kept under them still read as a table
+    return (
+        len(tokens) >= MIN_LINE_TOKENS
+        and not line.lstrip().startswith("#")
+        and not _is_table_rule(line)
+        and not _is_table_rule(next_line)
+    )
+
+
+def deduplicate_notes(
+    notes: Dict[str, str],
+    note_threshold: float = 0.15,
+    line_threshold: float = 0.7,
+    section_threshold: float = 0.3
+) -> Tuple[Dict[str, str], DedupReport]:
+    """Cluster overlapping notes and drop lines that near-duplicate another note's.
+
+    Args:
+        notes: Note name -> markdown text
+        note_threshold: Similarity at which notes are clustered
+        line_threshold: Similarity at which a line counts as a duplicate
+        section_threshold: Similarity at which a section counts as covered
+            by a section of a larger note in the same cluster
+
+    Returns:
+        (note name -> deduplicated text, report)
+    """
+    report = DedupReport(notes=len(notes))
+    # Largest (usually most complete) note first, so it keeps the shared lines
+    names = sorted(notes, key=lambda name: (-len(notes[name]), name))
+
+    note_sigs = [signature(tokenize(notes[name]), shingle_size=1, k=4 * SIGNATURE_SIZE) for name in names]
+    report.clusters = _cluster(names, note_sigs, note_threshold)
+    cluster_of = {name: i for i, cluster in enumerate(report.clusters) for name in cluster}
+
+    index = _SignatureIndex()
+    owners: List[str] = []
+    owner_figures: List[frozenset] = []
+    section_index = _SignatureIndex()
+    section_owners: List[str] = []
+    section_figures: List[frozenset] = []
+    deduplicated: Dict[str, str] = {}
+    for name in names:
+        report.chars_before += len(notes[name])
+        kept, omitted, sources = [], 0, set()
+        cluster = cluster_of.get(name)
+        for section in _sections(notes[name]):
+            section_tokens = tokenize("".join(section))
+            section_sig = signature(section_tokens, shingle_size=1)
+            covering = None
+            if cluster is not None:
+                covering = section_index.best_match(
+                    section_sig, section_threshold,
+                    accept=lambda item: section_owners[item] != name and cluster_of[section_owners[item]] == cluster
+                )
+            for i, line in enumerate(section):
+                report.lines += 1
+                tokens = tokenize(line)
+                if not _is_candidate(line, tokens, section[i + 1] if i + 1 < len(section) else ""):
+                    kept.append(line)
+                    continue
+                sig = signature(tokens)
+                line_figures = frozenset(figures(tokens))
+                # A larger note's similar section already has every figure of this line
+                if covering and line_figures <= section_figures[covering[0]]:
+                    omitted += 1
+                    sources.add(section_owners[covering[0]])
+                    continue
+                # Only another note's line with all of this one's figures makes it redundant
+                match = index.best_match(
+                    sig, line_threshold,
+                    accept=lambda item: owners[item] != name and line_figures <= owner_figures[item]
+                )
+                if match:
+                    omitted += 1
+                    sources.add(owners[match[0]])
+                    continue
+                index.add(sig)
+                owners.append(name)
+                owner_figures.append(line_figures)
+                kept.append(line)
+            if cluster is not None:
+                section_index.add(section_sig)
+                section_owners.append(name)
+                section_figures.append(frozenset(figures(section_tokens)))
+        if omitted:
+            report.dropped += omitted
+            report.omitted[name] = (omitted, sorted(sources))
+        deduplicated[name] = "".join(kept)
+        report.chars_after += len(deduplicated[name])
+    return deduplicated, report
+
+
+def build_dedup_view(
+    notes_dir: Path,
+    out_dir: Optional[Path] = None,
+    note_threshold: float = 0.15,
+    line_threshold: float = 0.7,
+    section_threshold: float = 0.3,
+    dry_run: bool = False
+) -> DedupReport:
+    """Write the deduplicated view of ``notes_dir`` (default: sibling research_notes_dedup/)."""
+    notes_dir = Path(notes_dir)
+    out_dir = Path(out_dir) if out_dir else notes_dir.parent / DEDUP_DIR_NAME
+    notes = {path.name: path.read_text(encoding="utf-8") for path in sorted(notes_dir.glob("*.md"))}
+    deduplicated, report = deduplicate_notes(notes, note_threshold, line_threshold, section_threshold)
+    if dry_run:
+        return report
+
+    # Rebuild from scratch so deleted notes disappear from the view
+    tmp = out_dir.with_name(out_dir.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    for name, text in deduplicated.items():
+        (tmp / name).write_text(text, encoding="utf-8")
+    lines = [
+        "# Deduplicated research notes",
+        "",
+        f"{report.notes} notes from {notes_dir}/, {report.dropped} of {report.lines} lines omitted "
+        f"as near-duplicates ({report.chars_before:,} -> {report.chars_after:,} characters).",
+        "",
+        "## Clusters of overlapping notes",
+        "",
+    ]
+    lines += [f"- {', '.join(cluster)}" for cluster in report.clusters] or ["- (none)"]
+    if report.omitted:
+        lines += ["", "## Omitted lines", ""]
+        lines += [
+            f"- {name}: {count} lines (kept in {', '.join(sources)})"
+            for name, (count, sources) in sorted(report.omitted.items())
+        ]
+    (tmp / "_clusters.md").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    shutil.rmtree(out_dir, ignore_errors=True)
+    tmp.rename(out_dir)
+    return report
+
+
+def make_dedup_hook(files_dir: Path):
+    """PreToolUse hook for Task that refreshes the view before a synthesis subagent starts."""
+    notes_dir = Path(files_dir) / "research_notes"
+
+    async def dedup_hook(hook_input, tool_use_id, context):
+        subagent_type = (hook_input.get('tool_input') or {}).get('subagent_type')
+        if subagent_type in SYNTHESIS_AGENTS and notes_dir.is_dir():
+            try:
+                report = await asyncio.to_thread(build_dedup_view, notes_dir)
+                logger.info(f"Deduplicated notes for {subagent_type}: {report.saved_fraction:.0%} smaller")
+            except OSError as e:
+                logger.warning(f"Note dedup failed: {e}")
+        return {'continue_': True}
+
+    return dedup_hook
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m research_agent.utils.dedup",
+        description="Build a near-duplicate-free view of the research notes.",
+    )
+    parser.add_argument("notes_dir", type=Path, nargs="?", default=Path("files/research_notes"))
+    parser.add_argument("--out", type=Path, help=f"Output directory (default: sibling {DEDUP_DIR_NAME}/)")
+    parser.add_argument("--note-threshold", type=float, default=0.15,
+                        help="Similarity to cluster notes (default: 0.15)")
+    parser.add_argument("--line-threshold", type=float, default=0.7, help="Similarity to drop a line (default: 0.7)")
+    parser.add_argument("--section-threshold", type=float, default=0.3,
+                        help="Similarity for a section to count as covered within a cluster (default: 0.3)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be dropped")
+    args = parser.parse_args(argv)
+
+    report = build_dedup_view(
+        args.notes_dir, args.out, args.note_threshold, args.line_threshold, args.section_threshold, args.dry_run
+    )
+    print(f"{report.notes} notes, {report.lines} lines, {report.dropped} near-duplicate lines dropped")
+    print(f"{report.chars_before:,} -> {report.chars_after:,} characters ({report.saved_fraction:.0%} smaller)")
+    for cluster in report.clusters:
+        print(f"  cluster: {', '.join(cluster)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+"""Digests of the research notes for the report-writer, cached by content hash.
+
+Every report run used to have the report-writer read and re-summarize all
+notes in full. ``build_digest`` writes ``files/research_digest.md`` with,
+per note, a short summary (title, opening paragraph, section outline) and
+up to ``MAX_FACTS`` key facts: the lines and table rows carrying the most
+figures, each with its line number in the note, so the writer can look up
+the context (``search_notes``, or ``Read`` with an offset).
+
+Digests are extractive (no model call) and cached on disk by the SHA-256
+of the note's content, so a note is only digested again when it changes,
+and an unchanged note is shared across sessions and batch jobs:
+
+    RESEARCH_DIGEST_CACHE_DIR=.cache/digests
+
+The digest is refreshed by ``digest_hook`` whenever the lead agent spawns
+a report-writer, and by the orchestrator before the report stage. By hand:
+
+    python -m research_agent.utils.digest files/research_notes
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DIGEST_FILE_NAME = "research_digest.md"
+DEFAULT_CACHE_DIR = Path(".cache/digests")
+# Bump when the extraction changes, so cached digests are rebuilt
+DIGEST_VERSION = 1
+
+MAX_FACTS = 12
+MAX_FACTS_PER_SECTION = 2
+FACT_CHARS = 200
+SUMMARY_CHARS = 300
+MAX_SECTIONS = 8
+
+# Figures with a unit count more than bare numbers; years count least
+_QUANTITY_RE = re.compile(
+    r"[$¥€]?\d[\d,.]*\s*(?:%|％|倍|亿|万|千|美元|元|[kKmMbBtT]\b|x\b|×|:1\b)"
+)
+_NUMBER_RE = re.compile(r"\d[\d,.]*")
+_YEAR_RE = re.compile(r"^(?:19|20)\d\d$")
+# Sections listing sources rather than findings
+_SOURCES_RE = re.compile(r"参考|来源|引用|文献|reference|source|citation|bibliograph", re.IGNORECASE)
+
+
+@dataclass
+class NoteDigest:
+    """Summary and key facts of one note."""
+    note: str
+    sha256: str
+    title: str
+    summary: str
+    sections: List[str] = field(default_factory=list)
+    facts: List[Tuple[int, str]] = field(default_factory=list)  # (line number, fact)
+    chars: int = 0
+
+    def render(self) -> str:
+        lines = [f"## {self.note}: {self.title}", ""]
+        if self.summary:
+            lines += [self.summary, ""]
+        if self.sections:
+            lines += ["Sections: " + "; ".join(self.sections), ""]
+        lines += [f"- {fact} (L{number})" for number, fact in self.facts]
+        return "\n".join(lines).rstrip() + "\n"
+
+
+_LIST_ITEM_RE = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+")
+
+
+def _plain(line: str) -> str:
+    """A markdown line without list markers, emphasis and links."""
+    line = _LIST_ITEM_RE.sub("", line)
+    line = re.sub(r"\[([^\]]*)\]\([^)]*\)", r"\1", line)
+    return re.sub(r"[*_`]{1,3}", "", line).strip()
+
+
+def _clip(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + "..."
+
+
+def _cells(row: str) -> List[str]:
+    return [_plain(cell) for cell in row.strip().strip("|").split("|")]
+
+
+def _score(text: str) -> float:
+    quantities = len(_QUANTITY_RE.findall(text))
+    numbers = [n.strip(",.") for n in _NUMBER_RE.findall(text)]
+    years = sum(1 for n in numbers if _YEAR_RE.match(n))
+    return 2 * quantities + 0.5 * (len(numbers) - quantities - years) + 0.25 * years
+
+
+def digest_note(note: str, text: str) -> NoteDigest:
+    """Extract the summary and key facts of one note."""
+    title, summary, sections = "", "", []
+    candidates: List[Tuple[float, int, str, str]] = []  # (score, line, section, fact)
+    section, header = "", None
+
+    for number, line in enumerate(text.splitlines(), 1):
+        stripped = line.strip()
+        if stripped.startswith("#"):
+            heading = stripped.lstrip("#").strip()
+            level = len(stripped) - len(stripped.lstrip("#"))
+            if level == 1 and not title:
+                title = _plain(heading)
+            elif level == 2 and len(sections) < MAX_SECTIONS:
+                sections.append(_plain(heading))
+            section, header = heading, None
+            continue
+        if not stripped.startswith("|"):
+            header = None
+        if not stripped or "http" in stripped or _SOURCES_RE.search(section):
+            continue
+
+        if stripped.startswith("|"):
+            cells = _cells(stripped)
+            if all(set(cell) <= set("-: ") for cell in cells):
+                continue
+            if header is None:
+                # First row of a table: its header, used to label the other rows
+                header = cells
+                continue
+            fact = "; ".join(f"{name}: {value}" if name else value for name, value in zip(header, cells) if value)
+        else:
+            fact = _plain(stripped)
+            if not summary and not _LIST_ITEM_RE.match(line) and len(fact) >= 20:
+                summary = _clip(fact, SUMMARY_CHARS)
+                continue
+        score = _score(fact)
+        if score >= 2:
+            candidates.append((score, number, section, _clip(fact, FACT_CHARS)))
+
+    # Highest-scoring facts, at most a few per section so the digest covers the whole note
+    picked, per_section = [], {}
+    for score, number, section, fact in sorted(candidates, key=lambda c: (-c[0], c[1])):
+        if per_section.get(section, 0) >= MAX_FACTS_PER_SECTION:
+            continue
+        per_section[section] = per_section.get(section, 0) + 1
+        picked.append((number, fact))
+        if len(picked) == MAX_FACTS:
+            break
+
+    return NoteDigest(
+        note=note,
+        sha256=hashlib.sha256(text.encode("utf-8")).hexdigest(),
+        title=title or Path(note).stem,
+        summary=summary,
+        sections=sections,
+        facts=sorted(picked),
+        chars=len(text)
+    )
+
+
+class DigestCache:
+    """On-disk cache of note digests, one JSON file per content hash."""
+
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+
+    def _path(self, sha256: str) -> Path:
+        return self.cache_dir / f"{sha256[:32]}.v{DIGEST_VERSION}.json"
+
+    def get(self, note: str, sha256: str) -> Optional[NoteDigest]:
+        try:
+            with open(self._path(sha256), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        entry["facts"] = [tuple(fact) for fact in entry.get("facts", [])]
+        # The same content may be cached under another note name
+        entry["note"] = note
+        try:
+            return NoteDigest(**entry)
+        except TypeError:
+            return None
+
+    def put(self, digest: NoteDigest):
+        """Store a digest atomically (concurrent sessions may write the same note)."""
+        path = self._path(digest.sha256)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(asdict(digest), f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+
+@dataclass
+class DigestReport:
+    """What a digest pass did."""
+    notes: int = 0
+    cached: int = 0
+    built: int = 0
+    chars_before: int = 0
+    chars_after: int = 0
+
+
+def digest_cache_from_env() -> DigestCache:
+    return DigestCache(Path(os.environ.get("RESEARCH_DIGEST_CACHE_DIR", DEFAULT_CACHE_DIR)))
+
+
+def build_digest(notes_dir: Path, out_path: Optional[Path] = None, cache: Optional[DigestCache] = None) -> DigestReport:
+    """Write the digest of every note in ``notes_dir`` (default: files/research_digest.md next to it)."""
+    notes_dir = Path(notes_dir)
+    out_path = Path(out_path) if out_path else notes_dir.parent / DIGEST_FILE_NAME
+    cache = cache or digest_cache_from_env()
+    report = DigestReport()
+
+    digests: List[NoteDigest] = []
+    for path in sorted(notes_dir.glob("*.md")):
+        text = path.read_text(encoding="utf-8")
+        sha256 = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        digest = cache.get(path.name, sha256)
+        if digest is None:
+            digest = digest_note(path.name, text)
+            cache.put(digest)
+            report.built += 1
+        else:
+            report.cached += 1
+        digests.append(digest)
+        report.notes += 1
+        report.chars_before += digest.chars
+
+    body = "\n".join(digest.render() for digest in digests)
+    report.chars_after = len(body)
+    content = (
+        "# Research note digests\n\n"
+        f"Summary and key facts of {report.notes} notes in {notes_dir.name}/ "
+        f"({report.chars_before:,} -> {report.chars_after:,} characters). "
+        "(Ln) is the line of a fact in its note: look up more with search_notes or Read with an offset.\n\n"
+        + body
+    )
+    try:
+        unchanged = out_path.read_text(encoding="utf-8") == content
+    except OSError:
+        unchanged = False
+    if not unchanged:
+        tmp = out_path.with_name(f"{out_path.name}.{os.getpid()}.tmp")
+        tmp.write_text(content, encoding="utf-8")
+        os.replace(tmp, out_path)
+    return report
+
+
+def make_digest_hook(files_dir: Path):
+    """PreToolUse hook for Task that refreshes the digest before a report-writer starts."""
+    notes_dir = Path(files_dir) / "research_notes"
+
+    async def digest_hook(hook_input, tool_use_id, context):
+        tool_input = hook_input.get('tool_input') or {}
+        if tool_input.get('subagent_type') == "report-writer" and notes_dir.is_dir():
+            try:
+                report = await asyncio.to_thread(build_digest, notes_dir)
+                logger.info(f"Digest of {report.notes} notes: {report.cached} cached, {report.built} built")
+            except OSError as e:
+                logger.warning(f"Note digest failed: {e}")
+        return {'continue_': True}
+
+    return digest_hook
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m research_agent.utils.digest",
+        description="Write summary and key-fact digests of the research notes.",
+    )
+    parser.add_argument("notes_dir", type=Path, nargs="?", default=Path("files/research_notes"))
+    parser.add_argument("--out", type=Path, help=f"Output file (default: sibling {DIGEST_FILE_NAME})")
+    args = parser.parse_args(argv)
+
+    report = build_digest(args.notes_dir, args.out)
+    print(f"{report.notes} notes: {report.cached} digests cached, {report.built} built")
+    ratio = report.chars_before / max(report.chars_after, 1)
+    print(f"{report.chars_before:,} -> {report.chars_after:,} characters ({ratio:.0f}x smaller)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+"""Scriptable stand-in for ClaudeSDKClient, for local load tests.
+
+``FakeClaudeSDKClient`` implements the parts of the client that ``chat``
+uses (``async with``, ``query``, ``receive_response``, ``interrupt``) and
+plays a scripted lead-agent turn instead of calling the CLI and API:
+
+1. the lead agent streams a text block plus one ``Task`` ToolUseBlock per
+   scripted subagent;
+2. the subagents run concurrently; each streams AssistantMessages
+   (``parent_tool_use_id`` = its Task id) carrying ToolUseBlocks, and every
+   tool call runs the registered PreToolUse/PostToolUse hooks with
+   controlled model and tool latency;
+3. every Task completes through the PostToolUse hooks with a usage report,
+   then the lead agent sends a summary and the turn ends with a
+   ResultMessage. Like the CLI's, its usage, cost and model usage are
+   running totals for the client's session, subagents included.
+
+An agent whose ``options.allowed_tools`` lacks ``Task`` (e.g. a researcher
+queried directly) makes the scripted tool calls it is allowed to itself.
+
+With ``options.include_partial_messages`` every AssistantMessage is
+preceded by the StreamEvents (text deltas) it was generated from.
+
+Hooks are taken from ``options.hooks`` and matched the way the runtime
+matches them (``matcher=None`` for all tools, otherwise a tool name
+pattern), so trackers, tracers and usage accounting run unchanged.
+"""
+
+import asyncio
+import itertools
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from claude_agent_sdk import AssistantMessage, ResultMessage, StreamEvent, TextBlock, ToolUseBlock
+
+# Tool use ids are unique per process, like the API's, even across clients
+_tool_ids = itertools.count(1)
+
+
+@dataclass
+class FakeToolCall:
+    """One scripted tool call made by a subagent."""
+    name: str
+    input: Dict[str, Any]
+    output_size: int = 2_000
+    error: Optional[str] = None
+
+
+@dataclass
+class FakeScript:
+    """
+    What each simulated turn looks like.
+
+    Latencies are in seconds; ``jitter`` scales every sleep by a random
+    factor in [1 - jitter, 1 + jitter].
+    """
+    subagents: List[str] = field(default_factory=lambda: ["researcher", "researcher", "researcher"])
+    tool_calls: List[FakeToolCall] = field(default_factory=lambda: [
+        FakeToolCall("mcp__tavily__tavily-search", {"query": "simulated query"}, output_size=15_000),
+        FakeToolCall("mcp__tavily__tavily-search", {"query": "simulated follow-up"}, output_size=15_000),
+        FakeToolCall("Write", {"file_path": "files/research_notes/simulated.md", "content": "x" * 4_000}),
+    ])
+    model_latency: float = 0.05
+    tool_latency: float = 0.1
+    token_latency: float = 0.0
+    jitter: float = 0.2
+    text: str = "Working on it."
+    model: str = "claude-haiku-4-5"
+    tokens_per_subagent: int = 20_000
+    cost_per_turn_usd: float = 0.01
+
+
+class FakeClaudeSDKClient:
+    """Drop-in for ``ClaudeSDKClient(options=...)`` that plays a ``FakeScript``."""
+
+    def __init__(self, options: Any = None, script: Optional[FakeScript] = None, seed: Optional[int] = None):
+        self.options = options
+        self.script = script or FakeScript()
+        self.session_id = getattr(options, "resume", None) or f"fake-{id(self):x}"
+        self._random = random.Random(seed)
+        self._prompt: Optional[str] = None
+        self._interrupted = False
+        self._turns = 0
+        self._usage = {"input_tokens": 0, "output_tokens": 0}
+        self._cost_usd = 0.0
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *_args):
+        await self.disconnect()
+        return False
+
+    async def connect(self, prompt: Any = None):
+        pass
+
+    async def disconnect(self):
+        pass
+
+    async def query(self, prompt: str, session_id: str = "default"):
+        self._prompt = prompt
+        self._interrupted = False
+
+    async def interrupt(self):
+        self._interrupted = True
+
+    def _stream_events(self, message: AssistantMessage) -> List[StreamEvent]:
+        """Partial-message events for ``message`` (empty unless partial messages are enabled)."""
+        if not getattr(self.options, "include_partial_messages", False):
+            return []
+        raw = [{"type": "message_start", "message": {"model": message.model}}]
+        for index, block in enumerate(message.content):
+            if isinstance(block, TextBlock):
+                raw.append({"type": "content_block_start", "index": index, "content_block": {"type": "text", "text": ""}})
+                for token in re.findall(r"\S+\s*|\s+", block.text):
+                    raw.append({"type": "content_block_delta", "index": index,
+                                "delta": {"type": "text_delta", "text": token}})
+            else:
+                raw.append({"type": "content_block_start", "index": index,
+                            "content_block": {"type": "tool_use", "id": block.id, "name": block.name, "input": {}}})
+            raw.append({"type": "content_block_stop", "index": index})
+        raw.append({"type": "message_stop"})
+        return [
+            StreamEvent(uuid=str(uuid.uuid4()), session_id=self.session_id, event=event,
+                        parent_tool_use_id=message.parent_tool_use_id)
+            for event in raw
+        ]
+
+    def _next_id(self) -> str:
+        return f"toolu_fake_{next(_tool_ids):06d}"
+
+    async def _sleep(self, seconds: float):
+        if seconds > 0:
+            jitter = self.script.jitter
+            await asyncio.sleep(seconds * self._random.uniform(1 - jitter, 1 + jitter))
+
+    async def _run_hooks(self, event: str, tool_name: str, tool_use_id: str, hook_input: Dict[str, Any]):
+        hooks = (getattr(self.options, "hooks", None) or {}).get(event, [])
+        hook_input = {
+            "hook_event_name": event,
+            "session_id": self.session_id,
+            "tool_name": tool_name,
+            **hook_input,
+        }
+        for matcher in hooks:
+            if matcher.matcher is not None and not re.fullmatch(matcher.matcher, tool_name):
+                continue
+            for hook in matcher.hooks:
+                await hook(hook_input, tool_use_id, {"signal": None})
+
+    async def _run_agent(self, task_id: Optional[str], queue: asyncio.Queue):
+        script = self.script
+        allowed = getattr(self.options, "allowed_tools", None)
+        for call in script.tool_calls:
+            if task_id is None and call.name not in allowed:
+                continue
+            if self._interrupted:
+                break
+            await self._sleep(script.model_latency)
+            tool_use_id = self._next_id()
+            message = AssistantMessage(
+                content=[TextBlock(text=script.text), ToolUseBlock(id=tool_use_id, name=call.name, input=call.input)],
+                model=script.model,
+                parent_tool_use_id=task_id,
+            )
+            for event in self._stream_events(message):
+                await queue.put(event)
+                await self._sleep(script.token_latency)
+            await queue.put(message)
+            await self._run_hooks("PreToolUse", call.name, tool_use_id, {"tool_input": call.input})
+            await self._sleep(script.tool_latency)
+            response = {"error": call.error} if call.error else {"content": "x" * call.output_size}
+            await self._run_hooks("PostToolUse", call.name, tool_use_id, {
+                "tool_input": call.input,
+                "tool_response": response,
+            })
+
+        if task_id is None:
+            return
+        await self._run_hooks("PostToolUse", "Task", task_id, {
+            "tool_input": {},
+            "tool_response": {
+                "content": [{"type": "text", "text": "Subagent finished."}],
+                "totalTokens": script.tokens_per_subagent,
+                "totalToolUseCount": len(script.tool_calls),
+            },
+        })
+
+    async def receive_response(self) -> AsyncIterator[Any]:
+        script = self.script
+        self._turns += 1
+        started = time.monotonic()
+
+        await self._sleep(script.model_latency)
+        tasks = []
+        allowed = getattr(self.options, "allowed_tools", None)
+        can_spawn = allowed is None or "Task" in allowed
+        for index, subagent_type in enumerate(script.subagents if can_spawn else []):
+            task_input = {
+                "subagent_type": subagent_type,
+                "description": f"Simulated {subagent_type} {index + 1}",
+                "prompt": self._prompt or "",
+            }
+            tasks.append((self._next_id(), task_input))
+        message = AssistantMessage(
+            content=[TextBlock(text=script.text)] + [
+                ToolUseBlock(id=task_id, name="Task", input=task_input) for task_id, task_input in tasks
+            ],
+            model=script.model,
+        )
+        for event in self._stream_events(message):
+            yield event
+            await self._sleep(script.token_latency)
+        yield message
+        for task_id, task_input in tasks:
+            await self._run_hooks("PreToolUse", "Task", task_id, {"tool_input": task_input})
+
+        # Subagents run concurrently; their messages interleave on one stream
+        queue: asyncio.Queue = asyncio.Queue()
+        agents = [task_id for task_id, _ in tasks] if can_spawn else [None]
+        runners = [asyncio.create_task(self._run_agent(task_id, queue)) for task_id in agents]
+        done = asyncio.gather(*runners)
+        try:
+            while not (done.done() and queue.empty()):
+                getter = asyncio.ensure_future(queue.get())
+                await asyncio.wait({getter, done}, return_when=asyncio.FIRST_COMPLETED)
+                if getter.done():
+                    yield getter.result()
+                else:
+                    getter.cancel()
+            await done
+        finally:
+            for runner in runners:
+                runner.cancel()
+
+        if not self._interrupted:
+            await self._sleep(script.model_latency)
+            message = AssistantMessage(content=[TextBlock(text="Done.")], model=script.model)
+            for event in self._stream_events(message):
+                yield event
+                await self._sleep(script.token_latency)
+            yield message
+
+        duration_ms = int((time.monotonic() - started) * 1000)
+        self._usage["input_tokens"] += 1_000
+        self._usage["output_tokens"] += 200 + script.tokens_per_subagent * len(tasks)
+        self._cost_usd += script.cost_per_turn_usd
+        yield ResultMessage(
+            subtype="error_during_execution" if self._interrupted else "success",
+            duration_ms=duration_ms,
+            duration_api_ms=duration_ms,
+            is_error=self._interrupted,
+            num_turns=self._turns,
+            session_id=self.session_id,
+            total_cost_usd=self._cost_usd,
+            usage=dict(self._usage),
+            model_usage={script.model: {
+                "inputTokens": self._usage["input_tokens"],
+                "outputTokens": self._usage["output_tokens"],
+                "cacheReadInputTokens": 0,
+                "cacheCreationInputTokens": 0,
+                "webSearchRequests": 0,
+                "costUSD": self._cost_usd,
+                "contextWindow": 200_000,
+                "maxOutputTokens": 64_000,
+            }},
+        )
@@ -0,0 +1,66 @@
+"""HDR-style latency histograms for tool call durations."""
+
+from typing import Dict
+
+
+class LatencyHistogram:
+    """
+    Log-linear histogram of durations in microseconds.
+
+    Values below ``2**precision_bits`` are counted exactly; larger values
+    fall into buckets whose width doubles with each power of two, which
+    keeps the relative error under ``2**-(precision_bits - 1)`` (~1.6% at
+    the default) with a fixed, small memory footprint per histogram.
+    """
+
+    __slots__ = ("precision_bits", "counts", "count", "total_us", "max_us")
+
+    def __init__(self, precision_bits: int = 7):
+        self.precision_bits = precision_bits
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+
+    def _bucket(self, value: int) -> int:
+        shift = max(0, value.bit_length() - self.precision_bits)
+        return (shift << self.precision_bits) + (value >> shift)
+
+    def _bucket_upper(self, bucket: int) -> int:
+        shift = bucket >> self.precision_bits
+        mantissa = bucket & ((1 << self.precision_bits) - 1)
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, seconds: float):
+        """Record one duration given in seconds."""
+        value = max(0, int(seconds * 1_000_000))
+        bucket = self._bucket(value)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total_us += value
+        if value > self.max_us:
+            self.max_us = value
+
+    def percentile(self, pct: float) -> int:
+        """Return the highest value equivalent to the given percentile, in microseconds."""
+        if not self.count:
+            return 0
+        target = max(1, round(self.count * pct / 100))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= target:
+                return min(self._bucket_upper(bucket), self.max_us)
+        return self.max_us
+
+    def summary(self) -> Dict[str, float]:
+        """Summarize the histogram in milliseconds."""
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_us / 1000, 3),
+            "mean_ms": round(self.total_us / self.count / 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50) / 1000, 3),
+            "p90_ms": round(self.percentile(90) / 1000, 3),
+            "p99_ms": round(self.percentile(99) / 1000, 3),
+            "max_ms": round(self.max_us / 1000, 3),
+        }
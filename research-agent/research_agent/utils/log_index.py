@@ -0,0 +1,308 @@
+"""Incrementally maintained index over logs/session_*/tool_calls.jsonl.
+
+The index is a SQLite database (``logs/.tool_calls_index.sqlite``) that
+stores, for every log line, its byte offset and length plus the fields
+worth filtering on. Queries run against the index and then slice the
+matching lines straight out of the memory-mapped log files, so nothing
+outside the result set is parsed.
+
+Each log file is indexed up to the last complete line; later runs only
+scan the bytes appended since, so re-indexing a live session is cheap.
+Sessions compressed by ``retention`` keep their index entries (offsets
+refer to the decompressed stream) and are read by decompressing them;
+entries for deleted sessions are dropped on the next update.
+
+Usage:
+    python -m research_agent.utils.log_index index
+    python -m research_agent.utils.log_index query --agent-type data-analyst --tool Bash --errors
+    python -m research_agent.utils.log_index query --agent-id RESEARCHER-2 --since 2025-12-28 --lines
+"""
+
+import argparse
+import json
+import mmap
+import sqlite3
+import sys
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from research_agent.utils.retention import SUFFIXES, is_compressed, read_log_bytes
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # pragma: no cover - optional dependency
+    _loads = json.loads
+
+INDEX_NAME = ".tool_calls_index.sqlite"
+LOG_NAME = "tool_calls.jsonl"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    session TEXT NOT NULL,
+    indexed_bytes INTEGER NOT NULL DEFAULT 0,
+    stored_bytes INTEGER
+);
+CREATE TABLE IF NOT EXISTS events (
+    file_id INTEGER NOT NULL REFERENCES files(id),
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    event TEXT,
+    ts TEXT,
+    tool_use_id TEXT,
+    agent_id TEXT COLLATE NOCASE,
+    agent_type TEXT COLLATE NOCASE,
+    tool_name TEXT COLLATE NOCASE,
+    success INTEGER
+);
+CREATE INDEX IF NOT EXISTS events_by_tool ON events (agent_type, tool_name, success);
+CREATE INDEX IF NOT EXISTS events_by_agent ON events (agent_id);
+CREATE INDEX IF NOT EXISTS events_by_ts ON events (ts);
+CREATE INDEX IF NOT EXISTS events_by_tool_use_id ON events (tool_use_id);
+"""
+
+
+class LogIndex:
+    """Index of tool call events across all session directories under a logs root."""
+
+    def __init__(self, logs_dir: Path = Path("logs")):
+        self.logs_dir = Path(logs_dir)
+        self.db = sqlite3.connect(self.logs_dir / INDEX_NAME)
+        self.db.executescript(_SCHEMA)
+        # Indexes created before compression support lack stored_bytes
+        if "stored_bytes" not in {row[1] for row in self.db.execute("PRAGMA table_info(files)")}:
+            self.db.execute("ALTER TABLE files ADD COLUMN stored_bytes INTEGER")
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_args):
+        self.close()
+        return False
+
+    def update(self) -> Tuple[int, int]:
+        """Index new bytes in every session log. Returns (files_scanned, events_added)."""
+        files_scanned = events_added = 0
+        log_paths = [self.logs_dir.glob(f"session_*/{LOG_NAME}")]
+        log_paths += [self.logs_dir.glob(f"session_*/{LOG_NAME}{suffix}") for suffix in SUFFIXES.values()]
+        for log_path in sorted(path for paths in log_paths for path in paths):
+            added = self._update_file(log_path)
+            if added is not None:
+                files_scanned += 1
+                events_added += added
+        self._prune_missing()
+        self.db.commit()
+        return files_scanned, events_added
+
+    def _prune_missing(self):
+        """Drop entries for log files that no longer exist (e.g. evicted sessions)."""
+        for file_id, path in self.db.execute("SELECT id, path FROM files").fetchall():
+            if not Path(path).exists():
+                self.db.execute("DELETE FROM events WHERE file_id = ?", (file_id,))
+                self.db.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def _update_file(self, log_path: Path) -> Optional[int]:
+        path = str(log_path.resolve())
+        compressed = is_compressed(log_path)
+        query = "SELECT id, indexed_bytes, stored_bytes FROM files WHERE path = ?"
+        row = self.db.execute(query, (path,)).fetchone()
+        size = log_path.stat().st_size
+
+        if row is None and compressed:
+            # Compressed after it was indexed: same content, so the offsets still hold
+            plain = str(log_path.with_suffix("").resolve())
+            row = self.db.execute(query, (plain,)).fetchone()
+            if row is not None:
+                self.db.execute("UPDATE files SET path = ? WHERE id = ?", (path, row[0]))
+
+        if row is None:
+            file_id = self.db.execute(
+                "INSERT INTO files (path, session) VALUES (?, ?)", (path, log_path.parent.name)
+            ).lastrowid
+            start = 0
+        else:
+            file_id, start, stored = row
+            if compressed:
+                # Compressed files are immutable; only scan them once
+                if size == stored:
+                    return None
+            else:
+                if size == start:
+                    return None
+                if size < start:
+                    # File was rewritten; index it from scratch
+                    self.db.execute("DELETE FROM events WHERE file_id = ?", (file_id,))
+                    start = 0
+
+        if size == 0:
+            return 0
+
+        rows = []
+        with _log_data(log_path) as data:
+            offset = start
+            while True:
+                newline = data.find(b"\n", offset)
+                if newline == -1:
+                    break  # Partial trailing line; pick it up next time
+                line = data[offset:newline]
+                try:
+                    entry = _loads(line)
+                except ValueError:
+                    entry = None
+                if isinstance(entry, dict):
+                    success = entry.get("success")
+                    rows.append((
+                        file_id, offset, newline - offset,
+                        entry.get("event"), entry.get("timestamp"), entry.get("tool_use_id"),
+                        entry.get("agent_id"), entry.get("agent_type"), entry.get("tool_name"),
+                        None if success is None else int(bool(success)),
+                    ))
+                offset = newline + 1
+
+        self.db.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        self.db.execute(
+            "UPDATE files SET indexed_bytes = ?, stored_bytes = ? WHERE id = ?", (offset, size, file_id)
+        )
+        return len(rows)
+
+    def query(
+        self,
+        agent_id: Optional[str] = None,
+        agent_type: Optional[str] = None,
+        tool_name: Optional[str] = None,
+        errors: Optional[bool] = None,
+        event: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Return matching index rows, oldest first.
+
+        ``errors=True`` selects failed completions, ``errors=False`` successful
+        ones. Timestamps compare as ISO-8601 strings, so date prefixes work.
+        """
+        clauses, params = [], []
+        for column, value in (
+            ("agent_id", agent_id), ("agent_type", agent_type),
+            ("tool_name", tool_name), ("event", event),
+        ):
+            if value is not None:
+                clauses.append(f"e.{column} = ?")
+                params.append(value)
+        if errors is not None:
+            clauses.append("e.success = ?")
+            params.append(0 if errors else 1)
+        if since:
+            clauses.append("e.ts >= ?")
+            params.append(since)
+        if until:
+            clauses.append("e.ts < ?")
+            params.append(until)
+
+        sql = (
+            "SELECT f.path, f.session, e.offset, e.length, e.event, e.ts, e.tool_use_id,"
+            " e.agent_id, e.agent_type, e.tool_name, e.success"
+            " FROM events e JOIN files f ON f.id = e.file_id"
+        )
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY e.ts"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+
+        columns = ["path", "session", "offset", "length", "event", "timestamp", "tool_use_id",
+                   "agent_id", "agent_type", "tool_name", "success"]
+        return [dict(zip(columns, row)) for row in self.db.execute(sql, params)]
+
+    def sessions(self, **filters) -> List[str]:
+        """Return the distinct sessions with at least one matching event."""
+        return sorted({row["session"] for row in self.query(**filters)})
+
+
+@contextmanager
+def _log_data(log_path: Path) -> Iterator[Union[mmap.mmap, bytes]]:
+    """Memory-map a plain log, or decompress a compressed one into memory."""
+    if is_compressed(log_path):
+        yield read_log_bytes(log_path)
+        return
+    with open(log_path, "rb") as f, closing(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)) as data:
+        yield data
+
+
+def read_lines(rows: List[Dict[str, Any]]) -> Iterator[Tuple[Dict[str, Any], bytes]]:
+    """Yield (row, raw line) pairs by seeking into each memory-mapped log."""
+    by_path: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        by_path.setdefault(row["path"], []).append(row)
+    for path, path_rows in by_path.items():
+        with _log_data(Path(path)) as data:
+            for row in path_rows:
+                yield row, data[row["offset"]:row["offset"] + row["length"]]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m research_agent.utils.log_index",
+        description="Index and query tool call logs across sessions.",
+    )
+    parser.add_argument("--logs-dir", type=Path, default=Path("logs"), help="Logs root (default: logs)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("index", help="Build or incrementally update the index")
+
+    query = sub.add_parser("query", help="Query indexed tool call events")
+    query.add_argument("--agent-id", help="e.g. RESEARCHER-2")
+    query.add_argument("--agent-type", help="e.g. researcher, data-analyst")
+    query.add_argument("--tool", dest="tool_name", help="e.g. Bash, Write")
+    query.add_argument("--event", choices=["tool_call_start", "tool_call_complete"])
+    status = query.add_mutually_exclusive_group()
+    status.add_argument("--errors", dest="errors", action="store_true", default=None, help="Failed calls only")
+    status.add_argument("--ok", dest="errors", action="store_false", help="Successful calls only")
+    query.add_argument("--since", help="ISO timestamp or date (inclusive)")
+    query.add_argument("--until", help="ISO timestamp or date (exclusive)")
+    query.add_argument("--limit", type=int)
+    output = query.add_mutually_exclusive_group()
+    output.add_argument("--sessions", action="store_true", help="List matching sessions only")
+    output.add_argument("--lines", action="store_true", help="Print the raw JSONL lines")
+
+    args = parser.parse_args(argv)
+    if not args.logs_dir.is_dir():
+        print(f"No logs directory at {args.logs_dir}", file=sys.stderr)
+        return 1
+
+    with LogIndex(args.logs_dir) as index:
+        files_scanned, events_added = index.update()
+        if args.command == "index":
+            print(f"Indexed {events_added} new events from {files_scanned} updated log files")
+            return 0
+
+        filters = dict(
+            agent_id=args.agent_id, agent_type=args.agent_type, tool_name=args.tool_name,
+            errors=args.errors, event=args.event, since=args.since, until=args.until, limit=args.limit,
+        )
+        if args.sessions:
+            for session in index.sessions(**filters):
+                print(session)
+            return 0
+
+        rows = index.query(**filters)
+        if args.lines:
+            for _row, line in read_lines(rows):
+                print(line.decode("utf-8"))
+            return 0
+
+        for row in rows:
+            status_text = {None: "", 1: "ok", 0: "ERROR"}[row["success"]]
+            print(f"{row['session']}  {row['timestamp']}  {row['agent_id'] or '-':<18} {row['tool_name'] or '-':<28} {status_text}")
+        print(f"\n{len(rows)} matching events")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""Background group-commit writer for structured session logs."""
+
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def encode_jsonl(entry: Dict[str, Any]) -> bytes:
+    """Encode a log entry as one JSONL line, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(entry, default=str) + b"\n"
+    return (json.dumps(entry, default=str) + "\n").encode("utf-8")
+
+
+class AsyncLogWriter:
+    """
+    Appends log entries to a file from a background asyncio task.
+
+    Hooks enqueue entries and return immediately; the writer task groups
+    them into batches and commits each batch with a single write + flush
+    on a dedicated thread, so disk latency never lands on the tool path.
+
+    A batch is committed when it reaches ``batch_size`` entries or when
+    ``flush_interval`` seconds have passed since its first entry. When the
+    queue is full, ``put`` waits for the writer to catch up (backpressure).
+    With ``append`` the file is extended instead of truncated.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        encode: Callable[[Dict[str, Any]], bytes] = encode_jsonl,
+        max_queue: int = 10_000,
+        batch_size: int = 256,
+        flush_interval: float = 0.05,
+        header: bytes = b"",
+        append: bool = False,
+    ):
+        self.path = path
+        self.encode = encode
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._max_queue = max_queue
+
+        # Appending (e.g. a resumed session) keeps existing entries and header
+        self._file = open(path, "ab" if append else "wb")
+        if header and self._file.tell() == 0:
+            self._file.write(header)
+            self._file.flush()
+
+        # Single worker keeps batches in submission order
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="log-writer")
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending: List[Dict[str, Any]] = []
+        # Entries put_nowait() could not queue; committed by close()
+        self._overflow: List[Dict[str, Any]] = []
+        self._closed = False
+
+    def _ensure_started(self) -> bool:
+        """Start the writer task on the running loop. Returns False outside a loop."""
+        if self._task is not None and not self._task.done():
+            return True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self._max_queue)
+        self._task = loop.create_task(self._run())
+        return True
+
+    async def put(self, entry: Dict[str, Any]):
+        """Enqueue an entry, waiting if the queue is full."""
+        if self._closed:
+            return
+        if not self._ensure_started():
+            self._write_batch([entry])
+            return
+        await self._queue.put(entry)
+
+    def put_nowait(self, entry: Dict[str, Any]):
+        """Enqueue an entry from synchronous code, without backpressure."""
+        if self._closed:
+            return
+        if not self._ensure_started():
+            self._write_batch([entry])
+            return
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            self._overflow.append(entry)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            entry = await self._queue.get()
+            if entry is None:
+                return
+            # Entries pulled off the queue stay visible to close() until committed
+            self._pending = [entry]
+            deadline = loop.time() + self.flush_interval
+            done = False
+            while len(self._pending) < self.batch_size:
+                try:
+                    entry = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        entry = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if entry is None:
+                    done = True
+                    break
+                self._pending.append(entry)
+            batch, self._pending = self._pending, []
+            await asyncio.wrap_future(self._executor.submit(self._write_batch, batch))
+            if done:
+                return
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        if not batch:
+            return
+        try:
+            self._file.write(b"".join(self.encode(entry) for entry in batch))
+            self._file.flush()
+        except Exception:
+            logger.exception(f"Failed to write {len(batch)} log entries to {self.path}")
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        entries = []
+        while self._queue is not None and not self._queue.empty():
+            entry = self._queue.get_nowait()
+            if entry is not None:
+                entries.append(entry)
+        return entries
+
+    async def aclose(self):
+        """Flush every queued entry and close the file."""
+        if self._closed:
+            return
+        if self._task is not None and not self._task.done():
+            await self._queue.put(None)
+            await self._task
+        self.close()
+
+    def close(self):
+        """Synchronously flush every queued entry and close the file."""
+        if self._file.closed:
+            return
+        self._closed = True
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        # Wait for any in-flight batch, then commit whatever is still queued
+        self._executor.shutdown(wait=True)
+        batch, self._pending = self._pending, []
+        self._write_batch(batch + self._drain() + self._overflow)
+        self._overflow = []
+        self._file.close()
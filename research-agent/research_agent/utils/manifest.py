@@ -0,0 +1,133 @@
+"""Artifact manifest of the research pipeline, for incremental re-runs.
+
+``files/manifest.json`` records, per topic and stage, the inputs a stage
+ran with and the artifacts it wrote, and for every artifact under
+``research_notes/``, ``charts/``, ``data/`` and ``reports/`` the stage
+(and so the inputs) that produced it:
+
+    research: topic, subtopic count, planner/researcher prompt versions, model
+              -> research_notes/*
+    analysis: topic, hashes of all notes, data_analyst prompt version, model
+              -> charts/*, data/*
+    report:   topic, hashes of notes, charts and data, report_writer prompt
+              version, model -> reports/*
+
+Prompt versions are content hashes of the files in ``PROMPTS_DIR``. With
+``--incremental`` the orchestrator skips a stage, make-style, when the
+manifest has a run of it with the same inputs whose artifacts all still
+exist. Inputs are content hashes, so editing only ``report_writer.txt``
+re-runs only the report, and editing a note by hand keeps the research
+but re-runs analysis and report; deleting an artifact re-runs its stage.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+# File timestamps can lag the clock by a timer tick; files from before a stage started are
+# still attributed to it only if written within this window
+MTIME_SLACK_NS = 1_000_000_000
+
+# Directories under files/ that each stage writes to
+STAGE_OUTPUTS = {
+    "research": ("research_notes",),
+    "analysis": ("charts", "data"),
+    "report": ("reports",),
+}
+
+
+def file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def prompt_versions(prompts_dir: Path, names: Iterable[str]) -> Dict[str, str]:
+    """Short content hash of each prompt file (a changed prompt is a new version)."""
+    return {name: file_hash(Path(prompts_dir) / name)[:12] for name in names}
+
+
+class ArtifactManifest:
+    """Inputs and artifacts of each pipeline stage, stored in files/manifest.json."""
+
+    def __init__(self, files_dir: Path):
+        self.files_dir = Path(files_dir)
+        self.path = self.files_dir / MANIFEST_NAME
+        self.stages: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.artifacts: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable manifest {self.path}: {e}")
+            return
+        if data.get("version") == MANIFEST_VERSION:
+            self.stages = data.get("stages", {})
+            self.artifacts = data.get("artifacts", {})
+
+    def snapshot(self, *subdirs: str, since_ns: Optional[int] = None) -> Dict[str, str]:
+        """Content hashes of the files under ``subdirs`` (only those modified since ``since_ns``, if given)."""
+        hashes = {}
+        for subdir in subdirs:
+            root = self.files_dir / subdir
+            if not root.is_dir():
+                continue
+            for path in sorted(root.rglob("*")):
+                if not path.is_file() or path.name.startswith("."):
+                    continue
+                if since_ns is not None and path.stat().st_mtime_ns < since_ns:
+                    continue
+                hashes[path.relative_to(self.files_dir).as_posix()] = file_hash(path)
+        return hashes
+
+    @staticmethod
+    def stage_key(inputs: Dict[str, Any]) -> str:
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def outputs(self, topic: str, stage: str) -> List[str]:
+        return sorted(self.stages.get(topic, {}).get(stage, {}).get("outputs", {}))
+
+    def is_fresh(self, topic: str, stage: str, inputs: Dict[str, Any]) -> bool:
+        """True if ``stage`` already ran with ``inputs`` and all its artifacts still exist."""
+        record = self.stages.get(topic, {}).get(stage)
+        if not record or record.get("key") != self.stage_key(inputs) or not record.get("outputs"):
+            return False
+        # Edited artifacts count as up to date (like make); later stages see their new hashes
+        return all((self.files_dir / relpath).is_file() for relpath in record["outputs"])
+
+    def record(self, topic: str, stage: str, inputs: Dict[str, Any], since_ns: int):
+        """Record a finished stage: its inputs and the artifacts it wrote since ``since_ns``."""
+        key = self.stage_key(inputs)
+        outputs = self.snapshot(*STAGE_OUTPUTS[stage], since_ns=since_ns - MTIME_SLACK_NS)
+        self.stages.setdefault(topic, {})[stage] = {
+            "key": key,
+            "inputs": inputs,
+            "outputs": outputs,
+            "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        }
+        for relpath, sha256 in outputs.items():
+            self.artifacts[relpath] = {"sha256": sha256, "topic": topic, "stage": stage, "key": key}
+        self.save()
+
+    def save(self):
+        """Write the manifest atomically."""
+        self.files_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": MANIFEST_VERSION, "stages": self.stages, "artifacts": self.artifacts},
+                f, ensure_ascii=False, indent=2
+            )
+        os.replace(tmp, self.path)
@@ -0,0 +1,139 @@
+"""Live Prometheus-style metrics for a running research session.
+
+``MetricsServer`` serves the tracker's live counters and gauges in the
+Prometheus text exposition format on a localhost HTTP endpoint, from a
+daemon thread so scrapes never block the agent's event loop. The values
+are rendered at scrape time from state the tracker already keeps, so the
+hooks only pay for a few dict increments.
+
+Enable it with ``RESEARCH_METRICS_PORT`` (e.g. 9464) and scrape
+``http://127.0.0.1:9464/metrics``.
+"""
+
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+PREFIX = "research_agent"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels: str) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _per_tool(lines: List[str], name: str, kind: str, help_text: str, values: Dict[Tuple[str, str], Any]):
+    lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+    lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+    for (agent_type, tool_name), value in sorted(values.items()):
+        lines.append(f"{PREFIX}_{name}{_labels(agent_type=agent_type, tool_name=tool_name)} {value}")
+
+
+def render_metrics(tracker: Any) -> str:
+    """Render the tracker's current state in the Prometheus text format."""
+    # dict.copy()/len() are atomic under the GIL, so the loop thread can keep updating
+    counters = tracker.subagent_counters.copy()
+    histograms = tracker.latency_histograms.copy()
+    lines: List[str] = []
+
+    _per_tool(lines, "tool_calls_total", "counter",
+              "Tool calls started, by agent type and tool.", tracker.tool_call_counts.copy())
+    _per_tool(lines, "tool_errors_total", "counter",
+              "Tool calls that returned an error.", tracker.tool_error_counts.copy())
+    _per_tool(lines, "tool_output_bytes_total", "counter",
+              "Approximate size of tool results, in bytes.", tracker.tool_output_bytes.copy())
+
+    lines.append(f"# HELP {PREFIX}_tool_duration_seconds Subagent tool call wall-clock duration.")
+    lines.append(f"# TYPE {PREFIX}_tool_duration_seconds summary")
+    for (agent_type, tool_name), histogram in sorted(histograms.items()):
+        for quantile in (0.5, 0.9, 0.99):
+            labels = _labels(agent_type=agent_type, tool_name=tool_name, quantile=str(quantile))
+            lines.append(f"{PREFIX}_tool_duration_seconds{labels} {histogram.percentile(quantile * 100) / 1e6}")
+        labels = _labels(agent_type=agent_type, tool_name=tool_name)
+        lines.append(f"{PREFIX}_tool_duration_seconds_sum{labels} {histogram.total_us / 1e6}")
+        lines.append(f"{PREFIX}_tool_duration_seconds_count{labels} {histogram.count}")
+
+    lines.append(f"# HELP {PREFIX}_tool_calls_in_flight Tool calls between PreToolUse and PostToolUse.")
+    lines.append(f"# TYPE {PREFIX}_tool_calls_in_flight gauge")
+    lines.append(f"{PREFIX}_tool_calls_in_flight {len(tracker.tool_call_records)}")
+
+    lines.append(f"# HELP {PREFIX}_active_subagents Subagents spawned whose Task has not returned.")
+    lines.append(f"# TYPE {PREFIX}_active_subagents gauge")
+    lines.append(f"{PREFIX}_active_subagents {len(tracker.active_subagents)}")
+
+    lines.append(f"# HELP {PREFIX}_subagents_spawned_total Subagents spawned, by type.")
+    lines.append(f"# TYPE {PREFIX}_subagents_spawned_total counter")
+    for agent_type, count in sorted(counters.items()):
+        lines.append(f"{PREFIX}_subagents_spawned_total{_labels(agent_type=agent_type)} {count}")
+
+    return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serves ``render_metrics(tracker)`` at ``/metrics`` on a background thread."""
+
+    def __init__(self, tracker: Any, port: int = 9464, host: str = "127.0.0.1"):
+        self.tracker = tracker
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/metrics"
+
+    def start(self) -> "MetricsServer":
+        tracker = self.tracker
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = render_metrics(tracker).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug("metrics: " + format, *args)
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        # Port 0 picks a free port
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+def start_metrics_server(tracker: Any, port: Optional[str]) -> Optional[MetricsServer]:
+    """Start a metrics server if ``port`` (e.g. from RESEARCH_METRICS_PORT) is set."""
+    if not port:
+        return None
+    try:
+        return MetricsServer(tracker, int(port)).start()
+    except (ValueError, OSError) as e:
+        logger.warning(f"Metrics endpoint not started on port {port!r}: {e}")
+        return None
@@ -0,0 +1,254 @@
+"""BM25 search over the research notes, exposed as an in-process MCP tool.
+
+The data-analyst and report-writer used to ``Glob`` the notes and ``Read``
+every 15-25 KB file to find a single statistic. ``NoteIndex`` keeps an
+inverted index over ``files/research_notes/*.md`` and answers queries with
+ranked passages and ``file:start-end`` line anchors, so the agents can
+read only the lines they need (``Read`` with offset/limit).
+
+- notes are split into passages: blocks between blank lines and headings,
+  at most ``PASSAGE_LINES`` lines each; the section heading is indexed
+  with every passage under it and shown next to the anchor;
+- passages are tokenized with ``text.tokenize`` (words, CJK bigrams) and
+  ranked with Okapi BM25;
+- the index is maintained incrementally: before each query the notes
+  directory is stat'ed and only added, changed or deleted notes are
+  re-indexed, so researchers can keep writing notes between queries.
+
+The tool is ``mcp__notes__search_notes`` (see ``NoteIndex.create_server``).
+From the command line:
+
+    python -m research_agent.utils.note_search "GPT-3 parameters"
+    python -m research_agent.utils.note_search "勾股定理 证明" --notes-dir files/research_notes --limit 3
+"""
+
+import argparse
+import logging
+import math
+import sys
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from research_agent.utils.text import tokenize
+
+logger = logging.getLogger(__name__)
+
+NOTES_SERVER_NAME = "notes"
+NOTE_SEARCH_TOOL = f"mcp__{NOTES_SERVER_NAME}__search_notes"
+
+PASSAGE_LINES = 8
+SNIPPET_CHARS = 600
+DEFAULT_LIMIT = 5
+MAX_LIMIT = 20
+# Okapi BM25 parameters
+K1 = 1.2
+B = 0.75
+
+INPUT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "query": {"type": "string", "description": "Words to look for (English or Chinese)"},
+        "limit": {"type": "integer", "description": f"Maximum number of passages (default {DEFAULT_LIMIT})"},
+    },
+    "required": ["query"],
+}
+
+
+@dataclass
+class Passage:
+    """A run of lines of one note."""
+    note: str
+    start: int  # 1-based, inclusive
+    end: int
+    heading: str
+    text: str
+    length: int = 0
+
+    def terms(self) -> List[str]:
+        return tokenize(f"{self.heading}\n{self.text}")
+
+
+def split_passages(note: str, text: str) -> List[Passage]:
+    """Split a note into passages of at most ``PASSAGE_LINES`` lines, each under its heading."""
+    passages: List[Passage] = []
+    heading, start, lines = "", 0, []
+
+    def flush():
+        if lines:
+            passages.append(Passage(note, start, start + len(lines) - 1, heading, "\n".join(lines)))
+            lines.clear()
+
+    for number, line in enumerate(text.splitlines(), 1):
+        stripped = line.strip()
+        # Blank lines and rules (---, ***) end a passage
+        if not stripped or set(stripped) <= set("-*_= "):
+            flush()
+            continue
+        if stripped.startswith("#"):
+            flush()
+            heading = stripped.lstrip("#").strip()
+            continue
+        if len(lines) >= PASSAGE_LINES:
+            flush()
+        if not lines:
+            start = number
+        lines.append(line)
+    flush()
+    return passages
+
+
+class NoteIndex:
+    """Incrementally maintained BM25 index over the markdown notes of one directory."""
+
+    def __init__(self, notes_dir: Path):
+        self.notes_dir = Path(notes_dir)
+        self._stamps: Dict[str, Tuple[int, int]] = {}  # note -> (mtime_ns, size)
+        self._passages: Dict[int, Passage] = {}
+        self._by_note: Dict[str, List[int]] = {}
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)  # term -> passage id -> tf
+        self._total_length = 0
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._passages)
+
+    def refresh(self) -> Tuple[int, int]:
+        """Re-index notes that were added or changed, drop deleted ones.
+
+        Returns:
+            (notes indexed, notes removed)
+        """
+        current = {}
+        if self.notes_dir.is_dir():
+            for path in self.notes_dir.glob("*.md"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                current[path.name] = (stat.st_mtime_ns, stat.st_size)
+
+        removed = [note for note in self._stamps if note not in current]
+        for note in removed:
+            self._remove_note(note)
+        indexed = 0
+        for note, stamp in current.items():
+            if self._stamps.get(note) == stamp:
+                continue
+            try:
+                text = (self.notes_dir / note).read_text(encoding="utf-8", errors="replace")
+            except OSError as e:
+                logger.warning(f"Cannot index {note}: {e}")
+                continue
+            self._remove_note(note)
+            self._add_note(note, text)
+            self._stamps[note] = stamp
+            indexed += 1
+        return indexed, len(removed)
+
+    def _add_note(self, note: str, text: str):
+        ids = []
+        for passage in split_passages(note, text):
+            terms = Counter(passage.terms())
+            if not terms:
+                continue
+            passage.length = sum(terms.values())
+            pid = self._next_id
+            self._next_id += 1
+            self._passages[pid] = passage
+            self._total_length += passage.length
+            for term, tf in terms.items():
+                self._postings[term][pid] = tf
+            ids.append(pid)
+        self._by_note[note] = ids
+
+    def _remove_note(self, note: str):
+        self._stamps.pop(note, None)
+        for pid in self._by_note.pop(note, []):
+            passage = self._passages.pop(pid)
+            self._total_length -= passage.length
+            for term in set(passage.terms()):
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(pid, None)
+                    if not postings:
+                        del self._postings[term]
+
+    def search(self, query: str, limit: int = DEFAULT_LIMIT) -> List[Tuple[float, Passage]]:
+        """Best passages for ``query`` by BM25, highest score first (refreshes the index first)."""
+        self.refresh()
+        if not self._passages:
+            return []
+        count = len(self._passages)
+        avg_length = self._total_length / count
+        scores: Dict[int, float] = defaultdict(float)
+        for term, weight in Counter(tokenize(query)).items():
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for pid, tf in postings.items():
+                norm = K1 * (1 - B + B * self._passages[pid].length / avg_length)
+                scores[pid] += weight * idf * tf * (K1 + 1) / (tf + norm)
+        best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [(score, self._passages[pid]) for pid, score in best]
+
+    async def handle_tool_call(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        """MCP tool handler: search and render the passages as text content."""
+        query = str(args.get("query") or "").strip()
+        if not query:
+            return {"content": [{"type": "text", "text": "Search failed: empty query"}], "is_error": True}
+        try:
+            limit = min(max(int(args.get("limit") or DEFAULT_LIMIT), 1), MAX_LIMIT)
+        except (TypeError, ValueError):
+            limit = DEFAULT_LIMIT
+        return {"content": [{"type": "text", "text": format_results(query, self.search(query, limit), self.notes_dir)}]}
+
+    def create_server(self) -> Any:
+        """SDK MCP server config exposing the index as ``NOTE_SEARCH_TOOL`` (for ClaudeAgentOptions.mcp_servers)."""
+        from claude_agent_sdk import create_sdk_mcp_server, tool
+
+        @tool(
+            "search_notes",
+            "Full-text search of the research notes (files/research_notes/). Returns the best matching "
+            "passages with file:line anchors; Read only those lines instead of whole notes.",
+            INPUT_SCHEMA
+        )
+        async def search_notes_tool(args: Dict[str, Any]) -> Dict[str, Any]:
+            return await self.handle_tool_call(args)
+
+        return create_sdk_mcp_server(name=NOTES_SERVER_NAME, version="1.0.0", tools=[search_notes_tool])
+
+
+def format_results(query: str, results: List[Tuple[float, Passage]], notes_dir: Path) -> str:
+    """Render ranked passages as compact text for the agent."""
+    if not results:
+        return f'No passages in {notes_dir}/ match "{query}".'
+    parts = [f'{len(results)} passages in {notes_dir}/ matching "{query}":']
+    for rank, (score, passage) in enumerate(results, 1):
+        section = f" ({passage.heading})" if passage.heading else ""
+        text = passage.text
+        if len(text) > SNIPPET_CHARS:
+            text = text[:SNIPPET_CHARS].rstrip() + " ..."
+        parts.append(f"[{rank}] {passage.note}:{passage.start}-{passage.end}{section}, score {score:.1f}\n{text}")
+    return "\n\n".join(parts)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m research_agent.utils.note_search",
+        description="Search the research notes with BM25.",
+    )
+    parser.add_argument("query")
+    parser.add_argument("--notes-dir", type=Path, default=Path("files/research_notes"))
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT)
+    args = parser.parse_args(argv)
+
+    index = NoteIndex(args.notes_dir)
+    print(format_results(args.query, index.search(args.query, args.limit), args.notes_dir))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
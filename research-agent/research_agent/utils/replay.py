@@ -0,0 +1,275 @@
+"""Offline replay of recorded research sessions.
+
+Rebuilds the message stream and hook-event stream of a session from its
+``transcript.txt`` and ``tool_calls.jsonl`` (plain or compressed) and feeds them through
+``process_assistant_message`` and a fresh ``SubagentTracker``, either at
+full speed or with the original timing. No API calls are made, so real
+production traces can be profiled and regression-tested locally.
+
+Reconstruction:
+- Each ``You:`` block in the transcript is a turn; the lead agent's text
+  for that turn is replayed as one TextBlock.
+- Subagents are spawned (as lead ``Task`` ToolUseBlocks) in transcript
+  order, right before their first recorded tool call, so replayed
+  subagent ids match the original ones.
+- Every ``tool_call_start`` becomes a subagent AssistantMessage carrying
+  the ToolUseBlock followed by PreToolUse; every ``tool_call_complete``
+  becomes PostToolUse with a response of the recorded size (or error).
+
+Usage:
+    python -m research_agent.utils.replay logs/session_20251229_182713
+    python -m research_agent.utils.replay logs/session_20251229_182713 --speed 1 --out /tmp/replay
+    python -m research_agent.utils.replay logs/session_20251229_182713 --profile
+"""
+
+import argparse
+import asyncio
+import cProfile
+import json
+import pstats
+import re
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from research_agent.utils.message_handler import process_assistant_message
+from research_agent.utils.retention import open_log
+from research_agent.utils.subagent_tracker import SubagentTracker
+from research_agent.utils.transcript import TranscriptWriter
+
+SPAWN_LINE = re.compile(r"^\[🚀 Spawning (?P<agent_id>[^:\]]+): (?P<description>.*)\]$")
+TOOL_LINE = re.compile(r"^\[[^\]]+\] → ")
+
+
+# Replayed message types; the handler dispatches on these class names
+@dataclass
+class TextBlock:
+    text: str
+
+
+@dataclass
+class ToolUseBlock:
+    id: str
+    name: str
+    input: Dict[str, Any]
+
+
+@dataclass
+class AssistantMessage:
+    content: List[Any]
+    model: str = "replay"
+    parent_tool_use_id: Optional[str] = None
+
+
+@dataclass
+class ReplayTurn:
+    """One user turn: prompt, lead text, spawn order and its tool events."""
+    prompt: str
+    text: str = ""
+    spawns: List[Dict[str, str]] = field(default_factory=list)
+    events: List[Dict[str, Any]] = field(default_factory=list)
+
+
+def parse_transcript(transcript_path: Path) -> List[ReplayTurn]:
+    """Split a transcript into turns with lead text and subagent spawn order."""
+    turns: List[ReplayTurn] = []
+    with open_log(transcript_path, "r") as f:
+        content = f.read()
+
+    for block in content.split("\nYou: ")[1:]:
+        prompt, _, response = block.partition("\n")
+        turn = ReplayTurn(prompt=prompt.strip())
+        text_lines = []
+        for line in response.removeprefix("\nAgent: ").split("\n"):
+            spawn = SPAWN_LINE.match(line.strip())
+            if spawn:
+                turn.spawns.append(spawn.groupdict())
+            elif TOOL_LINE.match(line) or line.startswith("    Input: ") or line.startswith("Goodbye!"):
+                continue
+            else:
+                text_lines.append(line)
+        turn.text = "\n".join(text_lines).strip()
+        turns.append(turn)
+
+    return turns or [ReplayTurn(prompt="")]
+
+
+def load_events(log_path: Path) -> List[Dict[str, Any]]:
+    """Read tool call events from a JSONL log, skipping malformed lines."""
+    events = []
+    with open_log(log_path, "r") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(entry, dict) and entry.get("event") in ("tool_call_start", "tool_call_complete"):
+                events.append(entry)
+    return events
+
+
+def _timestamp(entry: Dict[str, Any]) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(entry["timestamp"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def build_turns(session_dir: Path) -> List[ReplayTurn]:
+    """Assign every recorded tool event to the turn that spawned its agent."""
+    turns = parse_transcript(session_dir / "transcript.txt")
+    events = load_events(session_dir / "tool_calls.jsonl")
+
+    turn_of_agent = {spawn["agent_id"]: index for index, turn in enumerate(turns) for spawn in turn.spawns}
+    current = 0
+    for entry in events:
+        # Lead agent events stay with the turn of the most recent subagent event
+        current = turn_of_agent.get(entry.get("agent_id"), current)
+        turns[current].events.append(entry)
+    return turns
+
+
+async def replay_session(
+    session_dir: Path,
+    out_dir: Path,
+    speed: float = 0.0,
+    quiet: bool = True,
+) -> Dict[str, Any]:
+    """
+    Replay a recorded session into ``out_dir``.
+
+    Args:
+        session_dir: Recorded session directory (transcript.txt + tool_calls.jsonl)
+        out_dir: Directory for the replayed transcript and logs
+        speed: 0 replays at full speed; 1.0 uses original timing, 10 is 10x faster
+        quiet: Write the replayed transcript to file only
+
+    Returns:
+        Counts of replayed messages and hook calls, and elapsed seconds
+    """
+    turns = build_turns(session_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    transcript = TranscriptWriter(out_dir / "transcript.txt", console=not quiet)
+    tracker = SubagentTracker(transcript_writer=transcript, session_dir=out_dir)
+
+    stats = {"turns": len(turns), "messages": 0, "pre_hooks": 0, "post_hooks": 0}
+    parent_of_agent: Dict[str, str] = {}
+    last_event_of_parent: Dict[str, int] = {}
+    started = time.perf_counter()
+    previous_ts: Optional[float] = None
+
+    async def pace(entry: Dict[str, Any]):
+        nonlocal previous_ts
+        ts = _timestamp(entry)
+        if speed > 0 and ts is not None and previous_ts is not None and ts > previous_ts:
+            await asyncio.sleep((ts - previous_ts) / speed)
+        if ts is not None:
+            previous_ts = ts
+
+    def emit(msg: AssistantMessage):
+        process_assistant_message(msg, tracker, transcript)
+        stats["messages"] += 1
+
+    try:
+        for turn in turns:
+            transcript.write_to_file(f"\nYou: {turn.prompt}\n")
+            transcript.write("\nAgent: ", end="")
+            if turn.text:
+                emit(AssistantMessage([TextBlock(turn.text)]))
+
+            pending_spawns = list(turn.spawns)
+            spawned = set()
+            for index, entry in enumerate(turn.events):
+                parent = entry.get("parent_tool_use_id")
+                if parent:
+                    parent_of_agent[entry.get("agent_id")] = parent
+                    last_event_of_parent[parent] = index
+
+            for index, entry in enumerate(turn.events):
+                await pace(entry)
+                agent_id = entry.get("agent_id")
+                tool_use_id = entry.get("tool_use_id")
+
+                if entry["event"] == "tool_call_start":
+                    parent = entry.get("parent_tool_use_id")
+                    if parent and agent_id not in spawned:
+                        # Spawn this agent and any that were spawned before it
+                        while pending_spawns:
+                            spawn = pending_spawns.pop(0)
+                            spawn_parent = parent_of_agent.get(spawn["agent_id"], f"replay_{spawn['agent_id']}")
+                            subagent_type = spawn["agent_id"].rsplit("-", 1)[0].lower()
+                            emit(AssistantMessage([ToolUseBlock(spawn_parent, "Task", {
+                                "subagent_type": subagent_type,
+                                "description": spawn["description"],
+                                "prompt": "",
+                            })]))
+                            spawned.add(spawn["agent_id"])
+                            if spawn["agent_id"] == agent_id:
+                                break
+
+                    tool_input = entry.get("tool_input") or {}
+                    emit(AssistantMessage(
+                        [ToolUseBlock(tool_use_id, entry.get("tool_name", "unknown"), tool_input)],
+                        parent_tool_use_id=parent,
+                    ))
+                    await tracker.pre_tool_use_hook(
+                        {"tool_name": entry.get("tool_name"), "tool_input": tool_input}, tool_use_id, None
+                    )
+                    stats["pre_hooks"] += 1
+                else:
+                    if entry.get("error"):
+                        response: Any = {"error": entry["error"]}
+                    else:
+                        response = {"content": "x" * max(0, int(entry.get("output_size") or 0) - 15)}
+                    await tracker.post_tool_use_hook({"tool_response": response}, tool_use_id, None)
+                    stats["post_hooks"] += 1
+
+                # Close the subagent's Task once its last recorded event is replayed
+                for parent, last_index in list(last_event_of_parent.items()):
+                    if last_index == index:
+                        await tracker.post_tool_use_hook({"tool_response": {"content": ""}}, parent, None)
+                        del last_event_of_parent[parent]
+
+            transcript.write("\n")
+    finally:
+        transcript.close()
+        await tracker.aclose()
+
+    stats["elapsed_s"] = round(time.perf_counter() - started, 3)
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m research_agent.utils.replay",
+        description="Replay a recorded session through the local tracking pipeline.",
+    )
+    parser.add_argument("session_dir", type=Path, help="Recorded logs/session_* directory")
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="0 = full speed (default), 1 = original timing, N = N times faster")
+    parser.add_argument("--out", type=Path, help="Output directory (default: a temporary directory)")
+    parser.add_argument("--verbose", action="store_true", help="Also render the replay to the console")
+    parser.add_argument("--profile", action="store_true", help="Profile the replay and print the top functions")
+    args = parser.parse_args(argv)
+
+    out_dir = args.out or Path(tempfile.mkdtemp(prefix="replay_"))
+    run = lambda: asyncio.run(replay_session(args.session_dir, out_dir, args.speed, quiet=not args.verbose))  # noqa: E731
+
+    if args.profile:
+        profiler = cProfile.Profile()
+        stats = profiler.runcall(run)
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+    else:
+        stats = run()
+
+    print(f"\nReplayed {args.session_dir} -> {out_dir}")
+    print("  " + ", ".join(f"{key}={value}" for key, value in stats.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,349 @@
+"""Retention for logs/session_* directories: compression and a total size cap.
+
+Closed sessions have their large files (tool call logs, traces, the
+transcript) compressed in place with zstd (if ``zstandard`` is installed)
+or gzip, e.g. ``tool_calls.jsonl`` -> ``tool_calls.jsonl.zst``. If the
+logs directory is still over the size cap afterwards, whole sessions are
+deleted oldest first.
+
+Open sessions are never touched. A running session holds an exclusive
+lock on its ``session.lock`` (``SessionLock``, taken by ``chat`` and the
+orchestrator); the kernel drops the lock when the process exits, so a
+crashed session counts as closed, and an unlocked ``session.lock`` marks
+a closed session. Sessions without a lock file (written by older
+versions) are only treated as closed once they have been idle for
+``min_idle`` seconds.
+
+Log readers (log_index, compact_log, replay) open files through
+``open_log`` / ``read_log_bytes``, which fall back to the compressed
+variants transparently.
+
+Runs at session close when ``RESEARCH_LOGS_COMPRESSION`` or
+``RESEARCH_LOGS_MAX_MB`` is set, or as a standalone command:
+
+    python -m research_agent.utils.retention --max-mb 500
+    python -m research_agent.utils.retention --compression gzip --dry-run
+"""
+
+import argparse
+import gzip
+import io
+import logging
+import os
+import shutil
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, List, Optional
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Files worth compressing; small summaries (usage.json, latency_summary.json) stay as-is
+COMPRESSIBLE = ("tool_calls.jsonl", "tool_calls.bin", "traces.otlp.jsonl", "transcript.txt")
+SUFFIXES = {"zstd": ".zst", "gzip": ".gz"}
+DEFAULT_MIN_IDLE = 10 * 60
+LOCK_NAME = "session.lock"
+
+
+class SessionLock:
+    """Marks a session directory as open for as long as it is held.
+
+    Holds an exclusive ``flock`` on ``session.lock``, which also conflicts
+    with other open sessions of the same process (batch jobs). The file
+    stays after release, marking the session as closed. Without fcntl
+    (Windows) the lock file's presence is the signal, so it is removed.
+    """
+
+    def __init__(self, session_dir: Path):
+        self.path = Path(session_dir) / LOCK_NAME
+        self._file: Optional[IO] = None
+
+    def acquire(self) -> bool:
+        """Take the lock; False if another open session holds it."""
+        f = open(self.path, "a+", encoding="utf-8")
+        if fcntl is not None:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                f.close()
+                return False
+        f.seek(0)
+        f.truncate()
+        f.write(f"{os.getpid()}\n")
+        f.flush()
+        self._file = f
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        if fcntl is None:
+            self.path.unlink(missing_ok=True)
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        if not self.acquire():
+            raise RuntimeError(f"{self.path.parent} is open in another session")
+        return self
+
+    def __exit__(self, *_args):
+        self.release()
+        return False
+
+
+def is_session_open(session_dir: Path) -> bool:
+    """True if a running session holds the lock of ``session_dir``."""
+    path = Path(session_dir) / LOCK_NAME
+    if fcntl is None:
+        return path.exists()
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return False
+    with f:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_SH | fcntl.LOCK_NB)
+        except OSError:
+            return True
+        # Lock left behind by a process that exited without releasing it
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        return False
+
+
+def default_compression() -> str:
+    return "zstd" if zstandard is not None else "gzip"
+
+
+def find_log(path: Path) -> Optional[Path]:
+    """Return ``path`` or its compressed variant, whichever exists."""
+    path = Path(path)
+    if path.exists():
+        return path
+    for suffix in SUFFIXES.values():
+        candidate = path.with_name(path.name + suffix)
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def open_log(path: Path, mode: str = "rb") -> IO:
+    """Open a log file for reading, decompressing ``.zst``/``.gz`` (or the variant of a plain path)."""
+    found = find_log(path)
+    if found is None:
+        raise FileNotFoundError(path)
+    text = "b" not in mode
+    if found.suffix == ".gz":
+        return gzip.open(found, "rt" if text else "rb", encoding="utf-8" if text else None)
+    if found.suffix == ".zst":
+        if zstandard is None:
+            raise RuntimeError(f"{found} is zstd-compressed; install zstandard to read it")
+        raw = zstandard.ZstdDecompressor().stream_reader(open(found, "rb"), closefd=True)
+        return io.TextIOWrapper(raw, encoding="utf-8") if text else raw
+    return open(found, "r" if text else "rb", encoding="utf-8" if text else None)
+
+
+def read_log_bytes(path: Path) -> bytes:
+    """Read a whole (possibly compressed) log file."""
+    with open_log(path, "rb") as f:
+        return f.read()
+
+
+def is_compressed(path: Path) -> bool:
+    return Path(path).suffix in SUFFIXES.values()
+
+
+def compress_file(path: Path, compression: str) -> Path:
+    """Compress ``path`` next to itself, keep its mtime and remove the original."""
+    target = path.with_name(path.name + SUFFIXES[compression])
+    tmp = target.with_name(target.name + ".tmp")
+    with open(path, "rb") as src, open(tmp, "wb") as dst:
+        if compression == "zstd":
+            with zstandard.ZstdCompressor(level=10).stream_writer(dst, closefd=False) as writer:
+                shutil.copyfileobj(src, writer, 1 << 20)
+        else:
+            with gzip.GzipFile(fileobj=dst, mode="wb", compresslevel=6, mtime=0) as writer:
+                shutil.copyfileobj(src, writer, 1 << 20)
+    stat = path.stat()
+    os.utime(tmp, (stat.st_atime, stat.st_mtime))
+    os.replace(tmp, target)
+    path.unlink()
+    return target
+
+
+def decompress_session(session_dir: Path) -> List[Path]:
+    """Restore the plain files of a compressed session (e.g. before resuming it)."""
+    restored = []
+    for name in COMPRESSIBLE:
+        path = Path(session_dir) / name
+        found = find_log(path)
+        if found is None or found == path:
+            continue
+        with open_log(found, "rb") as src, open(path, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+        found.unlink()
+        restored.append(path)
+    return restored
+
+
+def _dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def _last_modified(path: Path) -> float:
+    return max((f.stat().st_mtime for f in path.rglob("*") if f.is_file()), default=path.stat().st_mtime)
+
+
+@dataclass
+class RetentionReport:
+    compressed: List[Path] = field(default_factory=list)
+    evicted: List[Path] = field(default_factory=list)
+    bytes_before: int = 0
+    bytes_after: int = 0
+
+
+def enforce_retention(
+    logs_dir: Path = Path("logs"),
+    compression: Optional[str] = None,
+    max_bytes: Optional[int] = None,
+    current: Optional[Path] = None,
+    closed: Optional[Path] = None,
+    min_idle: float = DEFAULT_MIN_IDLE,
+    dry_run: bool = False,
+) -> RetentionReport:
+    """
+    Compress closed sessions and evict the oldest ones beyond ``max_bytes``.
+
+    Args:
+        logs_dir: Directory holding session_* folders
+        compression: "zstd", "gzip" or "none" (default: zstd if available)
+        max_bytes: Total size cap for all sessions; None disables eviction
+        current: Running session, never compressed or evicted
+        closed: Session that just closed; compressed regardless of idle time
+        min_idle: Seconds without writes before a session without a lock file counts as closed
+        dry_run: Report what would happen without changing anything
+
+    Returns:
+        RetentionReport with compressed files, evicted sessions and sizes
+    """
+    compression = compression or default_compression()
+    if compression == "zstd" and zstandard is None:
+        logger.warning("zstandard is not installed; compressing with gzip")
+        compression = "gzip"
+
+    def same(a: Optional[Path], b: Path) -> bool:
+        return a is not None and Path(a).resolve() == b.resolve()
+
+    report = RetentionReport()
+    sessions = sorted(p for p in Path(logs_dir).glob("session_*") if p.is_dir())
+    report.bytes_before = sum(_dir_size(p) for p in sessions)
+    now = time.time()
+
+    def is_active(session: Path) -> bool:
+        if same(current, session) or is_session_open(session):
+            return True
+        if same(closed, session) or (session / LOCK_NAME).exists():
+            return False
+        return now - _last_modified(session) < min_idle
+
+    # Sessions still being written (by this or another process) are left alone
+    active = {session for session in sessions if is_active(session)}
+
+    if compression != "none":
+        for session in sessions:
+            if session in active:
+                continue
+            for name in COMPRESSIBLE:
+                path = session / name
+                if path.is_file() and path.stat().st_size > 0:
+                    report.compressed.append(path if dry_run else compress_file(path, compression))
+
+    sizes = {session: _dir_size(session) for session in sessions}
+    total = sum(sizes.values())
+    if max_bytes is not None:
+        # Session names start with their creation timestamp, so name order is age order
+        for session in sessions:
+            if total <= max_bytes:
+                break
+            if session in active:
+                continue
+            if not dry_run:
+                try:
+                    shutil.rmtree(session)
+                except OSError as e:
+                    logger.warning(f"Could not delete {session}: {e}")
+                    # Count whatever was deleted before the failure
+                    total -= sizes[session] - (_dir_size(session) if session.exists() else 0)
+                    continue
+            report.evicted.append(session)
+            total -= sizes[session]
+
+    report.bytes_after = total
+    return report
+
+
+def retention_from_env(logs_dir: Path, closed: Optional[Path] = None) -> Optional[RetentionReport]:
+    """Run retention over ``logs_dir`` (after ``closed`` closed) if configured via the environment."""
+    compression = os.environ.get("RESEARCH_LOGS_COMPRESSION")
+    max_mb = os.environ.get("RESEARCH_LOGS_MAX_MB")
+    if not compression and not max_mb:
+        return None
+    try:
+        max_bytes = int(float(max_mb) * 1024 * 1024) if max_mb else None
+    except ValueError:
+        logger.warning(f"Ignoring invalid RESEARCH_LOGS_MAX_MB={max_mb!r}")
+        max_bytes = None
+    return enforce_retention(
+        logs_dir,
+        compression=compression or None,
+        max_bytes=max_bytes,
+        closed=closed,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m research_agent.utils.retention",
+        description="Compress closed sessions and cap the total size of logs/.",
+    )
+    parser.add_argument("--logs-dir", type=Path, default=Path("logs"), help="Logs root (default: logs)")
+    parser.add_argument("--compression", choices=["zstd", "gzip", "none"],
+                        help="Default: zstd if zstandard is installed, else gzip")
+    parser.add_argument("--max-mb", type=float, help="Total size cap; oldest sessions are deleted beyond it")
+    parser.add_argument("--min-idle-minutes", type=float, default=DEFAULT_MIN_IDLE / 60,
+                        help="Only compress sessions idle for this long (default: 10)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be done")
+    args = parser.parse_args(argv)
+
+    if not args.logs_dir.is_dir():
+        print(f"No logs directory at {args.logs_dir}", file=sys.stderr)
+        return 1
+
+    report = enforce_retention(
+        args.logs_dir,
+        compression=args.compression,
+        max_bytes=int(args.max_mb * 1024 * 1024) if args.max_mb is not None else None,
+        min_idle=args.min_idle_minutes * 60,
+        dry_run=args.dry_run,
+    )
+    compress_verb, delete_verb = ("Would compress", "Would delete") if args.dry_run else ("Compressed", "Deleted")
+    print(f"{compress_verb} {len(report.compressed)} files")
+    for session in report.evicted:
+        print(f"{delete_verb} {session}")
+    print(f"{report.bytes_before / 1e6:,.1f} MB -> {report.bytes_after / 1e6:,.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
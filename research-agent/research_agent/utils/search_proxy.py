@@ -0,0 +1,317 @@
+"""Caching, coalescing proxy for the researchers' Tavily search tool.
+
+Researchers call the search tool over and over, and parallel researchers
+often send near-identical queries. ``SearchProxy`` sits in front of the
+Tavily search API and is exposed to the agents as an in-process SDK MCP
+server (``mcp__tavily_proxy__tavily-search``):
+
+- queries are keyed by their normalized form (case, punctuation, word
+  order and repeated words do not matter) plus the search options;
+- results are cached on disk, one JSON file per key, for ``ttl`` seconds;
+- identical requests that arrive while one is in flight share its result
+  instead of calling the API again;
+- ``record`` mode always calls the API and stores the results, ``replay``
+  mode serves stored results only (ignoring the TTL, never touching the
+  network), for offline benchmarks and reproducible runs.
+
+One proxy is shared by every session of the process (see
+``search_proxy_from_env``), so batch jobs and orchestrator runs reuse each
+other's results. It is enabled when ``TAVILY_API_KEY`` is set (or in
+replay mode) and configured with:
+
+    RESEARCH_SEARCH_MODE=cache|record|replay|off   (default: cache)
+    RESEARCH_SEARCH_CACHE_DIR=.cache/search
+    RESEARCH_SEARCH_TTL_HOURS=24
+
+Cache maintenance:
+
+    python -m research_agent.utils.search_proxy stats
+    python -m research_agent.utils.search_proxy prune
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import time
+import unicodedata
+import urllib.request
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Tool name of the user-level Tavily MCP server, and of the proxy replacing it
+TAVILY_TOOL = "mcp__tavily__tavily-search"
+PROXY_SERVER_NAME = "tavily_proxy"
+PROXY_TOOL = f"mcp__{PROXY_SERVER_NAME}__tavily-search"
+
+TAVILY_SEARCH_URL = "https://api.tavily.com/search"
+DEFAULT_CACHE_DIR = Path(".cache/search")
+DEFAULT_TTL = 24 * 3600
+MODES = ("cache", "record", "replay")
+
+# Search options that change the results (and so belong in the cache key)
+SEARCH_OPTIONS = ("max_results", "search_depth", "topic", "time_range", "include_domains", "exclude_domains")
+
+INPUT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "query": {"type": "string", "description": "Search query"},
+        "max_results": {"type": "integer", "description": "Maximum number of results (default 5)"},
+        "search_depth": {"type": "string", "enum": ["basic", "advanced"]},
+        "topic": {"type": "string", "enum": ["general", "news", "finance"]},
+        "time_range": {"type": "string", "enum": ["day", "week", "month", "year"]},
+        "include_domains": {"type": "array", "items": {"type": "string"}},
+        "exclude_domains": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["query"],
+}
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a query: NFKC, casefolded, punctuation dropped, unique words sorted."""
+    text = unicodedata.normalize("NFKC", query).casefold()
+    return " ".join(sorted(set(re.findall(r"\w+", text))))
+
+
+def cache_key(args: Dict[str, Any]) -> str:
+    """Key of a search request: normalized query plus the options that affect results."""
+    options = {name: args[name] for name in SEARCH_OPTIONS if args.get(name) not in (None, [], "")}
+    for name in ("include_domains", "exclude_domains"):
+        if name in options:
+            options[name] = sorted(options[name])
+    payload = json.dumps({"query": normalize_query(args.get("query", "")), **options}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def format_results(response: Dict[str, Any]) -> str:
+    """Render a Tavily response as text, in the layout of the Tavily MCP tool."""
+    parts = []
+    if response.get("answer"):
+        parts.append(f"Answer: {response['answer']}\n")
+    parts.append("Detailed Results:")
+    for result in response.get("results", []):
+        parts.append(
+            f"\nTitle: {result.get('title', '')}\n"
+            f"URL: {result.get('url', '')}\n"
+            f"Content: {result.get('content', '')}"
+        )
+    return "\n".join(parts)
+
+
+def tavily_search(args: Dict[str, Any], api_key: Optional[str] = None, timeout: float = 30.0) -> Dict[str, Any]:
+    """Call the Tavily search API (blocking; run it in a thread)."""
+    api_key = api_key or os.environ.get("TAVILY_API_KEY")
+    if not api_key:
+        raise RuntimeError("TAVILY_API_KEY is not set")
+    body = {"query": args["query"], **{name: args[name] for name in SEARCH_OPTIONS if args.get(name) is not None}}
+    request = urllib.request.Request(
+        TAVILY_SEARCH_URL,
+        data=json.dumps(body).encode("utf-8"),
+        headers={"Content-Type": "application/json", "Authorization": f"Bearer {api_key}"},
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+class SearchCache:
+    """On-disk cache of search responses, one JSON file per key."""
+
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR, ttl: Optional[float] = DEFAULT_TTL):
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str, ignore_ttl: bool = False) -> Optional[Dict[str, Any]]:
+        """Return the cached response for ``key`` (None if missing or expired)."""
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if not ignore_ttl and self.ttl is not None and time.time() - entry.get("stored_at", 0) > self.ttl:
+            return None
+        return entry.get("response")
+
+    def put(self, key: str, args: Dict[str, Any], response: Dict[str, Any]):
+        """Store a response atomically (concurrent sessions may write the same key)."""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"stored_at": time.time(), "args": args, "response": response}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def entries(self) -> List[Path]:
+        return sorted(self.cache_dir.glob("*/*.json"))
+
+    def prune(self) -> int:
+        """Delete expired entries; returns how many were removed."""
+        removed = 0
+        now = time.time()
+        for path in self.entries():
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    stored_at = json.load(f).get("stored_at", 0)
+            except json.JSONDecodeError:
+                stored_at = 0
+            if self.ttl is not None and now - stored_at > self.ttl:
+                path.unlink()
+                removed += 1
+        return removed
+
+
+@dataclass
+class SearchStats:
+    """Counters of one proxy, for the session summary."""
+    requests: int = 0
+    hits: int = 0
+    coalesced: int = 0
+    upstream: int = 0
+    errors: int = 0
+    upstream_seconds: float = 0.0
+
+
+class SearchProxy:
+    """Serves search requests from the cache, coalescing identical in-flight ones."""
+
+    def __init__(
+        self,
+        cache: SearchCache,
+        backend: Callable[[Dict[str, Any]], Dict[str, Any]] = tavily_search,
+        mode: str = "cache"
+    ):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}, not {mode!r}")
+        self.cache = cache
+        self.backend = backend
+        self.mode = mode
+        self.stats = SearchStats()
+        self._in_flight: Dict[str, Awaitable[Dict[str, Any]]] = {}
+
+    async def search(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the Tavily response for ``args`` (raises on upstream errors or replay misses)."""
+        self.stats.requests += 1
+        key = cache_key(args)
+
+        if self.mode != "record":
+            cached = self.cache.get(key, ignore_ttl=self.mode == "replay")
+            if cached is not None:
+                self.stats.hits += 1
+                return cached
+            if self.mode == "replay":
+                raise LookupError(f"no recorded result for query {args.get('query')!r}")
+
+        # Share the result of an identical request that is already running
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self.stats.coalesced += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.ensure_future(self._fetch(key, args))
+        self._in_flight[key] = future
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if future.done():
+                self._in_flight.pop(key, None)
+            else:
+                future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+    async def _fetch(self, key: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        self.stats.upstream += 1
+        started = time.monotonic()
+        try:
+            response = await asyncio.to_thread(self.backend, args)
+        except Exception:
+            self.stats.errors += 1
+            raise
+        finally:
+            self.stats.upstream_seconds += time.monotonic() - started
+        self.cache.put(key, args, response)
+        return response
+
+    async def handle_tool_call(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        """MCP tool handler: search and render the results as text content."""
+        try:
+            response = await self.search(args)
+        except (LookupError, RuntimeError, OSError, ValueError) as e:
+            return {"content": [{"type": "text", "text": f"Search failed: {e}"}], "is_error": True}
+        return {"content": [{"type": "text", "text": format_results(response)}]}
+
+    def create_server(self) -> Any:
+        """SDK MCP server config exposing the proxy as ``PROXY_TOOL`` (for ClaudeAgentOptions.mcp_servers)."""
+        from claude_agent_sdk import create_sdk_mcp_server, tool
+
+        @tool("tavily-search", "Search the web with Tavily (cached). Returns titles, URLs and content.", INPUT_SCHEMA)
+        async def tavily_search_tool(args: Dict[str, Any]) -> Dict[str, Any]:
+            return await self.handle_tool_call(args)
+
+        return create_sdk_mcp_server(name=PROXY_SERVER_NAME, version="1.0.0", tools=[tavily_search_tool])
+
+    def summary(self) -> str:
+        stats = self.stats
+        return (f"{stats.requests} searches: {stats.hits} cached, {stats.coalesced} coalesced, "
+                f"{stats.upstream} upstream ({stats.upstream_seconds:.1f}s), {stats.errors} errors")
+
+
+_proxy: Optional[SearchProxy] = None
+
+
+def search_proxy_from_env() -> Optional[SearchProxy]:
+    """The process-wide proxy, or None if it is disabled or has no API key (and is not replaying)."""
+    global _proxy
+    mode = os.environ.get("RESEARCH_SEARCH_MODE", "cache")
+    if mode == "off" or (mode != "replay" and not os.environ.get("TAVILY_API_KEY")):
+        return None
+    if _proxy is None:
+        try:
+            ttl = float(os.environ.get("RESEARCH_SEARCH_TTL_HOURS", DEFAULT_TTL / 3600)) * 3600
+        except ValueError:
+            logger.warning("Ignoring invalid RESEARCH_SEARCH_TTL_HOURS")
+            ttl = DEFAULT_TTL
+        cache = SearchCache(Path(os.environ.get("RESEARCH_SEARCH_CACHE_DIR", DEFAULT_CACHE_DIR)), ttl=ttl)
+        try:
+            _proxy = SearchProxy(cache, mode=mode)
+        except ValueError as e:
+            logger.warning(f"Search proxy disabled: {e}")
+            return None
+    return _proxy
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m research_agent.utils.search_proxy",
+        description="Inspect or prune the search proxy cache.",
+    )
+    parser.add_argument("command", choices=["stats", "prune"])
+    parser.add_argument("--cache-dir", type=Path,
+                        default=Path(os.environ.get("RESEARCH_SEARCH_CACHE_DIR", DEFAULT_CACHE_DIR)))
+    parser.add_argument("--ttl-hours", type=float,
+                        default=float(os.environ.get("RESEARCH_SEARCH_TTL_HOURS", DEFAULT_TTL / 3600)))
+    args = parser.parse_args(argv)
+
+    cache = SearchCache(args.cache_dir, ttl=args.ttl_hours * 3600)
+    if args.command == "prune":
+        print(f"Removed {cache.prune()} expired entries from {args.cache_dir}")
+        return 0
+
+    entries = cache.entries()
+    size = sum(path.stat().st_size for path in entries)
+    print(f"{args.cache_dir}: {len(entries)} entries, {size / 1e6:.1f} MB")
+    if entries:
+        ages = [time.time() - path.stat().st_mtime for path in entries]
+        print(f"  newest {min(ages) / 3600:.1f}h, oldest {max(ages) / 3600:.1f}h old")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,29 +2,49 @@
 
 import json
 import logging
+import time
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Any
-from collections import defaultdict
+from typing import Deque, Dict, List, Optional, Any, Set, Tuple
+from collections import defaultdict, deque
+
+from research_agent.utils.bounded_format import bounded_json, estimate_size
+from research_agent.utils.compact_log import COMPACT_LOG_NAME, MAGIC, CompactEncoder
+from research_agent.utils.latency import LatencyHistogram
+from research_agent.utils.log_writer import AsyncLogWriter
+from research_agent.utils.tracing import SessionTracer
 
 logger = logging.getLogger(__name__)
 
+# Completed tool calls kept in memory per subagent; older ones remain only as tool_calls.jsonl
+# events (inputs, output sizes) and the per-tool counters
+RECENT_TOOL_CALLS = 32
+
+# In-flight calls whose PostToolUse never arrives (interrupts, failures) are evicted past this
+MAX_IN_FLIGHT_TOOL_CALLS = 1024
 
-@dataclass
+@dataclass(slots=True)
 class ToolCallRecord:
-    """Record of a single tool call."""
+    """Record of a single tool call.
+
+    ``tool_input`` is only held while the call is in flight. Once the
+    PostToolUse event is handled it is dropped (tool_calls.jsonl has it
+    from the tool_call_start event); the tool output is never kept or
+    persisted, only its size (``output_size``) is recorded.
+    """
     timestamp: str
     tool_name: str
-    tool_input: Dict[str, Any]
+    tool_input: Optional[Dict[str, Any]]
     tool_use_id: str
     subagent_type: str
     parent_tool_use_id: Optional[str] = None
-    tool_output: Optional[Any] = None
+    output_size: int = 0
     error: Optional[str] = None
+    started_at: float = 0.0  # time.monotonic() at PreToolUse
 
 
-@dataclass
+@dataclass(slots=True)
 class SubagentSession:
     """Information about a subagent execution session."""
     subagent_type: str
@@ -33,7 +53,8 @@ class SubagentSession:
     description: str
     prompt_preview: str
     subagent_id: str  # Unique identifier like "RESEARCHER-1"
-    tool_calls: List[ToolCallRecord] = field(default_factory=list)
+    tool_calls: Deque[ToolCallRecord] = field(default_factory=lambda: deque(maxlen=RECENT_TOOL_CALLS))
+    tool_call_count: int = 0
 
 
 class SubagentTracker:
@@ -45,29 +66,78 @@ class SubagentTracker:
     2. Uses hooks (PreToolUse/PostToolUse) to capture all tool invocations
     3. Associates tool calls with their originating subagent
     4. Logs tool usage to console and transcript files
+
+    Attribution is per tool call: every ToolUseBlock seen in the message
+    stream records its owning parent_tool_use_id, and the hook for that
+    tool_use_id looks the owner up. This stays correct when several
+    subagents run in parallel and their messages interleave.
+
+    Hooks never wait for the message stream. Tool hooks fired inside a
+    subagent carry the CLI's ``agent_id``; once one call of that agent has
+    been matched to its Task, later hooks resolve from the hook input alone.
+    Otherwise, if a hook fires before its ToolUseBlock has been consumed,
+    the call is attributed to the current context at once; counters, the in-flight record and the span are moved
+    when ``record_tool_owner`` reports the real owner, and the call's log
+    line and tool_call_start event are held back until then (or until the
+    call completes, whichever comes first).
     """
 
-    def __init__(self, transcript_writer=None, session_dir: Optional[Path] = None):
+    def __init__(
+        self,
+        transcript_writer=None,
+        session_dir: Optional[Path] = None,
+        log_format: str = "jsonl",
+        tracer: Optional[SessionTracer] = None,
+        append: bool = False
+    ):
         # Map: parent_tool_use_id -> SubagentSession
         self.sessions: Dict[str, SubagentSession] = {}
 
-        # Map: tool_use_id -> ToolCallRecord (for efficient lookup in post hook)
+        # Map: tool_use_id -> ToolCallRecord for in-flight calls (evicted in post hook)
         self.tool_call_records: Dict[str, ToolCallRecord] = {}
 
-        # Current execution context (from message stream)
+        # Current execution context (from message stream); fallback attribution only
         self._current_parent_id: Optional[str] = None
 
+        # Map: tool_use_id -> parent_tool_use_id of the message that requested it
+        self._tool_owners: Dict[str, Optional[str]] = {}
+
+        # Map: tool_use_id -> (record, hook agent_id) of a call attributed before its owner was seen
+        self._unattributed: Dict[str, Tuple[ToolCallRecord, Optional[str]]] = {}
+
+        # Map: agent_id reported in hook inputs -> parent_tool_use_id of that subagent
+        self._agent_parents: Dict[str, str] = {}
+
         # Counter for each subagent type to create unique IDs
         self.subagent_counters: Dict[str, int] = defaultdict(int)
 
         # Transcript writer for logging clean output
         self.transcript_writer = transcript_writer
 
-        # Tool call detail log (JSONL format)
-        self.tool_log_file = None
-        if session_dir:
-            tool_log_path = session_dir / "tool_calls.jsonl"
-            self.tool_log_file = open(tool_log_path, "w", encoding="utf-8")
+        # Optional span exporter for the lead -> subagent -> tool hierarchy
+        self.tracer = tracer
+
+        # Map: (agent_type, tool_name) -> tool call latency histogram
+        self.latency_histograms: Dict[Tuple[str, str], LatencyHistogram] = defaultdict(LatencyHistogram)
+
+        # Live counters per (agent_type, tool_name), scraped by utils/metrics.py
+        self.tool_call_counts: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.tool_error_counts: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.tool_output_bytes: Dict[Tuple[str, str], int] = defaultdict(int)
+
+        # Task tool_use_ids of subagents that have not returned yet
+        self.active_subagents: Set[str] = set()
+
+        # Tool call detail log, written off the hook path:
+        # "jsonl" (tool_calls.jsonl, full payloads) or "compact" (tool_calls.bin)
+        self.session_dir = session_dir
+        self.tool_log_writer: Optional[AsyncLogWriter] = None
+        if session_dir and log_format == "compact":
+            self.tool_log_writer = AsyncLogWriter(
+                session_dir / COMPACT_LOG_NAME, encode=CompactEncoder().encode, header=MAGIC, append=append
+            )
+        elif session_dir:
+            self.tool_log_writer = AsyncLogWriter(session_dir / "tool_calls.jsonl", append=append)
 
         logger.debug("SubagentTracker initialized")
 
@@ -104,6 +174,13 @@ class SubagentTracker:
         )
 
         self.sessions[tool_use_id] = session
+        self.active_subagents.add(tool_use_id)
+        if self.tracer:
+            self.tracer.start_span(tool_use_id, f"subagent {subagent_id}", attributes={
+                "agent_id": subagent_id,
+                "agent_type": subagent_type,
+                "description": description,
+            })
         logger.info(f"{'='*60}")
         logger.info(f"🚀 SUBAGENT SPAWNED: {subagent_id}")
         logger.info(f"{'='*60}")
@@ -112,6 +189,142 @@ class SubagentTracker:
 
         return subagent_id
 
+    def checkpoint_state(self) -> Dict[str, Any]:
+        """Serializable subagent state for a session checkpoint."""
+        return {
+            "subagent_counters": dict(self.subagent_counters),
+            "sessions": {
+                tool_use_id: {
+                    "subagent_type": session.subagent_type,
+                    "spawned_at": session.spawned_at,
+                    "description": session.description,
+                    "prompt_preview": session.prompt_preview,
+                    "subagent_id": session.subagent_id,
+                    "tool_call_count": session.tool_call_count,
+                }
+                for tool_use_id, session in self.sessions.items()
+            },
+        }
+
+    def restore_state(self, state: Dict[str, Any]):
+        """
+        Restore subagents from a checkpoint so numbering continues where it left off.
+
+        Restored subagents are not marked active; their runs ended with the
+        process that spawned them.
+        """
+        self.subagent_counters.update(state.get("subagent_counters", {}))
+        for tool_use_id, fields in state.get("sessions", {}).items():
+            self.sessions[tool_use_id] = SubagentSession(parent_tool_use_id=tool_use_id, **fields)
+
+    def record_tool_owner(self, tool_use_id: str, parent_tool_use_id: Optional[str]):
+        """
+        Record which agent requested a tool call, as seen in the message stream.
+
+        Args:
+            tool_use_id: The ID of the ToolUseBlock
+            parent_tool_use_id: The parent tool use ID of the message containing it
+                (None for the main agent)
+        """
+        pending = self._unattributed.pop(tool_use_id, None)
+        if pending is not None:
+            # The hook ran first and guessed the owner; correct it and log the call
+            record, agent_id = pending
+            owner = parent_tool_use_id if parent_tool_use_id in self.sessions else None
+            self._learn_agent(agent_id, owner)
+            if owner != record.parent_tool_use_id:
+                self._reattribute(record, owner)
+            entry = self._log_start(record)
+            if self.tool_log_writer:
+                self.tool_log_writer.put_nowait(entry)
+            return
+
+        self._tool_owners[tool_use_id] = parent_tool_use_id
+        if len(self._tool_owners) > MAX_IN_FLIGHT_TOOL_CALLS:
+            del self._tool_owners[next(iter(self._tool_owners))]
+
+    def _learn_agent(self, agent_id: Optional[str], parent_tool_use_id: Optional[str]):
+        """Remember which Task a hook ``agent_id`` belongs to."""
+        if agent_id and parent_tool_use_id:
+            self._agent_parents[agent_id] = parent_tool_use_id
+
+    def _resolve_parent(self, tool_use_id: str, hook_input: Dict[str, Any]) -> Tuple[Optional[str], bool]:
+        """Return the parent_tool_use_id that owns a tool call, and whether it is confirmed."""
+        agent_id = hook_input.get('agent_id')
+        if tool_use_id in self._tool_owners:
+            parent_id = self._tool_owners.pop(tool_use_id)
+            self._learn_agent(agent_id, parent_id if parent_id in self.sessions else None)
+            return parent_id, True
+        # Subagent hooks name their agent; known once one of its calls was matched
+        if agent_id in self._agent_parents:
+            return self._agent_parents[agent_id], True
+        # Hook fired before the message stream delivered the ToolUseBlock
+        return self._current_parent_id, False
+
+    def _attribute(self, record: ToolCallRecord):
+        """Count a call against the agent in ``record`` (and track it if it is a subagent's)."""
+        session = self.sessions.get(record.parent_tool_use_id)
+        self.tool_call_counts[(record.subagent_type, record.tool_name)] += 1
+        if session:
+            session.tool_calls.append(record)
+            session.tool_call_count += 1
+            self._track_in_flight(record)
+
+    def _unattribute(self, record: ToolCallRecord):
+        """Undo ``_attribute`` for a call whose owner was guessed wrong."""
+        session = self.sessions.get(record.parent_tool_use_id)
+        self.tool_call_counts[(record.subagent_type, record.tool_name)] -= 1
+        if session:
+            try:
+                session.tool_calls.remove(record)
+            except ValueError:
+                pass
+            session.tool_call_count -= 1
+            self.tool_call_records.pop(record.tool_use_id, None)
+
+    def _reattribute(self, record: ToolCallRecord, owner: Optional[str]):
+        """Move an in-flight call to the agent that actually requested it."""
+        self._unattribute(record)
+        session = self.sessions.get(owner) if owner else None
+        record.parent_tool_use_id = owner if session else None
+        record.subagent_type = session.subagent_type if session else "lead"
+        self._attribute(record)
+        if self.tracer:
+            self.tracer.reparent_span(record.tool_use_id, record.parent_tool_use_id, {
+                "agent_id": session.subagent_id if session else "MAIN_AGENT",
+                "agent_type": record.subagent_type
+            })
+
+    def _log_start(self, record: ToolCallRecord) -> Dict[str, Any]:
+        """Log a call to console and transcript; return its tool_call_start entry."""
+        session = self.sessions.get(record.parent_tool_use_id)
+        agent_id = session.subagent_id if session else "MAIN_AGENT"
+        self._log_tool_use(agent_id if session else "MAIN AGENT", record.tool_name, record.tool_input)
+        entry = {
+            "event": "tool_call_start",
+            "timestamp": record.timestamp,
+            "tool_use_id": record.tool_use_id,
+            "agent_id": agent_id,
+            "agent_type": record.subagent_type,
+            "tool_name": record.tool_name,
+            "tool_input": record.tool_input
+        }
+        if session:
+            entry["parent_tool_use_id"] = record.parent_tool_use_id
+        return entry
+
+    def _finish_unattributed(self) -> List[Dict[str, Any]]:
+        """Log every call still waiting for its owner under the owner it was given."""
+        pending, self._unattributed = list(self._unattributed.values()), {}
+        return [self._log_start(record) for record, _ in pending]
+
+    def _track_in_flight(self, record: ToolCallRecord):
+        """Remember an in-flight call, evicting the oldest if PostToolUse never came."""
+        self.tool_call_records[record.tool_use_id] = record
+        if len(self.tool_call_records) > MAX_IN_FLIGHT_TOOL_CALLS:
+            oldest_id = next(iter(self.tool_call_records))
+            self.tool_call_records.pop(oldest_id).tool_input = None
+
     def set_current_context(self, parent_tool_use_id: Optional[str]):
         """
         Update the current execution context from message stream.
@@ -169,83 +382,94 @@ class SubagentTracker:
         if 'subagent_type' in tool_input:
             return f"spawn={tool_input.get('subagent_type', '')} ({tool_input.get('description', '')})"
 
-        # Fallback: generic (truncated)
-        return str(tool_input)[:max_length]
+        # Fallback: generic (truncated without serializing the whole input)
+        return bounded_json(tool_input, max_length)[0]
 
-    def _log_to_jsonl(self, log_entry: Dict[str, Any]):
-        """Write structured log entry to JSONL file."""
-        if self.tool_log_file:
-            self.tool_log_file.write(json.dumps(log_entry) + "\n")
-            self.tool_log_file.flush()
+    async def _log_to_jsonl(self, log_entry: Dict[str, Any]):
+        """Queue structured log entry for the background JSONL writer."""
+        if self.tool_log_writer:
+            await self.tool_log_writer.put(log_entry)
 
     async def pre_tool_use_hook(self, hook_input, tool_use_id, context):
         """Hook callback for PreToolUse events - captures tool calls."""
         tool_name = hook_input['tool_name']
         tool_input = hook_input['tool_input']
-        timestamp = datetime.now().isoformat()
-
-        # Determine agent context
-        is_subagent = self._current_parent_id and self._current_parent_id in self.sessions
-
-        if is_subagent:
-            session = self.sessions[self._current_parent_id]
-            agent_id = session.subagent_id
-            agent_type = session.subagent_type
-
-            # Create and store record for subagent
-            record = ToolCallRecord(
-                timestamp=timestamp,
-                tool_name=tool_name,
-                tool_input=tool_input,
-                tool_use_id=tool_use_id,
-                subagent_type=agent_type,
-                parent_tool_use_id=self._current_parent_id
-            )
-            session.tool_calls.append(record)
-            self.tool_call_records[tool_use_id] = record
-
-            # Log
-            self._log_tool_use(agent_id, tool_name, tool_input)
-            self._log_to_jsonl({
-                "event": "tool_call_start",
-                "timestamp": timestamp,
-                "tool_use_id": tool_use_id,
-                "agent_id": agent_id,
-                "agent_type": agent_type,
-                "tool_name": tool_name,
-                "tool_input": tool_input,
-                "parent_tool_use_id": self._current_parent_id
-            })
-        elif tool_name != 'Task':  # Skip Task calls for main agent (handled by spawn message)
-            # Main agent tool call
-            self._log_tool_use("MAIN AGENT", tool_name, tool_input)
-            self._log_to_jsonl({
-                "event": "tool_call_start",
-                "timestamp": timestamp,
-                "tool_use_id": tool_use_id,
-                "agent_id": "MAIN_AGENT",
-                "agent_type": "lead",
+
+        # Determine agent context from the message that requested this call
+        parent_id, confirmed = self._resolve_parent(tool_use_id, hook_input)
+        session = self.sessions.get(parent_id)
+        if not session and tool_name == 'Task':
+            # Main agent spawning a subagent: handled by the spawn message
+            return {'continue_': True}
+
+        record = ToolCallRecord(
+            timestamp=datetime.now().isoformat(),
+            tool_name=tool_name,
+            tool_input=tool_input,
+            tool_use_id=tool_use_id,
+            subagent_type=session.subagent_type if session else "lead",
+            parent_tool_use_id=parent_id if session else None,
+            started_at=time.monotonic()
+        )
+        self._attribute(record)
+
+        if self.tracer:
+            self.tracer.start_span(tool_use_id, tool_name, parent_key=record.parent_tool_use_id, attributes={
                 "tool_name": tool_name,
-                "tool_input": tool_input
+                "agent_id": session.subagent_id if session else "MAIN_AGENT",
+                "agent_type": record.subagent_type
             })
 
+        if confirmed:
+            await self._log_to_jsonl(self._log_start(record))
+        else:
+            # Logged once record_tool_owner confirms (or corrects) the owner
+            self._unattributed[tool_use_id] = (record, hook_input.get('agent_id'))
+            if len(self._unattributed) > MAX_IN_FLIGHT_TOOL_CALLS:
+                oldest, _ = self._unattributed.pop(next(iter(self._unattributed)))
+                await self._log_to_jsonl(self._log_start(oldest))
+
         return {'continue_': True}
 
     async def post_tool_use_hook(self, hook_input, tool_use_id, context):
         """Hook callback for PostToolUse events - captures tool results."""
         tool_response = hook_input.get('tool_response')
-        record = self.tool_call_records.get(tool_use_id)
+
+        # Completed before its owner was seen: keep the attribution it was given
+        pending = self._unattributed.pop(tool_use_id, None)
+        if pending is not None:
+            await self._log_to_jsonl(self._log_start(pending[0]))
+
+        record = self.tool_call_records.pop(tool_use_id, None)
 
         if not record:
+            # Lead agent calls: a Task completing here closes its subagent span
+            error = tool_response.get('error') if isinstance(tool_response, dict) else None
+            output_size = estimate_size(tool_response) if tool_response else 0
+            key = ("lead", hook_input.get('tool_name', 'unknown'))
+            self.tool_output_bytes[key] += output_size
+            if error:
+                self.tool_error_counts[key] += 1
+            self.active_subagents.discard(tool_use_id)
+            if self.tracer:
+                self.tracer.end_span(tool_use_id, {"output_size": output_size}, error=error)
             return {'continue_': True}
 
-        # Update record with output
-        record.tool_output = tool_response
+        # Pair with PreToolUse to get the wall-clock duration
+        key = (record.subagent_type, record.tool_name)
+        duration = time.monotonic() - record.started_at
+        self.latency_histograms[key].record(duration)
+
+        # Keep only a compact summary: the input is in tool_calls.jsonl, the output is discarded
+        record.tool_input = None
+        record.output_size = estimate_size(tool_response) if tool_response else 0
+        self.tool_output_bytes[key] += record.output_size
 
         # Check for errors
         error = tool_response.get('error') if isinstance(tool_response, dict) else None
         if error:
             record.error = error
+            self.tool_error_counts[key] += 1
             session = self.sessions.get(record.parent_tool_use_id)
             if session:
                 logger.warning(f"[{session.subagent_id}] Tool {record.tool_name} error: {error}")
@@ -255,8 +479,11 @@ class SubagentTracker:
         agent_id = session.subagent_id if session else "MAIN_AGENT"
         agent_type = session.subagent_type if session else "lead"
 
+        if self.tracer:
+            self.tracer.end_span(tool_use_id, {"output_size": record.output_size}, error=error)
+
         # Log completion to JSONL
-        self._log_to_jsonl({
+        await self._log_to_jsonl({
             "event": "tool_call_complete",
             "timestamp": datetime.now().isoformat(),
             "tool_use_id": tool_use_id,
@@ -265,12 +492,46 @@ class SubagentTracker:
             "tool_name": record.tool_name,
             "success": error is None,
             "error": error,
-            "output_size": len(str(tool_response)) if tool_response else 0
+            "output_size": record.output_size,
+            "duration_ms": round(duration * 1000, 3)
         })
 
         return {'continue_': True}
 
+    def latency_summary(self) -> Dict[str, Any]:
+        """Summarize tool call latency per (agent_type, tool_name), slowest total first."""
+        rows = [
+            {"agent_type": agent_type, "tool_name": tool_name, **histogram.summary()}
+            for (agent_type, tool_name), histogram in self.latency_histograms.items()
+        ]
+        rows.sort(key=lambda row: row["total_ms"], reverse=True)
+        return {"generated_at": datetime.now().isoformat(), "tools": rows}
+
+    def _write_latency_summary(self):
+        """Write latency_summary.json to the session directory."""
+        if not self.session_dir or not self.latency_histograms:
+            return
+        summary_path = self.session_dir / "latency_summary.json"
+        with open(summary_path, "w", encoding="utf-8") as f:
+            json.dump(self.latency_summary(), f, indent=2)
+
+    async def aclose(self):
+        """Flush pending log entries, close the tool log and write the latency summary."""
+        for entry in self._finish_unattributed():
+            await self._log_to_jsonl(entry)
+        if self.tool_log_writer:
+            await self.tool_log_writer.aclose()
+        if self.tracer:
+            self.tracer.close()
+        self._write_latency_summary()
+
     def close(self):
-        """Close the tool log file."""
-        if self.tool_log_file:
-            self.tool_log_file.close()
+        """Close the tool log file, flushing any pending entries, and write the latency summary."""
+        entries = self._finish_unattributed()
+        if self.tool_log_writer:
+            for entry in entries:
+                self.tool_log_writer.put_nowait(entry)
+            self.tool_log_writer.close()
+        if self.tracer:
+            self.tracer.close()
+        self._write_latency_summary()
@@ -0,0 +1,38 @@
+"""Text helpers shared by the note dedup pass and note search.
+
+``tokenize`` handles mixed English/CJK research notes: Latin words and
+numbers become lowercase word tokens, while runs of CJK characters (which
+have no spaces between words) become overlapping character bigrams, e.g.
+``勾股定理`` -> ``勾股``, ``股定``, ``定理``. A lone CJK character is kept
+as a unigram.
+"""
+
+import re
+import unicodedata
+from typing import List
+
+# Han (incl. extension A and compatibility), kana, Hangul
+_CJK = "぀-ヿ㐀-䶿一-鿿가-힯豈-﫿"
+_TOKEN_RE = re.compile(rf"[{_CJK}]+|[^\W_{_CJK}]+(?:[.,'][^\W_{_CJK}]+)*")
+_CJK_RE = re.compile(rf"[{_CJK}]")
+
+
+def normalize(text: str) -> str:
+    """NFKC (full-width digits and letters become ASCII) and casefold."""
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into word tokens and CJK character bigrams."""
+    tokens: List[str] = []
+    for match in _TOKEN_RE.finditer(normalize(text)):
+        token = match.group(0)
+        if _CJK_RE.match(token):
+            if len(token) == 1:
+                tokens.append(token)
+            else:
+                tokens.extend(token[i:i + 2] for i in range(len(token) - 1))
+        else:
+            tokens.append(token)
+    return tokens
+
@@ -0,0 +1,212 @@
+"""Trace spans for the lead agent → subagent → tool call hierarchy.
+
+Each user turn is a trace with a root span. Subagents spawned through
+``Task`` are child spans of the turn, and every tool call is a child of
+the agent that made it. Finished spans are exported as OTLP-JSON
+(one ``ExportTraceServiceRequest`` per line) to ``traces.otlp.jsonl`` in
+the session directory, and additionally POSTed to an OTLP/HTTP collector
+when ``OTEL_EXPORTER_OTLP_ENDPOINT`` is set (e.g. http://localhost:4318).
+"""
+
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+import urllib.request
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACE_FILE_NAME = "traces.otlp.jsonl"
+
+# OTLP span kinds / status codes
+SPAN_KIND_INTERNAL = 1
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+@dataclass(slots=True)
+class Span:
+    """A single timed operation in a trace."""
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str]
+    name: str
+    start_ns: int
+    end_ns: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": SPAN_KIND_INTERNAL,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": STATUS_ERROR, "message": self.error} if self.error else {"code": STATUS_OK},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        return span
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+class SessionTracer:
+    """
+    Builds spans from tracker events and exports them per turn.
+
+    Spans are keyed by the tool_use_id that opened them: a Task tool_use_id
+    keys its subagent span, any other tool_use_id keys its tool span. That
+    lets PostToolUse close either kind with the same call.
+    """
+
+    def __init__(
+        self,
+        session_dir: Optional[Path] = None,
+        service_name: str = "research-agent",
+        endpoint: Optional[str] = None,
+    ):
+        self.service_name = service_name
+        self.trace_file = open(session_dir / TRACE_FILE_NAME, "a", encoding="utf-8") if session_dir else None
+        endpoint = endpoint or os.environ.get("OTEL_EXPORTER_OTLP_ENDPOINT")
+        self.endpoint = endpoint.rstrip("/") + "/v1/traces" if endpoint else None
+
+        self._turn: Optional[Span] = None
+        self._turn_count = 0
+        self._open: Dict[str, Span] = {}
+        self._finished: List[Span] = []
+        self._exports: List[threading.Thread] = []
+
+    def start_turn(self, prompt: str):
+        """Open the root span for a user turn, ending any turn still open."""
+        if self._turn:
+            self.end_turn()
+        self._turn_count += 1
+        self._turn = Span(
+            trace_id=secrets.token_hex(16),
+            span_id=secrets.token_hex(8),
+            parent_span_id=None,
+            name=f"turn {self._turn_count}",
+            start_ns=time.time_ns(),
+            attributes={"turn": self._turn_count, "prompt_chars": len(prompt)},
+        )
+
+    def end_turn(self):
+        """Close the turn span (and anything left open under it) and export the trace."""
+        if not self._turn:
+            return
+        now = time.time_ns()
+        for span in self._open.values():
+            span.end_ns = now
+            span.attributes["incomplete"] = True
+            self._finished.append(span)
+        self._open.clear()
+        self._turn.end_ns = now
+        self._finished.append(self._turn)
+        self._turn = None
+        self.flush()
+
+    def start_span(
+        self,
+        key: str,
+        name: str,
+        parent_key: Optional[str] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        """Open a span keyed by ``key`` under ``parent_key``'s span (or the turn)."""
+        if not self._turn:
+            self.start_turn("")
+        parent = self._open.get(parent_key) if parent_key else None
+        self._open[key] = Span(
+            trace_id=self._turn.trace_id,
+            span_id=secrets.token_hex(8),
+            parent_span_id=(parent or self._turn).span_id,
+            name=name,
+            start_ns=time.time_ns(),
+            attributes=dict(attributes or {}),
+        )
+
+    def reparent_span(self, key: str, parent_key: Optional[str] = None, attributes: Optional[Dict[str, Any]] = None):
+        """Move the open span for ``key`` under ``parent_key``'s span (or the turn)."""
+        span = self._open.get(key)
+        if span is None:
+            return
+        parent = (self._open.get(parent_key) if parent_key else None) or self._turn
+        if parent:
+            span.parent_span_id = parent.span_id
+        if attributes:
+            span.attributes.update(attributes)
+
+    def end_span(self, key: str, attributes: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        """Close the span opened for ``key``; unknown keys are ignored."""
+        span = self._open.pop(key, None)
+        if span is None:
+            return
+        span.end_ns = time.time_ns()
+        if attributes:
+            span.attributes.update(attributes)
+        if error:
+            span.error = str(error)
+        self._finished.append(span)
+
+    def flush(self):
+        """Export finished spans to the trace file and the configured collector."""
+        if not self._finished:
+            return
+        request = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [span.to_otlp() for span in self._finished],
+                }],
+            }]
+        }
+        self._finished = []
+        body = json.dumps(request)
+
+        if self.trace_file:
+            self.trace_file.write(body + "\n")
+            self.trace_file.flush()
+        if self.endpoint:
+            export = threading.Thread(target=self._post, args=(body.encode("utf-8"),), daemon=True)
+            export.start()
+            self._exports = [t for t in self._exports if t.is_alive()] + [export]
+
+    def _post(self, body: bytes):
+        request = urllib.request.Request(
+            self.endpoint, data=body, headers={"Content-Type": "application/json"}, method="POST"
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=5):
+                pass
+        except OSError as e:
+            logger.debug(f"Trace export to {self.endpoint} failed: {e}")
+
+    def close(self):
+        """End the current turn, export remaining spans and close the trace file."""
+        self.end_turn()
+        self.flush()
+        for export in self._exports:
+            export.join(timeout=5)
+        if self.trace_file:
+            self.trace_file.close()
+            self.trace_file = None
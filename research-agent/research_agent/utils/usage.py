@@ -0,0 +1,281 @@
+"""Token and cost accounting per turn, per subagent and per model."""
+
+import json
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+USAGE_FILE_NAME = "usage.json"
+TOKEN_FIELDS = (
+    "input_tokens",
+    "output_tokens",
+    "cache_creation_input_tokens",
+    "cache_read_input_tokens",
+)
+
+
+def _usage_dict(usage: Any) -> Dict[str, int]:
+    """Normalize an SDK usage payload to the token fields we account for."""
+    if not isinstance(usage, dict):
+        return {}
+    return {key: int(usage.get(key) or 0) for key in TOKEN_FIELDS}
+
+
+# ResultMessage.model_usage keys (camelCase, as the CLI sends them) -> our token fields
+MODEL_USAGE_FIELDS = {
+    "inputTokens": "input_tokens",
+    "outputTokens": "output_tokens",
+    "cacheCreationInputTokens": "cache_creation_input_tokens",
+    "cacheReadInputTokens": "cache_read_input_tokens",
+}
+
+
+def _model_usage_dict(model_usage: Any) -> Dict[str, Dict[str, float]]:
+    """Normalize ResultMessage.model_usage to our token fields plus cost, per model."""
+    if not isinstance(model_usage, dict):
+        return {}
+    normalized = {}
+    for model, usage in model_usage.items():
+        if isinstance(usage, dict):
+            normalized[model] = {field: int(usage.get(key) or 0) for key, field in MODEL_USAGE_FIELDS.items()}
+            normalized[model]["cost_usd"] = float(usage.get("costUSD") or 0.0)
+    return normalized
+
+
+def _add(total: Dict[str, Any], usage: Dict[str, Any]):
+    for key, value in usage.items():
+        total[key] = total.get(key, 0) + value
+
+
+def _subtract(current: Dict[str, Any], previous: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """``current - previous`` per key, or None if any counter went down."""
+    delta = {key: value - previous.get(key, 0) for key, value in current.items()}
+    return None if any(value < 0 for value in delta.values()) else delta
+
+
+def total_tokens(usage: Dict[str, int]) -> int:
+    return sum(usage.get(key, 0) for key in TOKEN_FIELDS)
+
+
+class UsageTracker:
+    """
+    Aggregates usage from the message stream and Task results.
+
+    The CLI reports usage, cost and per-model usage on each ``ResultMessage``
+    as running totals for its session, subagents included. Each result is
+    therefore recorded as the difference from the previous result of the
+    same session; a session whose totals went down (a new CLI process
+    resuming it) starts over from zero.
+
+    - Per turn: usage, cost and durations since the previous turn.
+    - Per run: results of queries that run a subagent as their own session
+      (the orchestrator), which are not lead turns.
+    - Per subagent: the usage reported in each ``Task`` tool result. It is
+      part of the turn that spawned the subagent, so it only counts toward
+      the budget until that turn's result arrives.
+    - Per model: distinct assistant messages, and usage and cost from
+      ``ResultMessage.model_usage``.
+
+    Optional budgets (``max_tokens``, ``max_cost_usd``) are checked after
+    every update; ``budget_exceeded`` then holds the reason, and the chat
+    loop is expected to interrupt the client.
+    """
+
+    def __init__(
+        self,
+        session_dir: Optional[Path] = None,
+        tracker: Any = None,
+        max_tokens: Optional[int] = None,
+        max_cost_usd: Optional[float] = None,
+    ):
+        self.usage_path = session_dir / USAGE_FILE_NAME if session_dir else None
+        self.tracker = tracker
+        self.max_tokens = max_tokens
+        self.max_cost_usd = max_cost_usd
+
+        self.turns: List[Dict[str, Any]] = []
+        self.runs: Dict[str, Any] = {"count": 0, "cost_usd": 0.0, "usage": {}}
+        self.subagents: Dict[str, Dict[str, Any]] = {}
+        self.models: Dict[str, Dict[str, Any]] = defaultdict(lambda: {"messages": 0})
+        self.total_cost_usd = 0.0
+        self.budget_exceeded: Optional[str] = None
+        # session id -> totals of its last ResultMessage
+        self.cumulative: Dict[str, Dict[str, Any]] = {}
+        # Subagents whose spawning turn has not reported its result yet
+        self._pending_subagents: set = set()
+        self._message_ids: set = set()
+
+    @property
+    def session_tokens(self) -> int:
+        """Tokens of lead turns and runs, plus subagents of the turn still in progress."""
+        tokens = sum(total_tokens(turn["usage"]) for turn in self.turns) + total_tokens(self.runs["usage"])
+        return tokens + sum(
+            total_tokens(self.subagents[subagent_id]["usage"]) for subagent_id in self._pending_subagents
+        )
+
+    def record_assistant(self, msg: Any):
+        """Count an AssistantMessage against its model.
+
+        The CLI emits one AssistantMessage per content block, all with the
+        same ``message_id``; each API message is counted once.
+        """
+        message_id = getattr(msg, "message_id", None)
+        if message_id:
+            if message_id in self._message_ids:
+                return
+            self._message_ids.add(message_id)
+        model = getattr(msg, "model", None) or "unknown"
+        self.models[model]["messages"] += 1
+
+    def _since_last(self, msg: Any) -> Tuple[float, Dict[str, int]]:
+        """Cost and usage of a ResultMessage since the previous one of its session."""
+        current = {
+            "cost_usd": getattr(msg, "total_cost_usd", None) or 0.0,
+            "usage": _usage_dict(getattr(msg, "usage", None)),
+            "models": _model_usage_dict(getattr(msg, "model_usage", None)),
+        }
+        session_id = getattr(msg, "session_id", None) or ""
+        previous = self.cumulative.get(session_id)
+        self.cumulative[session_id] = current
+
+        cost, usage, models = current["cost_usd"], current["usage"], current["models"]
+        if previous:
+            deltas = [_subtract(usage, previous["usage"])] + [
+                _subtract(stats, previous["models"].get(model, {})) for model, stats in models.items()
+            ]
+            if cost >= previous["cost_usd"] and all(delta is not None for delta in deltas):
+                cost -= previous["cost_usd"]
+                usage, model_deltas = deltas[0], deltas[1:]
+                models = dict(zip(models, model_deltas))
+        for model, stats in models.items():
+            _add(self.models[model], stats)
+        return cost, usage
+
+    def record_run(self, msg: Any):
+        """Record the ResultMessage of a query that ran a subagent as its own session."""
+        cost, usage = self._since_last(msg)
+        self.total_cost_usd += cost
+        self.runs["count"] += 1
+        self.runs["cost_usd"] += cost
+        _add(self.runs["usage"], usage)
+        self._check_budget()
+        self.save()
+
+    def record_result(self, msg: Any):
+        """Record the ResultMessage that ends a turn."""
+        cost, usage = self._since_last(msg)
+        self.total_cost_usd += cost
+        self.turns.append({
+            "turn": len(self.turns) + 1,
+            "completed_at": datetime.now().isoformat(),
+            "session_id": getattr(msg, "session_id", None),
+            "duration_ms": getattr(msg, "duration_ms", None),
+            "duration_api_ms": getattr(msg, "duration_api_ms", None),
+            "num_turns": getattr(msg, "num_turns", None),
+            "is_error": getattr(msg, "is_error", False),
+            "cost_usd": cost,
+            "usage": usage,
+        })
+        # The turn's usage includes the subagents it spawned
+        self._pending_subagents.clear()
+        self._check_budget()
+        self.save()
+
+    def record_subagent(self, tool_use_id: str, response: Dict[str, Any], counted: bool = False):
+        """Attribute a finished subagent's reported usage.
+
+        Args:
+            tool_use_id: The Task call that ran it
+            response: The Task tool result
+            counted: Whether its tokens are already counted elsewhere (its
+                own run); otherwise they count until its turn's result arrives
+        """
+        session = self.tracker.sessions.get(tool_use_id) if self.tracker else None
+        subagent_id = session.subagent_id if session else tool_use_id
+        usage = _usage_dict(response.get("usage"))
+        if not usage and response.get("totalTokens"):
+            usage = {"input_tokens": 0, "output_tokens": int(response["totalTokens"])}
+        self.subagents[subagent_id] = {
+            "subagent_type": session.subagent_type if session else None,
+            "duration_ms": response.get("totalDurationMs"),
+            "tool_uses": response.get("totalToolUseCount"),
+            "usage": usage,
+        }
+        if not counted:
+            self._pending_subagents.add(subagent_id)
+        self._check_budget()
+
+    async def task_post_tool_use_hook(self, hook_input, tool_use_id, context):
+        """PostToolUse hook for Task: attribute the subagent's reported usage."""
+        response = hook_input.get("tool_response")
+        if isinstance(response, dict):
+            self.record_subagent(tool_use_id, response)
+        return {"continue_": True}
+
+    def _check_budget(self):
+        if self.budget_exceeded:
+            return
+        tokens = self.session_tokens
+        if self.max_tokens is not None and tokens > self.max_tokens:
+            self.budget_exceeded = f"token budget exceeded ({tokens:,} > {self.max_tokens:,})"
+        elif self.max_cost_usd is not None and self.total_cost_usd > self.max_cost_usd:
+            self.budget_exceeded = (
+                f"cost budget exceeded (${self.total_cost_usd:.4f} > ${self.max_cost_usd:.4f})"
+            )
+        if self.budget_exceeded:
+            logger.warning(self.budget_exceeded)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "total_cost_usd": round(self.total_cost_usd, 6),
+            "total_tokens": self.session_tokens,
+            "budget": {"max_tokens": self.max_tokens, "max_cost_usd": self.max_cost_usd},
+            "budget_exceeded": self.budget_exceeded,
+            "turns": self.turns,
+            "runs": self.runs,
+            "subagents": self.subagents,
+            "models": dict(self.models),
+            "cumulative": self.cumulative,
+        }
+
+    def restore(self):
+        """Reload totals from an existing usage.json (resumed sessions keep their budget)."""
+        if not self.usage_path or not self.usage_path.exists():
+            return
+        try:
+            with open(self.usage_path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not restore {self.usage_path}: {e}")
+            return
+        self.turns = saved.get("turns", [])
+        self.runs = saved.get("runs", self.runs)
+        self.subagents = saved.get("subagents", {})
+        self.cumulative = saved.get("cumulative", {})
+        for model, stats in saved.get("models", {}).items():
+            self.models[model].update(stats)
+        self.total_cost_usd = float(saved.get("total_cost_usd") or 0.0)
+
+    def save(self):
+        """Write usage.json next to the tool call log."""
+        if not self.usage_path:
+            return
+        with open(self.usage_path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+
+
+def budget_from_env(name: str, cast=float) -> Optional[Any]:
+    """Read an optional numeric budget from the environment."""
+    value = os.environ.get(name)
+    if not value:
+        return None
+    try:
+        return cast(value)
+    except ValueError:
+        logger.warning(f"Ignoring invalid {name}={value!r}")
+        return None
@@ -0,0 +1,31 @@
+import asyncio
+from functools import partial
+
+import pytest
+
+pytest.importorskip("claude_agent_sdk")
+
+from research_agent import agent  # noqa: E402
+from research_agent.utils.fake_client import FakeClaudeSDKClient, FakeScript  # noqa: E402
+
+
+def test_batch_runs_retention_once_after_all_jobs(tmp_path, monkeypatch):
+    monkeypatch.setenv("RESEARCH_LOGS_COMPRESSION", "gzip")
+    monkeypatch.delenv("RESEARCH_LOGS_MAX_MB", raising=False)
+    calls = []
+    real = agent.retention_from_env
+    monkeypatch.setattr(agent, "retention_from_env", lambda *a, **kw: calls.append(a) or real(*a, **kw))
+
+    topics = tmp_path / "topics.txt"
+    topics.write_text("first topic\nsecond topic\nthird topic\n", encoding="utf-8")
+    script = FakeScript(subagents=["researcher"], model_latency=0, tool_latency=0, jitter=0)
+    jobs = asyncio.run(agent.run_batch(
+        topics, concurrency=3, client_factory=partial(FakeClaudeSDKClient, script=script),
+        logs_dir=tmp_path / "logs", workspace_root=tmp_path / "batch"
+    ))
+
+    assert len(calls) == 1
+    for job in jobs:
+        assert job.error is None
+        assert (job.session_dir / "transcript.txt.gz").is_file()
+        assert not (job.session_dir / "transcript.txt").exists()
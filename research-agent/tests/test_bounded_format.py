@@ -0,0 +1,31 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from research_agent.utils.bounded_format import bounded_json, estimate_size
+
+VALUES = [
+    "plain",
+    "quotes \" and \\ and\nnewlines 中文",
+    {"file_path": "/tmp/a.txt", "content": "x" * 5000},
+    {"todos": [{"content": "step", "status": "pending", "n": 1, "ok": True, "none": None}] * 50},
+    [1, 2.5, [], {}, [["nested"]], Path("/tmp")],
+    {},
+    {True: 1, False: 2, None: 3, 4: "int", 1.5: "float", float("inf"): []},
+]
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+@pytest.mark.parametrize("limit", [0, 1, 10, 100, 200, 100_000])
+@pytest.mark.parametrize("value", VALUES)
+def test_bounded_json_is_prefix_of_full_dump(value, limit, indent):
+    full = json.dumps(value, ensure_ascii=False, indent=indent, default=str)
+    text, truncated = bounded_json(value, limit, indent=indent)
+    assert text == full[:limit]
+    assert truncated == (len(full) > limit)
+
+
+def test_estimate_size_is_close_to_str_length():
+    value = {"content": "x" * 100_000, "items": list(range(1000))}
+    assert abs(estimate_size(value) - len(str(value))) / len(str(value)) < 0.05
@@ -0,0 +1,105 @@
+from research_agent.utils.dedup import deduplicate_notes, figures
+from research_agent.utils.text import tokenize
+
+LINE = (
+    "- According to the latest industry analyst survey of hyperscale providers and enterprise buyers, "
+    "the global market for cloud inference services reached USD {} billion in {}, "
+    "driven by chat assistants and coding tools\n"
+)
+LARGER = (
+    "# Market\n" + LINE.format(45, 2023)
+    + "- Adoption among large enterprises keeps growing across every region surveyed this year\n"
+)
+
+
+def test_figures():
+    assert figures(tokenize("USD 45 billion in 2023, up 12.5%")) == ("12.5", "2023", "45")
+
+
+def test_lines_with_different_figures_are_kept():
+    notes = {"a.md": LARGER, "b.md": "# Market\n" + LINE.format(67, 2024)}
+    deduplicated, report = deduplicate_notes(notes)
+    assert "USD 67 billion in 2024" in deduplicated["b.md"]
+    assert report.dropped == 0
+
+
+def test_reworded_line_with_same_figures_is_dropped():
+    reworded = LINE.format(45, 2023).replace("latest", "most recent")
+    notes = {"a.md": LARGER, "b.md": "# Market\n" + reworded}
+    deduplicated, report = deduplicate_notes(notes)
+    assert "USD 45 billion" in deduplicated["a.md"]
+    assert deduplicated["b.md"] == "# Market\n"
+    assert report.omitted["b.md"] == (1, ["a.md"])
+
+
+def test_duplicates_within_one_note_are_kept():
+    line = LINE.format(45, 2023)
+    deduplicated, report = deduplicate_notes({"a.md": line + line})
+    assert deduplicated["a.md"] == line + line
+    assert report.dropped == 0
+
+
+def test_line_with_a_subset_of_the_figures_is_dropped():
+    shorter = LINE.format(45, 2023).replace(" in 2023", " last year").replace("latest", "most recent")
+    notes = {"a.md": LARGER, "b.md": "# Market\n" + shorter}
+    deduplicated, report = deduplicate_notes(notes)
+    assert deduplicated["b.md"] == "# Market\n"
+    assert report.dropped == 1
+
+
+REPRESENTATIVE = """# Reverse proxies in production
+
+## Market share
+
+- Nginx serves 33.2% of all websites whose web server is known (W3Techs, 2025)
+- Apache follows with 25.8%, while Cloudflare fronts about 20% of the top million sites
+- The reverse proxy software market was valued at USD 1.9 billion in 2024
+- Growth is projected at a 12.4% CAGR through 2030, driven by API gateways
+
+## How a reverse proxy works
+
+A reverse proxy sits in front of the origin servers and receives every client request.
+It forwards each request to a backend chosen by the load balancing policy, then relays the response.
+Clients only ever see the proxy address, so the backend topology stays hidden from the internet.
+Caching, TLS termination and compression are usually handled at the proxy as well.
+
+| Feature | Nginx | HAProxy |
+|---|---|---|
+| Caching | built in | none |
+| Layer 4 balancing | stream module | native |
+"""
+
+OVERLAPPING = """# Reverse proxy research notes
+
+## Market share data
+
+- Nginx is used by 33.2% of websites with a known web server, according to W3Techs (2025)
+- Apache comes second at 25.8%; Cloudflare sits in front of roughly 20% of the top million sites
+- Reverse proxy software was a USD 1.9 billion market in 2024
+- Residential proxies account for about 44% of the forward proxy market
+
+## Reverse proxy: how it works
+
+The reverse proxy is placed in front of origin servers and receives all client requests.
+Every request is forwarded to a backend picked by the load balancing policy and the response is relayed back.
+Because clients only see the proxy address, the backend topology is hidden from the internet.
+
+| Feature | Nginx | Traefik |
+|---|---|---|
+| Caching | built in | plugin |
+"""
+
+
+def test_overlapping_note_shrinks_to_what_it_adds():
+    notes = {"representative.md": REPRESENTATIVE, "overlapping.md": OVERLAPPING}
+    deduplicated, report = deduplicate_notes(notes)
+    assert report.clusters == [["overlapping.md", "representative.md"]]
+    assert deduplicated["representative.md"] == REPRESENTATIVE
+    shrunk = deduplicated["overlapping.md"]
+    assert len(shrunk) < len(OVERLAPPING) / 2
+    assert report.chars_after < report.chars_before
+    # Headings, the table header and the one new figure survive
+    assert "## Market share data" in shrunk and "## Reverse proxy: how it works" in shrunk
+    assert "| Feature | Nginx | Traefik |" in shrunk
+    assert "44% of the forward proxy market" in shrunk
+    assert "33.2%" not in shrunk
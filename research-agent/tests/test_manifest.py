@@ -0,0 +1,62 @@
+import os
+import time
+
+from research_agent.utils.manifest import MTIME_SLACK_NS, ArtifactManifest, prompt_versions
+
+
+def write(path, text, mtime_ns=None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_record_then_is_fresh_cycle(tmp_path):
+    files = tmp_path / "files"
+    inputs = {"topic": "t", "subtopics": 2, "model": "haiku"}
+    started = time.time_ns()
+    old = files / "research_notes" / "old.md"
+    write(old, "from an earlier run", mtime_ns=started - 10 * MTIME_SLACK_NS)
+    write(files / "research_notes" / "a.md", "note a")
+
+    manifest = ArtifactManifest(files)
+    assert not manifest.is_fresh("t", "research", inputs)
+    manifest.record("t", "research", inputs, since_ns=started)
+
+    # Only files written since the stage started are its artifacts
+    assert manifest.outputs("t", "research") == ["research_notes/a.md"]
+    assert manifest.artifacts["research_notes/a.md"]["stage"] == "research"
+
+    # The record survives a reload and matches the same inputs only
+    reloaded = ArtifactManifest(files)
+    assert reloaded.is_fresh("t", "research", inputs)
+    assert not reloaded.is_fresh("t", "research", {**inputs, "subtopics": 3})
+    assert not reloaded.is_fresh("other topic", "research", inputs)
+
+    # Edited artifacts stay up to date (like make), deleted ones make the stage stale
+    write(files / "research_notes" / "a.md", "note a, edited by hand")
+    assert reloaded.is_fresh("t", "research", inputs)
+    (files / "research_notes" / "a.md").unlink()
+    assert not reloaded.is_fresh("t", "research", inputs)
+
+
+def test_stage_without_outputs_is_never_fresh(tmp_path):
+    manifest = ArtifactManifest(tmp_path / "files")
+    manifest.record("t", "report", {"topic": "t"}, since_ns=time.time_ns())
+    assert not manifest.is_fresh("t", "report", {"topic": "t"})
+
+
+def test_snapshot_reflects_content_changes(tmp_path):
+    files = tmp_path / "files"
+    write(files / "research_notes" / "a.md", "one")
+    manifest = ArtifactManifest(files)
+    before = manifest.snapshot("research_notes")
+    write(files / "research_notes" / "a.md", "two")
+    assert manifest.snapshot("research_notes") != before
+
+
+def test_prompt_versions_change_with_prompt_content(tmp_path):
+    write(tmp_path / "report_writer.txt", "v1")
+    first = prompt_versions(tmp_path, ["report_writer.txt"])
+    write(tmp_path / "report_writer.txt", "v2")
+    assert prompt_versions(tmp_path, ["report_writer.txt"]) != first
@@ -0,0 +1,43 @@
+import asyncio
+import json
+from functools import partial
+
+import pytest
+
+pytest.importorskip("claude_agent_sdk")
+
+from research_agent.orchestrator import orchestrate  # noqa: E402
+from research_agent.utils.fake_client import FakeClaudeSDKClient, FakeScript  # noqa: E402
+from research_agent.utils.usage import total_tokens  # noqa: E402
+
+
+class CountingClient(FakeClaudeSDKClient):
+    """Fake client that adds up the usage of every ResultMessage it sends."""
+    results = []
+
+    async def receive_response(self):
+        async for msg in super().receive_response():
+            if type(msg).__name__ == "ResultMessage":
+                self.results.append(msg)
+            yield msg
+
+
+def test_session_tokens_equal_sum_over_queries(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("SESSION_MAX_TOKENS", raising=False)
+    CountingClient.results = []
+    script = FakeScript(subagents=[], tool_calls=[], model_latency=0, tool_latency=0, jitter=0)
+    factory = partial(CountingClient, script=script)
+
+    asyncio.run(orchestrate("topic", subtopics=2, client_factory=factory, logs_dir=tmp_path / "logs"))
+
+    # planner + 2 researchers + data-analyst + report-writer
+    assert len(CountingClient.results) == 5
+    (session_dir,) = (tmp_path / "logs").glob("session_*")
+    saved = json.loads((session_dir / "usage.json").read_text(encoding="utf-8"))
+    expected = sum(total_tokens(msg.usage) for msg in CountingClient.results)
+    assert saved["total_tokens"] == expected
+    assert saved["total_cost_usd"] == pytest.approx(sum(msg.total_cost_usd for msg in CountingClient.results))
+    # Only the planner is a lead turn; each subagent run is counted once, from its Task completion
+    assert len(saved["turns"]) == 1
+    assert len(saved["subagents"]) == 4
@@ -0,0 +1,61 @@
+import os
+import shutil
+
+from research_agent.utils import retention
+from research_agent.utils.retention import SessionLock, enforce_retention, is_session_open
+
+
+def make_session(logs_dir, name, size=10_000, age=3600):
+    session = logs_dir / f"session_{name}"
+    session.mkdir(parents=True)
+    path = session / "tool_calls.jsonl"
+    path.write_text("x" * size)
+    old = path.stat().st_mtime - age
+    os.utime(path, (old, old))
+    return session
+
+
+def test_open_session_is_not_compressed_or_evicted(tmp_path):
+    session = make_session(tmp_path, "20250101_000000")
+    with SessionLock(session):
+        assert is_session_open(session)
+        report = enforce_retention(tmp_path, compression="gzip", max_bytes=0, min_idle=0)
+        assert report.compressed == [] and report.evicted == []
+        assert (session / "tool_calls.jsonl").is_file()
+    assert not is_session_open(session)
+
+
+def test_released_session_is_closed_without_idle_wait(tmp_path):
+    session = make_session(tmp_path, "20250101_000000", age=0)
+    with SessionLock(session):
+        pass
+    report = enforce_retention(tmp_path, compression="gzip")
+    assert report.compressed == [session / "tool_calls.jsonl.gz"]
+
+
+def test_stale_lock_file_does_not_keep_session_alive(tmp_path):
+    session = make_session(tmp_path, "20250101_000000", age=0)
+    (session / retention.LOCK_NAME).write_text("12345\n")
+    report = enforce_retention(tmp_path, compression="gzip", max_bytes=0)
+    assert report.evicted == [session]
+    assert not session.exists()
+
+
+def test_idle_check_applies_only_without_lock_file(tmp_path):
+    recent = make_session(tmp_path, "20250101_000000", age=0)
+    report = enforce_retention(tmp_path, compression="gzip", max_bytes=0)
+    assert report.compressed == [] and report.evicted == []
+    assert recent.exists()
+
+
+def test_failed_delete_is_not_reported_as_evicted(tmp_path, monkeypatch):
+    session = make_session(tmp_path, "20250101_000000")
+
+    def fail(path, *args, **kwargs):
+        raise PermissionError(13, "Permission denied", str(path))
+
+    monkeypatch.setattr(shutil, "rmtree", fail)
+    report = enforce_retention(tmp_path, compression="none", max_bytes=0)
+    assert report.evicted == []
+    assert report.bytes_after == report.bytes_before
+    assert session.exists()
@@ -0,0 +1,111 @@
+import asyncio
+import json
+import time
+
+from research_agent.utils.subagent_tracker import SubagentTracker
+
+
+class NullTranscript:
+    def __init__(self):
+        self.lines = []
+
+    def write(self, text, end="", flush=False):
+        self.lines.append(text.strip())
+
+    def write_to_file(self, text, flush=False):
+        pass
+
+
+def read_events(session_dir):
+    with open(session_dir / "tool_calls.jsonl", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def make_tracker(tmp_path):
+    tracker = SubagentTracker(transcript_writer=NullTranscript(), session_dir=tmp_path)
+    tracker.register_subagent_spawn("task_1", "researcher", "Research X", "prompt")
+    return tracker
+
+
+def test_hook_before_message_is_rendered_does_not_wait(tmp_path):
+    async def run():
+        tracker = make_tracker(tmp_path)
+        # The lead agent's message was the last one rendered
+        tracker.set_current_context(None)
+        pre_input = {"tool_name": "Write", "tool_input": {"file_path": "notes.md", "content": "x"}}
+
+        started = time.monotonic()
+        await tracker.pre_tool_use_hook(pre_input, "toolu_1", None)
+        assert time.monotonic() - started < 0.1
+        assert tracker.tool_call_counts[("lead", "Write")] == 1
+
+        # The renderer catches up: the call belonged to the researcher
+        tracker.record_tool_owner("toolu_1", "task_1")
+        session = tracker.sessions["task_1"]
+        assert session.tool_call_count == 1
+        assert tracker.tool_call_counts[("lead", "Write")] == 0
+        assert tracker.tool_call_counts[("researcher", "Write")] == 1
+
+        await tracker.post_tool_use_hook({"tool_name": "Write", "tool_response": "ok"}, "toolu_1", None)
+        assert ("researcher", "Write") in tracker.latency_histograms
+        await tracker.aclose()
+        return tracker
+
+    tracker = asyncio.run(run())
+    events = read_events(tmp_path)
+    assert [(e["event"], e["agent_id"]) for e in events] == [
+        ("tool_call_start", "RESEARCHER-1"), ("tool_call_complete", "RESEARCHER-1")
+    ]
+    assert tracker.transcript_writer.lines == ["[RESEARCHER-1] → Write"]
+
+
+def test_call_never_rendered_keeps_current_context(tmp_path):
+    async def run():
+        tracker = make_tracker(tmp_path)
+        tracker.set_current_context("task_1")
+        pre_input = {"tool_name": "Read", "tool_input": {"file_path": "notes.md"}}
+
+        started = time.monotonic()
+        await tracker.pre_tool_use_hook(pre_input, "toolu_2", None)
+        await tracker.post_tool_use_hook({"tool_name": "Read", "tool_response": "text"}, "toolu_2", None)
+        assert time.monotonic() - started < 0.1
+        await tracker.aclose()
+
+    asyncio.run(run())
+    events = read_events(tmp_path)
+    assert [(e["event"], e["agent_id"]) for e in events] == [
+        ("tool_call_start", "RESEARCHER-1"), ("tool_call_complete", "RESEARCHER-1")
+    ]
+
+
+def test_owner_seen_first_is_used(tmp_path):
+    async def run():
+        tracker = make_tracker(tmp_path)
+        tracker.set_current_context(None)
+        tracker.record_tool_owner("toolu_3", "task_1")
+        await tracker.pre_tool_use_hook({"tool_name": "Glob", "tool_input": {"pattern": "*.md"}}, "toolu_3", None)
+        assert tracker.sessions["task_1"].tool_call_count == 1
+        await tracker.aclose()
+
+    asyncio.run(run())
+    assert read_events(tmp_path)[0]["agent_id"] == "RESEARCHER-1"
+
+
+def test_hook_agent_id_resolves_later_calls_without_the_stream(tmp_path):
+    async def run():
+        tracker = make_tracker(tmp_path)
+        tracker.register_subagent_spawn("task_2", "researcher", "Research Y", "prompt")
+        tracker.set_current_context("task_2")
+        hook = {"tool_name": "Read", "tool_input": {"file_path": "a.md"}, "agent_id": "agent-a"}
+
+        # First call of agent-a is matched through the message stream
+        await tracker.pre_tool_use_hook(hook, "toolu_4", None)
+        tracker.record_tool_owner("toolu_4", "task_1")
+        # Later calls are attributed from the hook input, whatever the current context
+        await tracker.pre_tool_use_hook(hook, "toolu_5", None)
+        assert tracker.sessions["task_1"].tool_call_count == 2
+        assert tracker.sessions["task_2"].tool_call_count == 0
+        await tracker.aclose()
+
+    asyncio.run(run())
+    assert [e["agent_id"] for e in read_events(tmp_path)] == ["RESEARCHER-1", "RESEARCHER-1"]
@@ -0,0 +1,42 @@
+import threading
+
+from research_agent.utils import transcript
+from research_agent.utils.transcript import TranscriptWriter
+
+
+def renderer_threads():
+    return [t for t in threading.enumerate() if t.name == "transcript-console"]
+
+
+def test_headless_writer_starts_no_renderer(tmp_path):
+    before = len(renderer_threads())
+    path = tmp_path / "transcript.txt"
+    writer = TranscriptWriter(path, console=False)
+    assert len(renderer_threads()) == before
+    writer.write("hello")
+    writer.write_to_console("not in the file")
+    writer.flush_console()
+    writer.close()
+    assert path.read_text(encoding="utf-8") == "hello"
+
+
+def test_console_writer_renders_and_stops(tmp_path, capsys):
+    writer = TranscriptWriter(tmp_path / "transcript.txt")
+    writer.write("hello", end="\n")
+    writer.close()
+    assert capsys.readouterr().out == "hello\n"
+    assert not writer._renderer.is_alive()
+
+
+def test_headless_writer_is_flushed_at_exit(tmp_path, monkeypatch):
+    registered = []
+    monkeypatch.setattr(transcript.atexit, "register", registered.append)
+    monkeypatch.setattr(transcript.atexit, "unregister", registered.remove)
+    path = tmp_path / "transcript.txt"
+    writer = TranscriptWriter(path, flush_interval=60, console=False)
+    writer.write("tail")
+    assert path.read_text(encoding="utf-8") == ""
+    # What atexit runs when the program ends without close()
+    registered[0]()
+    assert path.read_text(encoding="utf-8") == "tail"
+    assert registered == []
@@ -0,0 +1,82 @@
+import asyncio
+import json
+from functools import partial
+
+import pytest
+
+pytest.importorskip("claude_agent_sdk")
+
+from claude_agent_sdk import AssistantMessage, ResultMessage, TextBlock, ToolUseBlock  # noqa: E402
+
+from research_agent import agent  # noqa: E402
+from research_agent.utils.fake_client import FakeClaudeSDKClient, FakeScript  # noqa: E402
+from research_agent.utils.usage import UsageTracker  # noqa: E402
+
+MODEL = "claude-haiku-4-5"
+
+
+def result(session_id, input_tokens, output_tokens, cost):
+    """A ResultMessage carrying session totals, as the CLI sends them."""
+    return ResultMessage(
+        subtype="success", duration_ms=1, duration_api_ms=1, is_error=False, num_turns=1,
+        session_id=session_id, total_cost_usd=cost,
+        usage={"input_tokens": input_tokens, "output_tokens": output_tokens},
+        model_usage={MODEL: {
+            "inputTokens": input_tokens, "outputTokens": output_tokens, "cacheReadInputTokens": 0,
+            "cacheCreationInputTokens": 0, "webSearchRequests": 0, "costUSD": cost,
+            "contextWindow": 200_000, "maxOutputTokens": 64_000,
+        }},
+    )
+
+
+def test_one_api_message_split_into_blocks_counts_once():
+    usage = UsageTracker()
+    for block in (TextBlock(text="Searching."), ToolUseBlock(id="t1", name="Read", input={})):
+        usage.record_assistant(AssistantMessage(
+            content=[block], model=MODEL, message_id="msg_1", usage={"input_tokens": 500, "output_tokens": 50}
+        ))
+    usage.record_result(result("s1", 500, 50, 0.01))
+    assert usage.models[MODEL] == {
+        "messages": 1, "input_tokens": 500, "output_tokens": 50,
+        "cache_creation_input_tokens": 0, "cache_read_input_tokens": 0, "cost_usd": 0.01,
+    }
+
+
+def test_turns_record_the_difference_between_running_totals():
+    usage = UsageTracker()
+    usage.record_result(result("s1", 1_000, 200, 0.01))
+    usage.record_result(result("s1", 3_000, 500, 0.03))
+    assert [turn["usage"]["input_tokens"] for turn in usage.turns] == [1_000, 2_000]
+    assert usage.session_tokens == 3_500
+    assert usage.total_cost_usd == pytest.approx(0.03)
+    assert usage.models[MODEL]["input_tokens"] == 3_000
+    # A new process resuming the session starts its totals over
+    usage.record_result(result("s1", 400, 100, 0.005))
+    assert usage.session_tokens == 4_000
+
+
+def test_subagent_usage_counts_until_its_turn_reports():
+    usage = UsageTracker(max_tokens=30_000)
+    asyncio.run(usage.task_post_tool_use_hook(
+        {"tool_response": {"usage": {"input_tokens": 15_000, "output_tokens": 5_000}}}, "task_1", None
+    ))
+    assert usage.session_tokens == 20_000
+    # The turn's totals already include the subagent
+    usage.record_result(result("s1", 21_000, 5_500, 0.05))
+    assert usage.session_tokens == 26_500
+    assert usage.budget_exceeded is None
+
+
+def test_chat_session_tokens_match_the_last_result(tmp_path, monkeypatch):
+    monkeypatch.delenv("SESSION_MAX_TOKENS", raising=False)
+    script = FakeScript(subagents=["researcher", "researcher"], model_latency=0, tool_latency=0, jitter=0)
+    session_dir = asyncio.run(agent.chat(
+        partial(FakeClaudeSDKClient, script=script), prompts=["first", "second"],
+        logs_dir=tmp_path / "logs", cwd=tmp_path, console=False
+    ))
+    saved = json.loads((session_dir / "usage.json").read_text(encoding="utf-8"))
+    per_turn = 1_000 + 200 + 2 * script.tokens_per_subagent
+    assert [sum(turn["usage"].values()) for turn in saved["turns"]] == [per_turn, per_turn]
+    assert saved["total_tokens"] == 2 * per_turn
+    assert saved["total_cost_usd"] == pytest.approx(2 * script.cost_per_turn_usd)
+    assert len(saved["subagents"]) == 4
@@ -1,6 +1,8 @@
+import argparse
 import asyncio
 import os
 from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
 
 from dotenv import load_dotenv
 from claude_agent_sdk import (
@@ -9,11 +11,14 @@ from claude_agent_sdk import (
     ClaudeSDKClient,
     AgentDefinition,
     HookMatcher,
+    ResultMessage,
+    StreamEvent,
 )
 
-from twitter_vibe_agent.utils.message_handler import process_assistant_message
+from twitter_vibe_agent.utils.message_handler import get_renderer
 from twitter_vibe_agent.utils.subagent_tracker import SubagentTracker
 from twitter_vibe_agent.utils.transcript import setup_session, TranscriptWriter
+from twitter_vibe_agent.utils.usage import UsageTracker, budget_from_env
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 PROMPTS_DIR = Path(__file__).parent / "prompts"
@@ -43,17 +48,54 @@ def ensure_dirs() -> None:
     )
 
 
-async def chat() -> None:
+async def run_turn(
+    client: Any,
+    user_input: str,
+    transcript: TranscriptWriter,
+    tracker: SubagentTracker,
+    usage: UsageTracker,
+) -> None:
+    transcript.write_to_file(f"\nYou: {user_input}\n")
+
+    await client.query(prompt=user_input)
+
+    transcript.write("\nAgent: ", end="")
+    renderer = get_renderer(transcript, tracker)
+    interrupted = False
+    async for message in client.receive_response():
+        if isinstance(message, StreamEvent):
+            renderer.process_stream_event(message)
+        elif isinstance(message, AssistantMessage):
+            usage.record_assistant(message)
+            renderer.process_assistant_message(message)
+        elif isinstance(message, ResultMessage):
+            usage.record_result(message)
+
+        if usage.budget_exceeded and not interrupted:
+            interrupted = True
+            await client.interrupt()
+
+    transcript.write("\n")
+
+
+async def chat(
+    client_factory: Callable[..., Any] = ClaudeSDKClient,
+    prompts: Optional[Iterable[str]] = None,
+    logs_dir: Path = Path("logs"),
+    stream: bool = False,
+) -> None:
+    """client_factory/prompts allow simulated sessions (see utils/fake_client.py);
+    stream renders text deltas as they arrive."""
     load_dotenv()
 
-    if not os.environ.get("ANTHROPIC_API_KEY"):
+    if client_factory is ClaudeSDKClient and not os.environ.get("ANTHROPIC_API_KEY"):
         print("\n错误：未找到 ANTHROPIC_API_KEY。")
         print("请在 .env 中设置或在终端导出该变量。\n")
         return
 
     ensure_dirs()
 
-    transcript_file, session_dir = setup_session()
+    transcript_file, session_dir = setup_session(logs_dir)
     transcript = TranscriptWriter(transcript_file)
 
     lead_agent_prompt = load_prompt("lead_agent_zh.txt")
@@ -89,6 +131,12 @@ async def chat() -> None:
     }
 
     tracker = SubagentTracker(transcript_writer=transcript, session_dir=session_dir)
+    usage = UsageTracker(
+        session_dir=session_dir,
+        tracker=tracker,
+        max_tokens=budget_from_env("SESSION_MAX_TOKENS", int),
+        max_cost_usd=budget_from_env("SESSION_MAX_COST_USD"),
+    )
 
     hooks = {
         "PreToolUse": [
@@ -96,6 +144,7 @@ async def chat() -> None:
         ],
         "PostToolUse": [
             HookMatcher(matcher=None, hooks=[tracker.post_tool_use_hook]),
+            HookMatcher(matcher="Task", hooks=[usage.task_post_tool_use_hook]),
         ],
     }
 
@@ -108,6 +157,7 @@ async def chat() -> None:
         model="haiku",
         cwd=PROJECT_ROOT,
         hooks=hooks,
+        include_partial_messages=stream,
     )
 
     transcript.write("\n" + "=" * 52)
@@ -121,34 +171,36 @@ async def chat() -> None:
     transcript.write_to_file(f"\nAgent: {opening_question}\n")
 
     try:
-        async with ClaudeSDKClient(options=options) as client:
+        async with client_factory(options=options) as client:
+            inputs = iter(prompts) if prompts is not None else None
             while True:
+                transcript.flush_console()
                 try:
-                    user_input = input("\nYou: ").strip()
+                    user_input = next(inputs, "") if inputs is not None else input("\nYou: ").strip()
                 except (EOFError, KeyboardInterrupt):
                     break
 
                 if not user_input or user_input.lower() in {"exit", "quit", "q"}:
                     break
 
-                transcript.write_to_file(f"\nYou: {user_input}\n")
-
-                await client.query(prompt=user_input)
+                await run_turn(client, user_input, transcript, tracker, usage)
 
-                transcript.write("\nAgent: ", end="")
-                async for message in client.receive_response():
-                    if isinstance(message, AssistantMessage):
-                        process_assistant_message(message, tracker, transcript)
-
-                transcript.write("\n")
+                if usage.budget_exceeded:
+                    transcript.write(f"\n[会话已停止：{usage.budget_exceeded}]\n")
+                    break
     finally:
         transcript.write("\n\nGoodbye!\n")
         transcript.close()
         tracker.close()
+        usage.save()
         print(f"\nSession logs saved to: {session_dir}")
         print(f"  - Transcript: {transcript_file}")
         print(f"  - Tool calls: {session_dir / 'tool_calls.jsonl'}")
+        print(f"  - Usage: {usage.usage_path} (${usage.total_cost_usd:.4f}, {usage.session_tokens:,} tokens)")
 
 
 if __name__ == "__main__":
-    asyncio.run(chat())
+    parser = argparse.ArgumentParser(description="Twitter Vibe Agent")
+    parser.add_argument("--stream", action="store_true", help="逐字流式输出回复")
+    args = parser.parse_args()
+    asyncio.run(chat(stream=args.stream))
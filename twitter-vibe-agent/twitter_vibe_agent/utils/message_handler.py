@@ -1,9 +1,143 @@
 """Message handling for processing agent responses."""
 
-from typing import Any
+import weakref
+from typing import Any, Callable, Dict, List, Optional
 
 
-_tool_just_used = False
+class MessageRenderer:
+    """Renders one session's messages to its transcript.
+
+    Formatting state is per instance, so concurrent sessions in one process
+    do not interfere; methods never await, so each message renders
+    atomically with respect to other asyncio tasks.
+    """
+
+    BLOCK_HANDLERS = {
+        "TextBlock": "_render_text",
+        "ToolUseBlock": "_render_tool_use",
+    }
+
+    EVENT_HANDLERS = {
+        "content_block_start": "_on_block_start",
+        "content_block_delta": "_on_block_delta",
+    }
+
+    _handler_cache: Dict[type, Optional[Callable]] = {}
+
+    def __init__(self, transcript: Any, tracker: Any = None):
+        self.transcript = transcript
+        self.tracker = tracker
+        self.tool_just_used = False
+        self.console_after_tool = False
+        self.streamed_text: Dict[Optional[str], List[str]] = {}
+
+    @classmethod
+    def _handler_for(cls, block_class: type) -> Optional[Callable]:
+        try:
+            return cls._handler_cache[block_class]
+        except KeyError:
+            name = cls.BLOCK_HANDLERS.get(block_class.__name__)
+            handler = getattr(cls, name) if name else None
+            cls._handler_cache[block_class] = handler
+            return handler
+
+    def process_stream_event(self, msg: Any) -> None:
+        """Render text deltas from a partial-message StreamEvent to the console."""
+        event = getattr(msg, "event", None) or {}
+        name = self.EVENT_HANDLERS.get(event.get("type"))
+        if name:
+            getattr(self, name)(msg, event)
+
+    def _on_block_start(self, msg: Any, event: Dict[str, Any]) -> None:
+        block_type = (event.get("content_block") or {}).get("type")
+        if block_type == "tool_use":
+            self.console_after_tool = True
+        elif block_type == "text" and self.console_after_tool:
+            self.transcript.write_to_console("\n")
+            self.console_after_tool = False
+
+    def _on_block_delta(self, msg: Any, event: Dict[str, Any]) -> None:
+        delta = event.get("delta") or {}
+        if delta.get("type") == "text_delta" and delta.get("text"):
+            parent_id = getattr(msg, "parent_tool_use_id", None)
+            self.streamed_text.setdefault(parent_id, []).append(delta["text"])
+            self.transcript.write_to_console(delta["text"])
+
+    def _take_streamed(self, parent_id: Optional[str], text: str) -> bool:
+        chunks = self.streamed_text.pop(parent_id, None)
+        if not chunks:
+            return False
+        streamed = "".join(chunks)
+        if not streamed.startswith(text):
+            return False
+        if len(streamed) > len(text):
+            self.streamed_text[parent_id] = [streamed[len(text):]]
+        return True
+
+    def process_assistant_message(self, msg: Any) -> None:
+        """Process an AssistantMessage and write output to the transcript."""
+        parent_id = getattr(msg, "parent_tool_use_id", None)
+        self.tracker.set_current_context(parent_id)
+
+        for block in msg.content:
+            handler = self._handler_for(type(block))
+            if handler:
+                handler(self, block, parent_id)
+
+    def _render_text(self, block: Any, parent_id: Optional[str]) -> None:
+        streamed = self._take_streamed(parent_id, block.text)
+        emit = self.transcript.write_to_file if streamed else self.transcript.write
+        if not streamed:
+            self.console_after_tool = False
+
+        if self.tool_just_used:
+            emit("\n")
+            self.tool_just_used = False
+        emit(block.text)
+
+    def _render_tool_use(self, block: Any, parent_id: Optional[str]) -> None:
+        self.tool_just_used = True
+        self.console_after_tool = True
+
+        if block.name == "Task":
+            subagent_type = block.input.get("subagent_type", "unknown")
+            description = block.input.get("description", "no description")
+            prompt = block.input.get("prompt", "")
+
+            subagent_id = self.tracker.register_subagent_spawn(
+                tool_use_id=block.id,
+                subagent_type=subagent_type,
+                description=description,
+                prompt=prompt,
+            )
+
+            self.transcript.write(
+                f"\n\n[🚀 Spawning {subagent_id}: {description}]\n",
+                end="",
+            )
+
+
+_renderers: "weakref.WeakKeyDictionary[Any, MessageRenderer]" = weakref.WeakKeyDictionary()
+
+
+def get_renderer(transcript: Any, tracker: Any = None) -> MessageRenderer:
+    """Return the renderer of a session's transcript, creating it on first use."""
+    renderer = _renderers.get(transcript)
+    if renderer is None:
+        renderer = _renderers[transcript] = MessageRenderer(transcript, tracker)
+    elif tracker is not None:
+        renderer.tracker = tracker
+    return renderer
+
+
+def process_stream_event(msg: Any, transcript: Any) -> None:
+    """Render text deltas from a partial-message StreamEvent to the console.
+
+    Args:
+        msg: StreamEvent to process
+        transcript: TranscriptWriter instance
+    """
+    get_renderer(transcript).process_stream_event(msg)
 
 
 def process_assistant_message(msg: Any, tracker: Any, transcript: Any) -> None:
@@ -14,36 +148,4 @@ def process_assistant_message(msg: Any, tracker: Any, transcript: Any) -> None:
         tracker: SubagentTracker instance
         transcript: TranscriptWriter instance
     """
-    global _tool_just_used
-
-    parent_id = getattr(msg, "parent_tool_use_id", None)
-    tracker.set_current_context(parent_id)
-
-    for block in msg.content:
-        block_type = type(block).__name__
-
-        if block_type == "TextBlock":
-            if _tool_just_used:
-                transcript.write("\n", end="")
-                _tool_just_used = False
-            transcript.write(block.text, end="")
-
-        elif block_type == "ToolUseBlock":
-            _tool_just_used = True
-
-            if block.name == "Task":
-                subagent_type = block.input.get("subagent_type", "unknown")
-                description = block.input.get("description", "no description")
-                prompt = block.input.get("prompt", "")
-
-                subagent_id = tracker.register_subagent_spawn(
-                    tool_use_id=block.id,
-                    subagent_type=subagent_type,
-                    description=description,
-                    prompt=prompt,
-                )
-
-                transcript.write(
-                    f"\n\n[🚀 Spawning {subagent_id}: {description}]\n",
-                    end="",
-                )
+    get_renderer(transcript, tracker).process_assistant_message(msg)
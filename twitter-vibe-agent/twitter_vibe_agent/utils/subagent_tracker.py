@@ -8,6 +8,8 @@ from pathlib import Path
 from typing import Dict, List, Optional, Any
 from collections import defaultdict
 
+from twitter_vibe_agent.utils.bounded_format import bounded_json, estimate_size
+
 logger = logging.getLogger(__name__)
 
 
@@ -130,7 +132,7 @@ class SubagentTracker:
         if "subagent_type" in tool_input:
             return f"spawn={tool_input.get('subagent_type', '')} ({tool_input.get('description', '')})"
 
-        return str(tool_input)[:max_length]
+        return bounded_json(tool_input, max_length)[0]
 
     def _log_to_jsonl(self, log_entry: Dict[str, Any]):
         if self.tool_log_file:
@@ -219,7 +221,7 @@ class SubagentTracker:
                 "tool_name": record.tool_name,
                 "success": error is None,
                 "error": error,
-                "output_size": len(str(tool_response)) if tool_response else 0,
+                "output_size": estimate_size(tool_response) if tool_response else 0,
             }
         )
 
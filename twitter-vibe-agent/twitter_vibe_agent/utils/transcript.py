@@ -1,21 +1,26 @@
 """Transcript handling for conversation history."""
 
+import atexit
 import logging
+import queue
+import sys
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
 
 
-def setup_session() -> tuple[Path, Path]:
+def setup_session(logs_dir: Path = Path("logs")) -> tuple[Path, Path]:
     """Setup session directory and transcript file.
 
-    Creates a session folder in logs/ with timestamp, containing both
-    transcript and detailed tool call logs.
+    Creates a session folder in logs_dir (default logs/) with timestamp,
+    containing both transcript and detailed tool call logs.
 
     Returns:
         Tuple of (transcript_file_path, session_dir_path)
     """
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    session_dir = Path("logs") / f"session_{timestamp}"
+    session_dir = Path(logs_dir) / f"session_{timestamp}"
     session_dir.mkdir(parents=True, exist_ok=True)
 
     transcript_file = session_dir / "transcript.txt"
@@ -27,27 +32,122 @@ def setup_session() -> tuple[Path, Path]:
 
 
 class TranscriptWriter:
-    """Helper to write output to both console and transcript file."""
+    """Helper to write output to both console and transcript file.
+
+    Writes never block on the terminal or the disk: console output is
+    handed to a background thread through a queue, so a slow terminal or
+    a piped stdout no longer stalls the receive loop, and the file is
+    flushed once ``flush_bytes`` are buffered or ``flush_interval`` seconds
+    have passed. ``close()`` renders and flushes everything still pending;
+    it is also registered with atexit so a crash does not lose the tail.
+    """
 
-    def __init__(self, transcript_file: Path):
+    def __init__(self, transcript_file: Path, flush_bytes: int = 64 * 1024, flush_interval: float = 1.0):
         self.file = open(transcript_file, "w", encoding="utf-8")
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+        self._closed = False
+
+        # Console rendering runs on its own thread, fed through a queue
+        self._console: queue.SimpleQueue = queue.SimpleQueue()
+        self._renderer = threading.Thread(target=self._render, name="transcript-console", daemon=True)
+        self._renderer.start()
+        atexit.register(self.close)
+
+    def _render(self):
+        """Drain queued console output, writing whatever has accumulated at once."""
+        while True:
+            try:
+                item = self._console.get(timeout=self.flush_interval)
+            except queue.Empty:
+                # Idle: get buffered transcript text onto the disk
+                self._flush_file(force=False)
+                continue
+
+            chunks = []
+            stop = False
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    # flush_console() marker: everything before it is rendered
+                    self._emit(chunks)
+                    chunks = []
+                    item.set()
+                else:
+                    chunks.append(item)
+                try:
+                    item = self._console.get_nowait()
+                except queue.Empty:
+                    break
+            self._emit(chunks)
+            if stop:
+                return
+
+    @staticmethod
+    def _emit(chunks):
+        if chunks:
+            sys.stdout.write("".join(chunks))
+            sys.stdout.flush()
+
+    def _flush_file(self, force: bool = True):
+        with self._lock:
+            if self._closed or not self._unflushed:
+                return
+            if force or time.monotonic() - self._last_flush >= self.flush_interval:
+                self.file.flush()
+                self._unflushed = 0
+                self._last_flush = time.monotonic()
+
+    def _append(self, text: str, flush: bool):
+        with self._lock:
+            if self._closed:
+                return
+            self.file.write(text)
+            self._unflushed += len(text)
+            if (
+                flush
+                or self._unflushed >= self.flush_bytes
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            ):
+                self.file.flush()
+                self._unflushed = 0
+                self._last_flush = time.monotonic()
+
+    def write(self, text: str, end: str = "", flush: bool = False):
+        """Write text to both console and transcript (flush=True forces a file flush)."""
+        self._console.put(text + end)
+        self._append(text + end, flush)
+
+    def write_to_file(self, text: str, flush: bool = False):
+        """Write text to transcript file only (not console)."""
+        self._append(text, flush)
 
-    def write(self, text: str, end: str = "", flush: bool = True):
-        """Write text to both console and transcript."""
-        print(text, end=end, flush=flush)
-        self.file.write(text + end)
-        if flush:
-            self.file.flush()
+    def write_to_console(self, text: str):
+        """Write text to the console only (not the transcript file)."""
+        self._console.put(text)
 
-    def write_to_file(self, text: str, flush: bool = True):
-        """Write text to transcript file only (not console)."""
-        self.file.write(text)
-        if flush:
-            self.file.flush()
+    def flush_console(self, timeout: float = 5.0):
+        """Wait until everything written so far is on the console (e.g. before input())."""
+        if self._renderer.is_alive():
+            rendered = threading.Event()
+            self._console.put(rendered)
+            rendered.wait(timeout)
 
     def close(self):
-        """Close the transcript file."""
-        self.file.close()
+        """Render pending console output, then flush and close the transcript file."""
+        if self._closed:
+            return
+        atexit.unregister(self.close)
+        self._console.put(None)
+        self._renderer.join(timeout=5)
+        with self._lock:
+            self._closed = True
+            self.file.flush()
+            self.file.close()
 
     def __enter__(self):
         return self